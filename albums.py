@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+import metrics
+
+# --- Albomlarni Birlashtirish (media_group_id) ---
+#
+# Telegram albomning har bir fayli alohida xabar (update) bo'lib keladi.
+# Middleware bir albom qismlarini qisqa kutish oynasi davomida to'playdi
+# (yangi qism kelsa oyna qayta boshlanadi) va handler'ni faqat bir marta -
+# birinchi qism bilan - chaqiradi: barcha qismlar data["album"] da,
+# yuborilgan tartibda. Qolgan qismlar handler'ga yetib bormaydi.
+# Faqat berilgan FSM holatlarida ishlaydi, boshqa holatlarda xabarlar
+# odatdagidek alohida qayta ishlanadi.
+
+DEFAULT_WAIT = 0.6 # Oxirgi qismdan keyin kutish (soniya)
+MAX_PARTS = 10 # Telegram albomidagi eng ko'p fayl soni
+
+albums_total = metrics.REGISTRY.counter("bot_albums_total", "Bitta handler chaqiruviga birlashtirilgan albomlar")
+album_parts_total = metrics.REGISTRY.counter("bot_album_parts_total", "Birlashtirilgan albom qismlari (xabarlar)")
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """dp.message uchun tashqi middleware: albom qismlarini bitta handler chaqiruviga to'plash."""
+
+    def __init__(self, states: Collection[str], wait: float = DEFAULT_WAIT):
+        self.states = frozenset(states)
+        self.wait = wait
+        self._albums: Dict[Tuple[int, str], List[Message]] = {}
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not isinstance(event, Message) or event.media_group_id is None or data.get("raw_state") not in self.states:
+            return await handler(event, data)
+
+        key = (event.chat.id, event.media_group_id)
+        album = self._albums.get(key)
+        if album is not None:
+            # Albomni birinchi qism yig'moqda
+            album.append(event)
+            return None
+
+        album = self._albums[key] = [event]
+        try:
+            seen = 0
+            while seen != len(album) and len(album) < MAX_PARTS:
+                seen = len(album)
+                await asyncio.sleep(self.wait)
+        finally:
+            del self._albums[key]
+
+        album.sort(key=lambda message: message.message_id)
+        albums_total.inc()
+        album_parts_total.inc(amount=len(album))
+        data["album"] = album
+        return await handler(album[0], data)
@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+import json
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from bulk_import import normalize_tuman
+
+# --- Arizalar Arxivi ---
+#
+# Har bir yakunlangan ariza (tuman, ish joyi, F.I.Sh., telefon, pasport,
+# hujjatlarning file_id lari) SQLite jadvaliga yoziladi. Admin /find buyrug'i
+# bilan telefon, F.I.Sh., tuman (va ish joyi), sana yoki ariza raqami bo'yicha
+# qidiradi. Tuman/ish joyi, telefon va sana ustunlari indekslangan, shuning
+# uchun o'n minglab arizada ham qidiruv millisekundlarda bajariladi.
+
+DEFAULT_LIMIT = 20
+PHONE_DIGITS = 9 # O'zbekiston raqami: +998 dan keyingi 9 ta raqam
+COUNTRY_CODE = "998"
+
+Row = Dict[str, Any]
+
+_COLUMNS = "id, created_at, user_id, tuman, job, name, phone, passport_info, documents"
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Telefon raqamini solishtirish uchun: faqat raqamlar, oxirgi 9 tasi."""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-PHONE_DIGITS:]
+
+
+def _phone_query(digits: str) -> str:
+    """Qidiruvdagi raqamlar -> phone_norm (yoki uning boshi). "+998 90 12" -> "9012"."""
+    if digits.startswith(COUNTRY_CODE) and len(digits) != PHONE_DIGITS and len(digits) <= PHONE_DIGITS + len(COUNTRY_CODE):
+        # Mamlakat kodi bilan (to'liq yoki boshidan bir qismi): oxirgi 9 ta emas, kod olib tashlanadi
+        return digits[len(COUNTRY_CODE):]
+    return normalize_phone(digits)
+
+
+def _like_pattern(text: str) -> str:
+    """LIKE uchun "o'z ichiga oladi" namunasi: % va _ belgilar oddiy harf sifatida."""
+    return "%" + re.sub(r"([\\%_])", r"\\\1", text) + "%"
+
+
+def _parse_date(text: str) -> Optional[Tuple[float, float]]:
+    """"dd.mm.yyyy" yoki "yyyy-mm-dd" -> shu kunning [boshi, oxiri) oralig'i."""
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            day = datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        start = day.timestamp()
+        return start, (day + datetime.timedelta(days=1)).timestamp()
+    return None
+
+
+def _prefix_upper(prefix: str) -> str:
+    """Indeks bo'yicha prefiks qidiruvi uchun yuqori chegara: "90" -> "91"."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class Archive:
+    """SQLite asosidagi arizalar arxivi."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self._conn = self._executor.submit(self._connect).result()
+
+    # --- Baza bilan ishlash (executor oqimida) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS applications ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " created_at REAL NOT NULL,"
+            " user_id INTEGER,"
+            " tuman TEXT,"
+            " job TEXT,"
+            " name TEXT,"
+            " phone TEXT,"
+            " phone_norm TEXT,"
+            " passport_info TEXT,"
+            " documents TEXT NOT NULL DEFAULT '[]')"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS applications_tuman_job ON applications (tuman, job, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS applications_phone ON applications (phone_norm)")
+        conn.execute("CREATE INDEX IF NOT EXISTS applications_created ON applications (created_at)")
+        conn.commit()
+        return conn
+
+    def _insert(self, application: Dict[str, Any], created_at: float) -> int:
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO applications (created_at, user_id, tuman, job, name, phone, phone_norm, passport_info, documents)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    created_at,
+                    application.get("user_id"),
+                    application.get("tuman"),
+                    application.get("job"),
+                    application.get("name"),
+                    application.get("phone"),
+                    normalize_phone(application.get("phone")),
+                    application.get("passport_info"),
+                    json.dumps(application.get("documents") or [], ensure_ascii=False),
+                ),
+            )
+        return cur.lastrowid
+
+    def _delete(self, application_id: int):
+        with self._conn:
+            self._conn.execute("DELETE FROM applications WHERE id = ?", (application_id,))
+
+    def _select(self, where: str, params: Tuple[Any, ...], limit: int) -> List[Row]:
+        rows = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM applications WHERE {where} ORDER BY id DESC LIMIT ?",
+            params + (limit,),
+        ).fetchall()
+        return [self._row(row) for row in rows]
+
+    @staticmethod
+    def _row(row: Tuple[Any, ...]) -> Row:
+        record = dict(zip(_COLUMNS.split(", "), row))
+        record["documents"] = json.loads(record["documents"])
+        return record
+
+    def _keys(self) -> List[Tuple[str, str, str, List[str]]]:
+        keys = []
+        for phone_norm, tuman, job, documents in self._conn.execute(
+            "SELECT phone_norm, tuman, job, documents FROM applications"
+        ):
+            unique_ids = [doc["file_unique_id"] for doc in json.loads(documents) if doc and doc.get("file_unique_id")]
+            keys.append((phone_norm, tuman, job, unique_ids))
+        return keys
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Ommaviy interfeys ---
+
+    async def add(self, application: Dict[str, Any]) -> int:
+        """Arizani arxivga yozish, uning raqamini qaytaradi."""
+        return await self._run(self._insert, application, time.time())
+
+    async def delete(self, application_id: int):
+        """Arizani arxivdan o'chirish (navbatga yozilmay qolgan ariza uchun)."""
+        await self._run(self._delete, application_id)
+
+    async def keys(self) -> List[Tuple[str, str, str, List[str]]]:
+        """Barcha arizalarning (telefon, tuman, ish joyi, hujjatlar file_unique_id lari)."""
+        return await self._run(self._keys)
+
+    async def get(self, application_id: int) -> Optional[Row]:
+        rows = await self._run(self._select, "id = ?", (application_id,), 1)
+        return rows[0] if rows else None
+
+    async def find(self, query: str, tumans: Dict[str, str], limit: int = DEFAULT_LIMIT) -> List[Row]:
+        """Qidiruv so'rovini turini aniqlab bajarish.
+
+        "#123" - ariza raqami; "18.10.2026" - sana; "90 123 45 67" - telefon
+        (boshidan bir qismi ham bo'ladi); "Zomin" yoki "Zomin / 5-DMTT" - tuman va
+        ish joyi (tumans: tuman_index() natijasi); qolgani - F.I.Sh. bo'yicha.
+        """
+        query = query.strip()
+        if re.fullmatch(r"#\d+", query):
+            return await self._run(self._select, "id = ?", (int(query[1:]),), 1)
+
+        day = _parse_date(query)
+        if day is not None:
+            return await self._run(self._select, "created_at >= ? AND created_at < ?", day, limit)
+
+        if re.fullmatch(r"[\d\s()+-]+", query):
+            digits = re.sub(r"\D", "", query)
+            if len(digits) >= 4:
+                phone = _phone_query(digits)
+                if len(phone) == PHONE_DIGITS:
+                    return await self._run(self._select, "phone_norm = ?", (phone,), limit)
+                return await self._run(self._select, "phone_norm >= ? AND phone_norm < ?",
+                                       (phone, _prefix_upper(phone)), limit)
+
+        tuman_part, _, job_part = query.partition("/")
+        tuman = tumans.get(normalize_tuman(tuman_part))
+        if tuman is not None:
+            if job_part.strip():
+                return await self._run(self._select, "tuman = ? AND job = ?", (tuman, job_part.strip()), limit)
+            return await self._run(self._select, "tuman = ?", (tuman,), limit)
+
+        return await self._run(self._select, "name LIKE ? ESCAPE '\\'", (_like_pattern(query),), limit)
+
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,305 @@
+"""Handler'lar uchun benchmark: sintetik yangilanishlar dp.feed_update orqali.
+
+Ishlatish:
+    python bench.py                         # 10, 100, 1000, 10000 ish o'rni bilan
+    python bench.py --sizes 10 1000 -n 500  # o'lchamlar va takrorlar soni
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json [--threshold 20]
+
+Bot vaqtinchalik papkada (config.json nusxasi bilan) import qilinadi, Bot API
+so'rovlari esa tarmoqqa chiqmaydigan soxta sessiyada qayd etiladi. Har bir
+yo'l (handler) uchun o'tkazuvchanlik (so'rov/soniya), p50 va p99 kechikish
+hisoblanadi. --compare bazaviy natijadan p50 bo'yicha `threshold` foizdan ko'p
+sekinlashgan yo'llar bo'lsa, 1 kodi bilan chiqadi.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import types
+from aiogram.client.session.base import BaseSession
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_ITERATIONS = 200
+DEFAULT_THRESHOLD = 20.0 # foiz
+
+BOT_USER = types.User(id=42, is_bot=True, first_name="bot", username="bench_bot")
+
+
+class RecordingSession(BaseSession):
+    """Tarmoqqa chiqmaydigan sessiya: so'rovlarni sanaydi, tayyor javob qaytaradi."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        chat = types.Chat(id=1, type="private")
+        self._message = types.Message(message_id=1, date=datetime.datetime.now(), chat=chat, from_user=BOT_USER, text="ok")
+
+    async def close(self):
+        pass
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] += 1
+        if name == "SendMediaGroup":
+            return [self._message] * len(method.media)
+        if name in ("SendMessage", "EditMessageText", "SendDocument"):
+            return self._message
+        if name == "GetMe":
+            return BOT_USER
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+
+class Updates:
+    """Sintetik Update obyektlarini yaratuvchi."""
+
+    def __init__(self):
+        self._update_id = itertools.count(1)
+        self._message_id = itertools.count(1)
+
+    def _user(self, user_id: int) -> types.User:
+        return types.User(id=user_id, is_bot=False, first_name="Bench")
+
+    def _message(self, user_id: int, **kwargs: Any) -> types.Message:
+        return types.Message(
+            message_id=next(self._message_id),
+            date=datetime.datetime.now(),
+            chat=types.Chat(id=user_id, type="private"),
+            from_user=self._user(user_id),
+            **kwargs,
+        )
+
+    def text(self, user_id: int, text: str) -> types.Update:
+        return types.Update(update_id=next(self._update_id), message=self._message(user_id, text=text))
+
+    def document(self, user_id: int, name: str) -> types.Update:
+        document = types.Document(file_id=f"F{user_id}{name}", file_unique_id=f"U{user_id}{name}",
+                                  file_name=name, mime_type="application/pdf", file_size=1024)
+        return types.Update(update_id=next(self._update_id), message=self._message(user_id, document=document))
+
+    def callback(self, user_id: int, data: str) -> types.Update:
+        message = types.Message(message_id=next(self._message_id), date=datetime.datetime.now(),
+                                chat=types.Chat(id=user_id, type="private"), from_user=BOT_USER, text="x")
+        query = types.CallbackQuery(id=str(next(self._update_id)), from_user=self._user(user_id),
+                                    chat_instance="bench", message=message, data=data)
+        return types.Update(update_id=next(self._update_id), callback_query=query)
+
+
+# Yo'l: (holatni tayyorlash, Update yaratish). Tayyorlash vaqti o'lchanmaydi.
+Prepare = Callable[[int], Awaitable[None]]
+Scenario = Tuple[Optional[Prepare], Callable[[int], types.Update]]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Bench:
+    def __init__(self, bot_module: Any):
+        self.B = bot_module
+        self.session = RecordingSession()
+        self.B.bot.session = self.session
+        self.updates = Updates()
+        self._user_ids = itertools.count(10_000_000)
+        self.admin_id = int(self.B.ADMIN_ID)
+
+    # --- Ma'lumotlarni tayyorlash ---
+
+    def fill_store(self, size: int):
+        """Omborni `size` ta ish o'rni bilan (tumanlar bo'yicha teng) to'ldirish."""
+        store = self.B.store
+        for tuman in list(store.data):
+            store.clear_tuman(tuman)
+        tumans = self.B.all_tumans
+        store.add_jobs([(tumans[i % len(tumans)], f"{i + 1}-DMTT") for i in range(size)])
+
+    async def set_state(self, user_id: int, state: Any, **data: Any):
+        context = self.B.dp.fsm.get_context(self.B.bot, chat_id=user_id, user_id=user_id)
+        await context.set_state(state)
+        await context.set_data(data)
+
+    # --- Yo'llar ---
+
+    def scenarios(self) -> Dict[str, Scenario]:
+        B, u = self.B, self.updates
+        Form = B.Form
+        tuman = B.all_tumans[0]
+        job_id, job = next((B.store.job_id(tuman, j), j) for j in B.store.data[tuman])
+        applicant = dict(selected_tuman=tuman, selected_job=job, selected_job_id=job_id, name="Bench Benchev")
+        document = {"file_id": "F", "file_unique_id": "U", "file_name": "a.pdf"}
+        admin = self.admin_id
+
+        def in_state(state: Any, **data: Any) -> Prepare:
+            async def prepare(user_id: int):
+                await self.set_state(user_id, state, **data)
+            return prepare
+
+        def unique_document(field: str) -> Callable[[int], Dict[str, Any]]:
+            return lambda user_id: {**document, "file_unique_id": f"U{field}{user_id}"}
+
+        async def passport_ready(user_id: int):
+            await self.set_state(user_id, Form.waiting_for_passport_info, phone=f"+99890{user_id:07d}",
+                                 diploma_info=unique_document("d")(user_id),
+                                 reference_info=unique_document("r")(user_id),
+                                 manager_cert_info=unique_document("m")(user_id), **applicant)
+
+        return {
+            "start": (None, lambda uid: u.text(uid, "/start")),
+            "user_tuman": (None, lambda uid: u.callback(uid, f"user_tuman_{tuman}")),
+            "jobs_page": (None, lambda uid: u.callback(uid, B.JobPageCallback(tuman=tuman, page=1).pack())),
+            "user_job": (None, lambda uid: u.callback(uid, B.JobCallback(id=job_id).pack())),
+            "user_job_legacy": (None, lambda uid: u.callback(uid, f"user_job_{tuman}|{job}")),
+            "waiting_for_name": (in_state(Form.waiting_for_name, **applicant), lambda uid: u.text(uid, "Bench Benchev")),
+            "waiting_for_phone": (in_state(Form.waiting_for_phone, **applicant),
+                                  lambda uid: u.text(uid, f"+99890{uid:07d}")),
+            "waiting_for_diploma": (in_state(Form.waiting_for_diploma, **applicant),
+                                    lambda uid: u.document(uid, "diplom.pdf")),
+            "waiting_for_reference_letter": (in_state(Form.waiting_for_reference_letter, **applicant),
+                                             lambda uid: u.document(uid, "malumotnoma.pdf")),
+            "waiting_for_manager_cert": (in_state(Form.waiting_for_manager_cert, **applicant),
+                                         lambda uid: u.document(uid, "sertifikat.pdf")),
+            "waiting_for_passport_info": (passport_ready, lambda uid: u.text(uid, "IIV, 01.01.2030")),
+            "admin_panel": (None, lambda uid: u.text(admin, "/admin")),
+            "admin_add_job": (in_state(Form.admin_add_jobs, tuman=tuman), lambda uid: u.text(admin, f"bench-{uid}")),
+            "admin_list": (None, lambda uid: u.callback(admin, "list_tumans")),
+            "admin_clear_select": (None, lambda uid: u.callback(admin, "clear_tuman_jobs")),
+            "admin_clear_confirm": (in_state(Form.admin_select_tuman_to_clear),
+                                    lambda uid: u.callback(admin, f"confirm_clear_{tuman}")),
+        }
+
+    async def run_scenario(self, prepare: Optional[Prepare], make_update: Callable[[int], types.Update],
+                           iterations: int) -> Dict[str, float]:
+        samples = []
+        for _ in range(iterations):
+            user_id = next(self._user_ids)
+            update = make_update(user_id)
+            if prepare is not None:
+                # Admin yo'llarida holat admin'ning o'ziga qo'yiladi
+                await prepare(self.admin_id if update.event.from_user.id == self.admin_id else user_id)
+            started = time.perf_counter()
+            await self.B.dp.feed_update(self.B.bot, update)
+            samples.append(time.perf_counter() - started)
+        total = sum(samples)
+        return {
+            "throughput": iterations / total if total else 0.0,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "mean_ms": statistics.fmean(samples) * 1000,
+        }
+
+    async def run(self, sizes: List[int], iterations: int, only: Optional[List[str]] = None) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        for size in sizes:
+            self.fill_store(size)
+            results[str(size)] = size_results = {}
+            for name, (prepare, make_update) in self.scenarios().items():
+                if only and name not in only:
+                    continue
+                size_results[name] = await self.run_scenario(prepare, make_update, iterations)
+                if name == "admin_add_job":
+                    self.fill_store(size) # Qo'shilgan ish o'rinlari keyingi yo'llarga ta'sir qilmasin
+        return results
+
+    async def close(self):
+        await self.B.outbox.close()
+        await self.B.archive.close()
+        await self.B.store.close()
+        await self.B.dp.storage.close()
+
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Natijalar jadvali. Bazaviy natija berilsa, p50 o'zgarishi ham ko'rsatiladi."""
+    regressions = []
+    for size, scenarios in results.items():
+        print(f"\n=== {size} ta ish o'rni ===")
+        print(f"{'yo`l':30} {'so`rov/s':>10} {'p50 ms':>9} {'p99 ms':>9}" + (f" {'p50 Δ%':>8}" if baseline else ""))
+        for name, r in scenarios.items():
+            line = f"{name:30} {r['throughput']:10.0f} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f}"
+            base = (baseline or {}).get("results", {}).get(size, {}).get(name)
+            if base:
+                delta = (r["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100 if base["p50_ms"] else 0.0
+                line += f" {delta:+8.1f}"
+                regressions.append((f"{size}/{name}", delta))
+            print(line)
+    return regressions
+
+
+def import_bot(workdir: str, config_overrides: Optional[Dict[str, Any]] = None):
+    """bot.py ni vaqtinchalik papkada (alohida data.json va bot.db bilan) import qilish."""
+    with open(os.path.join(REPO_DIR, "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(config_overrides or {})
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import bot
+    logging.getLogger().setLevel(logging.WARNING)
+    return bot
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        bench = Bench(import_bot(workdir))
+        try:
+            results = await bench.run(args.sizes, args.iterations, args.only)
+        finally:
+            await bench.close()
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = print_results(results, baseline)
+    print(f"\nBot API so'rovlari: {dict(bench.session.calls)}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "iterations": args.iterations, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"Natijalar saqlandi: {args.save}")
+
+    slower = [(name, delta) for name, delta in regressions if delta > args.threshold]
+    if slower:
+        print(f"\n⚠️ {args.threshold:.0f}% dan ko'p sekinlashgan yo'llar:")
+        for name, delta in slower:
+            print(f"  {name}: {delta:+.1f}%")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vakansiya-bot handler benchmark'i")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="ish o'rinlari soni")
+    parser.add_argument("-n", "--iterations", type=int, default=DEFAULT_ITERATIONS, help="har bir yo'l uchun takrorlar")
+    parser.add_argument("--only", nargs="+", help="faqat shu yo'llar")
+    parser.add_argument("--save", help="natijalarni JSON faylga saqlash")
+    parser.add_argument("--compare", help="bazaviy JSON natija bilan solishtirish")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="ruxsat etilgan sekinlashish (%%)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
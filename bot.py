@@ -1,13 +1,38 @@
 import asyncio
+import io
 import json
 import os
+import re
+import time
 import logging
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.filters import StateFilter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, FSInputFile
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import List, Dict, Any, Optional, Set, Tuple
+from vacancy_store import VacancyStore
+from fsm_storage import SQLiteStorage
+from outbox import Outbox
+import metrics
+from reloader import FileWatcher
+from throttle import RateLimitMiddleware, priority, PRIORITY_HIGH, PRIORITY_LOW
+from webhook import run_webhook
+from archive import Archive
+from duplicates import DuplicateIndex
+from bulk_import import ImportResult, MAX_ERRORS_SHOWN, normalize_tuman, parse_file, parse_text, tuman_index
+from export import build_export
+from verify import DocumentVerifier
+from subscriptions import Subscriptions
+from search import SearchIndex
+from render import MessageRenderer
+from albums import AlbumMiddleware, DEFAULT_WAIT as DEFAULT_ALBUM_WAIT
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, 
@@ -16,8 +41,9 @@ logging.basicConfig(level=logging.INFO,
 # --- Konfiguratsiya va Global O'zgaruvchilar ---
 
 # Konfiguratsiya faylini o'qish
+CONFIG_FILE = "config.json"
 try:
-    with open("config.json", "r", encoding="utf-8") as f:
+    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         config = json.load(f)
 except FileNotFoundError:
     logging.critical("Xatolik: 'config.json' fayli topilmadi. Botni to'xtatish.")
@@ -32,8 +58,39 @@ except KeyError as e:
 API_TOKEN = config["token"]
 ADMIN_ID = str(config["admin_id"]) # Admin ID ni string formatda saqlash tavsiya etiladi
 
-bot = Bot(token=API_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+# Bot ma'lumotlari bazasi (SQLite, WAL rejimida)
+DB_FILE = config.get("db_file", "bot.db")
+
+# "api_server": lokal Bot API serveri (yoki yuklama testidagi soxta server) manzili
+session = AiohttpSession(api=TelegramAPIServer.from_base(config["api_server"])) if config.get("api_server") else None
+bot = Bot(token=API_TOKEN, session=session)
+# Barcha chiquvchi so'rovlar Telegram cheklovlariga moslab navbatga qo'yiladi
+bot.session.middleware(RateLimitMiddleware(**config.get("rate_limit", {})))
+# FSM holatlari SQLite'da saqlanadi: qayta ishga tushganda arizalar yo'qolmaydi.
+# config "sessions": {"ttl", "max_sessions", "max_cached", "remind_before"} - sessiyalar chegarasi
+dp = Dispatcher(storage=SQLiteStorage(DB_FILE, **config.get("sessions", {})))
+# Handler va Bot API metrikalari (config "metrics" bo'lsa /metrics orqali beriladi)
+metrics.instrument(dp, bot)
+metrics_runner = None
+# Admin'ga yuboriladigan arizalar navbati (fon ishchilari yetkazadi).
+# config "digest": {"window": 600, "max_count": 20} bo'lsa, arizalar bittalab emas,
+# to'plab (tuman va ish joyi bo'yicha bitta xulosa xabari bilan) yuboriladi.
+DIGEST = config.get("digest")
+outbox = Outbox(DB_FILE, workers=config.get("outbox_workers", 2),
+                batching={"application": (DIGEST.get("window", 600), DIGEST.get("max_count", 20))} if DIGEST else None)
+archive = Archive(DB_FILE)
+duplicates = DuplicateIndex() # Ishga tushishda arxivdan quriladi
+# Hujjatlarni fonda tekshirish (natija admin'ga yetkazishda qo'shiladi)
+verifier = DocumentVerifier(bot, DB_FILE, workers=config.get("verify_workers", 2))
+VERIFY_WAIT = config.get("verify_wait", 20) # Yetkazishda tekshiruvni kutish chegarasi (soniya)
+# Tumanlarga obunalar: yangi ish o'rinlari haqida xabar (config "broadcast": rate, concurrency, ...)
+subscriptions = Subscriptions(DB_FILE, **config.get("broadcast", {}))
+# Inline qidiruv indeksi (store snapshot'i bilan so'rov paytida sinxronlanadi)
+search_index = SearchIndex()
+INLINE_PAGE_SIZE = 20
+INLINE_CACHE_TIME = config.get("inline_cache_time", 300) # Telegram natijalarni shuncha soniya keshlaydi
+# Xabar tahrirlari: o'zgarmagan matn/klaviatura qayta yuborilmaydi
+renderer = MessageRenderer()
 
 # --- State'lar (Forma bosqichlari) ---
 
@@ -55,34 +112,41 @@ class Form(StatesGroup):
 
 DATA_FILE = "data.json"
 
-def load_data() -> Dict[str, List[str]]:
-    """Ish joylari ma'lumotlarini yuklash."""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logging.warning("DATA_FILE buzilgan. Bo'sh lug'at qaytarildi.")
-            return {}
-    return {}
-
-def save_data(data: Dict[str, List[str]]):
-    """Ish joylari ma'lumotlarini saqlash."""
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-# Global ish o'rinlari lug'ati
-vacancies = load_data() 
-
-# Barcha tumanlar ro'yxati
-all_tumans = [ 
+# Global ish o'rinlari ombori (snapshot + jurnal, ishga tushishda qayta o'ynaladi)
+store = VacancyStore(DATA_FILE)
+
+# --- Holat Metrikalari (/metrics so'ralganda hisoblanadi) ---
+
+async def fsm_state_metric():
+    return {(state,): count for state, count in (await dp.storage.state_counts()).items()}
+
+async def fsm_cached_metric():
+    return dp.storage.cached_count()
+
+async def outbox_depth_metric():
+    return await outbox.depth()
+
+async def vacancies_metric():
+    return {(tuman,): len(jobs) for tuman, jobs in store.data.items()}
+
+async def subscribers_metric():
+    return await subscriptions.count()
+
+metrics.REGISTRY.gauge("bot_fsm_users", "Har bir bosqichdagi foydalanuvchilar", fsm_state_metric, ("state",))
+metrics.REGISTRY.gauge("bot_fsm_cached_sessions", "Xotiradagi FSM sessiyalari", fsm_cached_metric)
+metrics.REGISTRY.gauge("bot_outbox_depth", "Admin'ga hali yetkazilmagan arizalar", outbox_depth_metric)
+metrics.REGISTRY.gauge("bot_vacancies", "Tumanlar bo'yicha ish o'rinlari", vacancies_metric, ("tuman",))
+metrics.REGISTRY.gauge("bot_subscribers", "Obuna bo'lgan foydalanuvchilar", subscribers_metric)
+
+# Barcha tumanlar ro'yxati (config.json: "tumans")
+DEFAULT_TUMANS = [ 
     "Arnasoy tumani", "Baxmal tumani", "Do'stlik", "G'allaorol", "Jizzax shahar",
     "Sharof Rashidov", "Zafarobod", "Zarbdor", "Zomin", "Mirzacho'l",
     "Paxtakor", "Forish", "Yangiobod"
 ] 
 
-# Malaka talablari uchun uzoq matn
-MALAKA_TALABLARI_TEXT = """
+# Malaka talablari uchun uzoq matn (config.json: "malaka_talablari_text")
+DEFAULT_MALAKA_TALABLARI_TEXT = """
 **Direktor lavozimiga qo‘yiladigan malaka talablari:**
 
 **Ma’lumot:** Nomzod oliy ma’lumotga, ya’ni bakalavr diplomiga ega bo‘lishi lozim. Magistratura darajasi yoki ilmiy unvon mavjudligi afzal.
@@ -112,14 +176,91 @@ O‘zbekiston Respublikasining “Maktabgacha ta’lim va tarbiya to‘g‘risid
 👤 Admin: Sardor Asatov
 """
 
-# Ruxsat etilgan fayl turlari
-ALLOWED_MIME_TYPES = [
+# Ruxsat etilgan fayl turlari (config.json: "allowed_mime_types")
+DEFAULT_ALLOWED_MIME_TYPES = [
     'application/pdf',
     'application/zip',
     'application/x-zip-compressed',
     'application/x-rar-compressed',
     'application/vnd.rar' # Rar uchun kengaytma
 ]
+
+# --- Qayta Yuklanadigan Sozlamalar ---
+
+# Tugma callback_data'si (masalan "confirm_clear_<tuman>") 64 baytdan oshmasligi kerak
+MAX_TUMAN_BYTES = 64 - len("confirm_clear_")
+# Bu kalitlar o'zgarsa, botni qayta ishga tushirish kerak
+RESTART_KEYS = ("token", "db_file", "mode", "webhook", "rate_limit", "outbox_workers", "api_server", "metrics", "digest",
+                "broadcast", "sessions", "inline_cache_time", "album_wait")
+
+def load_settings(cfg: Dict[str, Any]) -> Tuple[List[str], str, List[str]]:
+    """Konfiguratsiyadan tumanlar, malaka matni va fayl turlarini olish. Noto'g'ri bo'lsa ValueError."""
+    if "admin_id" not in cfg or "token" not in cfg:
+        raise ValueError("'token' yoki 'admin_id' kaliti yo'q")
+    tumans = cfg.get("tumans", DEFAULT_TUMANS)
+    if not isinstance(tumans, list) or not tumans or not all(isinstance(t, str) and t.strip() for t in tumans):
+        raise ValueError("'tumans' bo'sh bo'lmagan matnlar ro'yxati bo'lishi kerak")
+    if len(set(tumans)) != len(tumans):
+        raise ValueError("'tumans' ro'yxatida takroriy nomlar bor")
+    too_long = [t for t in tumans if len(t.encode()) > MAX_TUMAN_BYTES]
+    if too_long:
+        raise ValueError(f"tuman nomi juda uzun: {too_long[0]}")
+    # Tuman nomi JobPageCallback/SubscribeCallback ichiga joylanadi: ":" - callback_data ajratgichi
+    with_separator = [t for t in tumans if ":" in t]
+    if with_separator:
+        raise ValueError(f"tuman nomida ':' bo'lmasligi kerak: {with_separator[0]}")
+    text = cfg.get("malaka_talablari_text", DEFAULT_MALAKA_TALABLARI_TEXT)
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("'malaka_talablari_text' bo'sh bo'lmagan matn bo'lishi kerak")
+    mime_types = cfg.get("allowed_mime_types", DEFAULT_ALLOWED_MIME_TYPES)
+    if not isinstance(mime_types, list) or not mime_types or not all(isinstance(m, str) and "/" in m for m in mime_types):
+        raise ValueError("'allowed_mime_types' MIME turlari ro'yxati bo'lishi kerak")
+    return list(tumans), text, list(mime_types)
+
+try:
+    all_tumans, MALAKA_TALABLARI_TEXT, ALLOWED_MIME_TYPES = load_settings(config)
+except ValueError as e:
+    logging.critical(f"Xatolik: 'config.json' noto'g'ri: {e}. Botni to'xtatish.")
+    exit()
+settings_version = 0 # Sozlamalar qayta yuklanganda oshadi (klaviatura keshi uchun)
+
+async def reload_config() -> bool:
+    """config.json ni qayta o'qish, tekshirish va yangi sozlamalarni bir vaqtda almashtirish."""
+    global config, all_tumans, MALAKA_TALABLARI_TEXT, ALLOWED_MIME_TYPES, ADMIN_ID, settings_version
+
+    def read() -> Dict[str, Any]:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    new_config = await asyncio.get_running_loop().run_in_executor(None, read)
+    if not isinstance(new_config, dict):
+        raise ValueError("config.json JSON obyekt bo'lishi kerak")
+    new_settings = load_settings(new_config)
+    for key in RESTART_KEYS:
+        if new_config.get(key) != config.get(key):
+            logging.warning(f"config.json: '{key}' o'zgardi, u faqat qayta ishga tushirilganda qo'llanadi.")
+    # Bitta qadamda (orada await yo'q): handler'lar eski yoki yangi to'plamni ko'radi
+    config = new_config
+    all_tumans, MALAKA_TALABLARI_TEXT, ALLOWED_MIME_TYPES = new_settings
+    ADMIN_ID = str(new_config["admin_id"])
+    settings_version += 1
+    return True
+
+# Fayl kuzatuvchisi: config.json va ish o'rinlari fayllari (boshqa jarayon yoki qo'lda tahrirlanganda)
+watcher = FileWatcher(config.get("reload_interval", 2.0))
+watcher.watch("config", [CONFIG_FILE], reload_config)
+
+async def reload_vacancies() -> bool:
+    """Tashqaridan o'zgargan ish o'rinlarini qayta o'qish; ko'paygan tumanlar obunachilariga xabar."""
+    before = store.snapshot
+    reloaded = await store.refresh()
+    if reloaded:
+        after = store.snapshot
+        await subscriptions.notify(tuman for tuman, jobs in after.data.items()
+                                   if after.changed_at(tuman) > before.version and set(jobs) - set(before.jobs(tuman)))
+    return reloaded
+
+watcher.watch("vacancies", [DATA_FILE, DATA_FILE + ".journal"], reload_vacancies)
 # --- Umumiy Funksiyalar ---
 
 def get_back_buttons(back_callback: Optional[str] = None) -> List[List[InlineKeyboardButton]]:
@@ -137,6 +278,179 @@ def get_back_buttons(back_callback: Optional[str] = None) -> List[List[InlineKey
         # Asl holatda qatorlar alohida bo'ladi
         return [[btn] for btn in buttons]
 
+# --- Callback Ma'lumotlari ---
+
+class JobCallback(CallbackData, prefix="j1"):
+    """Ish o'rni tugmasi: "j1:<id>" ("j1" - kodlash versiyasi, o'zgarsa "j2" bo'ladi)."""
+    id: int
+
+class JobPageCallback(CallbackData, prefix="jp1"):
+    """Tumandagi ish o'rinlari sahifasi: "jp1:<tuman>:<sahifa>"."""
+    tuman: str
+    page: int
+
+class AdminListCallback(CallbackData, prefix="al1"):
+    """Admin uchun ish o'rinlari ro'yxati sahifasi: "al1:<sahifa>"."""
+    page: int
+
+class ApplicationCallback(CallbackData, prefix="ap1"):
+    """Arizalar to'plamidagi "batafsil" tugmasi: "ap1:<arxiv raqami>"."""
+    id: int
+
+class SubscribeCallback(CallbackData, prefix="sb1"):
+    """Tumanga obunani yoqish/o'chirish: "sb1:<tuman>"."""
+    tuman: str
+
+# Sahifalash
+JOBS_PER_PAGE = 10 # Bitta sahifadagi ish o'rinlari tugmalari soni
+LIST_PAGE_CHARS = 3500 # Admin ro'yxatining bitta sahifasi uzunligi (Telegram chegarasi 4096)
+
+def two_column_rows(buttons: List[InlineKeyboardButton]) -> List[List[InlineKeyboardButton]]:
+    """Tugmalarni ikki ustunli qatorlarga joylashtiradi."""
+    return [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+
+
+# --- Klaviatura Keshi ---
+
+# Kesh ish o'rinlari ombori (store.version) yoki sozlamalar (settings_version) o'zgarsa bekor qilinadi
+_render_cache: Dict[Any, Any] = {}
+_render_cache_version: Tuple[int, int] = (-1, -1)
+
+def cached_render(key: Any, builder):
+    """Kalit bo'yicha keshlangan obyektni qaytaradi, bo'lmasa builder() orqali yaratadi."""
+    global _render_cache_version
+    version = (store.snapshot.version, settings_version)
+    if _render_cache_version != version:
+        _render_cache.clear()
+        _render_cache_version = version
+    try:
+        return _render_cache[key]
+    except KeyError:
+        value = _render_cache[key] = builder()
+        return value
+
+def _build_user_tumans_keyboard() -> Optional[InlineKeyboardMarkup]:
+    available = [(tuman, jobs) for tuman, jobs in store.snapshot.data.items() if jobs]
+    if not available:
+        return None
+    buttons = [
+        InlineKeyboardButton(text=f"🏢 {tuman} ({len(jobs)} ta)", callback_data=f"user_tuman_{tuman}")
+        for tuman, jobs in available
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=two_column_rows(buttons) + [[SUBSCRIBE_BUTTON]])
+
+SUBSCRIBE_BUTTON = InlineKeyboardButton(text="🔔 Yangi ish o'rinlari haqida xabar olish", callback_data="subscriptions")
+
+def subscriptions_keyboard(subscribed: Set[str]) -> InlineKeyboardMarkup:
+    """Foydalanuvchining obunalari (keshlanmaydi: har bir foydalanuvchi uchun alohida)."""
+    buttons = [
+        InlineKeyboardButton(text=f"{'✅' if tuman in subscribed else '➕'} {tuman}",
+                             callback_data=SubscribeCallback(tuman=tuman).pack())
+        for tuman in all_tumans
+    ]
+    rows = two_column_rows(buttons)
+    rows.append([InlineKeyboardButton(text="🔔 Barcha tumanlar", callback_data="subscribe_all"),
+                 InlineKeyboardButton(text="🔕 Hammasini o'chirish", callback_data="unsubscribe_all")])
+    return InlineKeyboardMarkup(inline_keyboard=rows + get_back_buttons())
+
+def user_tumans_keyboard() -> Optional[InlineKeyboardMarkup]:
+    """Ish o'rni mavjud tumanlar klaviaturasi (ish o'rni bo'lmasa None)."""
+    return cached_render("user_tumans", _build_user_tumans_keyboard)
+
+def natural_key(text: str) -> List[Any]:
+    """"2-DMTT" "10-DMTT" dan oldin turishi uchun saralash kaliti."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", text)]
+
+def sorted_jobs(tuman: str) -> List[Tuple[int, str]]:
+    """Tumandagi (ID, ish o'rni) ro'yxati, nom bo'yicha saralangan."""
+    snapshot = store.snapshot
+    return cached_render(("sorted_jobs", tuman), lambda: sorted(
+        ((snapshot.job_id(tuman, job), job) for job in snapshot.jobs(tuman)),
+        key=lambda item: natural_key(item[1]),
+    ))
+
+def page_count(total: int, per_page: int) -> int:
+    return max(1, -(-total // per_page))
+
+def page_nav_row(page: int, pages: int, make_callback) -> List[InlineKeyboardButton]:
+    """Sahifalar orasida o'tish tugmalari: ◀️ 2/5 ▶️"""
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="◀️", callback_data=make_callback(page - 1)))
+    row.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="noop"))
+    if page < pages - 1:
+        row.append(InlineKeyboardButton(text="▶️", callback_data=make_callback(page + 1)))
+    return row
+
+def _build_jobs_page(tuman: str, page: int) -> InlineKeyboardMarkup:
+    jobs = sorted_jobs(tuman)
+    pages = page_count(len(jobs), JOBS_PER_PAGE)
+    start = page * JOBS_PER_PAGE
+    keyboard_buttons = [
+        [InlineKeyboardButton(text=f"💼 {job}", callback_data=JobCallback(id=job_id).pack())]
+        for job_id, job in jobs[start:start + JOBS_PER_PAGE]
+    ]
+    if pages > 1:
+        keyboard_buttons.append(page_nav_row(page, pages, lambda p: JobPageCallback(tuman=tuman, page=p).pack()))
+    keyboard_buttons.extend(get_back_buttons("back_to_tuman_selection"))
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+def jobs_page_keyboard(tuman: str, page: int) -> InlineKeyboardMarkup:
+    """Tumandagi ish o'rinlarining bitta sahifasi klaviaturasi."""
+    page = min(max(page, 0), page_count(len(sorted_jobs(tuman)), JOBS_PER_PAGE) - 1)
+    return cached_render(("jobs_page", tuman, page), lambda: _build_jobs_page(tuman, page))
+
+def _build_admin_list_pages() -> List[str]:
+    if not any(store.snapshot.data.values()):
+        return ["Hozircha hech qaysi tumanda ish joylari mavjud emas."]
+
+    # (tuman, qator) juftliklari: sahifa tuman o'rtasida bo'linsa sarlavha takrorlanadi
+    lines: List[Tuple[str, str]] = []
+    for tuman in all_tumans:
+        jobs = sorted_jobs(tuman)
+        if jobs:
+            lines.append((tuman, f"**{tuman}** ({len(jobs)} ta):"))
+            lines.extend((tuman, f" * {job}") for _, job in jobs)
+        else:
+            lines.append((tuman, f"**{tuman}**: _Ish joyi yo'q._"))
+
+    pages = []
+    text = "Tumanlar va mavjud ish joylari ro'yxati:\n\n"
+    for tuman, line in lines:
+        if len(text) + len(line) > LIST_PAGE_CHARS:
+            pages.append(text)
+            text = "" if line.startswith("**") else f"**{tuman}** (davomi):\n"
+        text += line + "\n"
+    pages.append(text)
+    return pages
+
+def admin_list_pages() -> List[str]:
+    """Admin uchun ish o'rinlari ro'yxati sahifalari."""
+    return cached_render("admin_list_pages", _build_admin_list_pages)
+
+def _build_admin_tumans_keyboard() -> InlineKeyboardMarkup:
+    buttons = [InlineKeyboardButton(text=tuman, callback_data=f"admin_tuman_{tuman}") for tuman in all_tumans]
+    keyboard_buttons = two_column_rows(buttons)
+    keyboard_buttons.append([InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+def admin_tumans_keyboard() -> InlineKeyboardMarkup:
+    """Admin uchun barcha tumanlar klaviaturasi."""
+    return cached_render("admin_tumans", _build_admin_tumans_keyboard)
+
+def _build_clear_tumans_keyboard() -> Optional[InlineKeyboardMarkup]:
+    available_tumans = [tuman for tuman, jobs in store.snapshot.data.items() if jobs]
+    if not available_tumans:
+        return None
+    buttons = [InlineKeyboardButton(text=f"🗑️ {tuman}", callback_data=f"confirm_clear_{tuman}") for tuman in available_tumans]
+    keyboard_buttons = two_column_rows(buttons)
+    keyboard_buttons.append([InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+def clear_tumans_keyboard() -> Optional[InlineKeyboardMarkup]:
+    """Tozalash uchun ish o'rni mavjud tumanlar klaviaturasi (bo'lmasa None)."""
+    return cached_render("clear_tumans", _build_clear_tumans_keyboard)
+
 
 # --- Foydalanuvchi Qo'llanmalari ---
 
@@ -154,100 +468,206 @@ async def start(message: types.Message, state: FSMContext):
     # Bosh menyuga o'tkazish uchun reply klaviaturani yashiramiz
     await message.answer(full_start_text, parse_mode="Markdown", reply_markup=types.ReplyKeyboardRemove())
 
-    # Ish o'rni mavjud tumanlarni topish
-    available_tumans = [tuman for tuman, jobs in vacancies.items() if jobs]
+    # Ish o'rni mavjud tumanlar klaviaturasi (keshdan)
+    kb = user_tumans_keyboard()
 
-    if not available_tumans:
-        await message.answer("⚠️ **Hozirda hech qaysi tumanda bo'sh ish o'rinlari mavjud emas!**\nAdmin hali ish joyi qo'shgani yo'q.", parse_mode="Markdown")
+    if kb is None:
+        await message.answer("⚠️ **Hozirda hech qaysi tumanda bo'sh ish o'rinlari mavjud emas!**\nAdmin hali ish joyi qo'shgani yo'q.\n\n"
+                             "Ish o'rni paydo bo'lganda xabar olish uchun tumanlarga obuna bo'ling.",
+                             parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[SUBSCRIBE_BUTTON]]))
         return
 
-    # Tumanlar uchun klaviatura yaratish
-    keyboard_buttons = []
-    row = []
-    for i, tuman in enumerate(available_tumans, 1):
-        row.append(InlineKeyboardButton(text=f"🏢 {tuman} ({len(vacancies.get(tuman, []))} ta)", callback_data=f"user_tuman_{tuman}"))
-        if i % 2 == 0:
-            keyboard_buttons.append(row)
-            row = []
-    if row:
-        keyboard_buttons.append(row)
-    
-    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
     await message.answer("👇 Bo'sh ish o'rinlari mavjud tumanni tanlang:", reply_markup=kb)
 
+@dp.message(F.text.regexp(r"^/start job_(\d+)$"))
+async def start_with_job(message: types.Message, state: FSMContext):
+    """Inline qidiruv natijasidagi havola (t.me/bot?start=job_ID): ish o'rnini darhol tanlash."""
+    await state.clear()
+    if str(message.from_user.id) == ADMIN_ID:
+        await start(message, state)
+        return
+    job_id = int(message.text.split("_", 1)[1])
+    selected = store.get_job(job_id)
+    if selected is None:
+        await message.answer("⚠️ Bu ish o'rni endi mavjud emas. Ro'yxat yangilandi.")
+        await start(message, state)
+        return
+    tuman, job = selected
+
+    full_start_text = "👋 Salom, siz Jizzax viloyat DMTT bo‘sh ish o‘rinlari bo‘limidasiz.\n\n" + MALAKA_TALABLARI_TEXT
+    await message.answer(full_start_text, parse_mode="Markdown", reply_markup=types.ReplyKeyboardRemove())
+
+    await state.update_data(selected_tuman=tuman, selected_job=job, selected_job_id=job_id)
+    kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"user_tuman_{tuman}"))
+    await message.answer(
+        f"Siz **{tuman}** tumanidagi **{job}** ish o'rnini tanladingiz.\n\n"
+        "Iltimos, **F.I.Sh.**'ngizni to'liq kiriting:",
+        reply_markup=kb,
+        parse_mode="Markdown"
+    )
+    await state.set_state(Form.waiting_for_name)
+
+@dp.inline_query()
+async def inline_search(inline_query: types.InlineQuery):
+    """Inline qidiruv (@bot 12-DMTT): barcha tumanlardagi ish o'rinlari, sahifalab."""
+    search_index.sync(store.snapshot)
+    results = search_index.search(inline_query.query)
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    page = results[offset:offset + INLINE_PAGE_SIZE]
+    username = (await bot.me()).username
+
+    articles = []
+    for job_id, tuman, job in page:
+        link = f"https://t.me/{username}?start=job_{job_id}"
+        articles.append(InlineQueryResultArticle(
+            id=str(job_id),
+            title=job,
+            description=f"{tuman} tumani",
+            input_message_content=InputTextMessageContent(
+                message_text=f"💼 {job}\n🏢 {tuman} tumani\n\nAriza topshirish: {link}"
+            ),
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="📝 Ariza topshirish", url=link)]]),
+        ))
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(results) else ""
+    # Natijalar hamma uchun bir xil: Telegram keshidan boshqa foydalanuvchilarga ham beriladi
+    await inline_query.answer(articles, cache_time=INLINE_CACHE_TIME, is_personal=False, next_offset=next_offset)
+
 @dp.callback_query(F.data == "go_to_start")
 async def go_to_start_handler(callback: types.CallbackQuery, state: FSMContext):
-    """Bosh sahifaga (start) qaytish."""
-    # Xabarni o'chirib, yangisini yuboramiz.
-    try:
-        await callback.message.delete()
-    except Exception:
-        pass # Xabar allaqachon o'chirilgan bo'lishi mumkin
-        
-    await start(callback.message, state)
+    """Bosh sahifaga (start) qaytish: xabar o'chirilmaydi, tuman tanlashga tahrirlanadi."""
     await callback.answer()
+    if await state.get_state() == Form.waiting_for_phone.state:
+        # Telefon bosqichidagi reply klaviaturani faqat yangi xabar bilan yashirish mumkin
+        await callback.message.answer("🏠 Bosh sahifa", reply_markup=types.ReplyKeyboardRemove())
+    await state.clear()
+
+    if str(callback.from_user.id) == ADMIN_ID:
+        await renderer.edit(callback.message, "Salom Admin! Ish joylarini boshqarish uchun /admin yozing.")
+        return
+
+    kb = user_tumans_keyboard()
+    if kb is None:
+        await renderer.edit(callback.message, "⚠️ **Hozirda hech qaysi tumanda bo'sh ish o'rinlari mavjud emas!**\n\n"
+                            "Ish o'rni paydo bo'lganda xabar olish uchun tumanlarga obuna bo'ling.",
+                            parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[SUBSCRIBE_BUTTON]]))
+    else:
+        await renderer.edit(callback.message, "👇 Bo'sh ish o'rinlari mavjud tumanni tanlang:", reply_markup=kb)
 
 @dp.callback_query(F.data == "back_to_tuman_selection")
 async def back_to_tuman_selection(callback: types.CallbackQuery, state: FSMContext):
     """Tuman tanlash bosqichiga qaytish."""
-    available_tumans = [tuman for tuman, jobs in vacancies.items() if jobs]
+    kb = user_tumans_keyboard()
 
-    keyboard_buttons = []
-    row = []
-    for i, tuman in enumerate(available_tumans, 1):
-        row.append(InlineKeyboardButton(text=f"🏢 {tuman} ({len(vacancies.get(tuman, []))} ta)", callback_data=f"user_tuman_{tuman}"))
-        if i % 2 == 0:
-            keyboard_buttons.append(row)
-            row = []
-    if row:
-        keyboard_buttons.append(row)
-    
-    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text("👇 Bo'sh ish o'rinlari mavjud tumanni tanlang:", reply_markup=kb)
+    if kb is None:
+        await renderer.edit(callback.message, "⚠️ **Hozirda hech qaysi tumanda bo'sh ish o'rinlari mavjud emas!**", parse_mode="Markdown")
+    else:
+        await renderer.edit(callback.message, "👇 Bo'sh ish o'rinlari mavjud tumanni tanlang:", reply_markup=kb)
     await state.clear() # Faqat tuman tanlash uchun
     await callback.answer()
 
-@dp.callback_query(F.data.startswith("user_tuman_"))
-async def tuman_selected(callback: types.CallbackQuery, state: FSMContext):
-    """Tuman tanlanganda ish o'rinlarini ko'rsatish."""
-    tuman = callback.data.replace("user_tuman_", "")
+async def show_jobs_page(callback: types.CallbackQuery, state: FSMContext, tuman: str, page: int):
+    """Tumandagi ish o'rinlarining bitta sahifasini ko'rsatish."""
     await state.update_data(current_tuman=tuman)
 
-    jobs = vacancies.get(tuman, [])
-    
-    if not jobs:
-        await callback.message.answer("Afsuski, bu tumanda hozircha bo'sh ish o'rni qolmadi.")
+    if not store.snapshot.jobs(tuman):
+        await callback.message.answer("Afsuski, bu tumanda hozircha bo'sh ish o'rni qolmadi.",
+                                      reply_markup=InlineKeyboardMarkup(inline_keyboard=[[SUBSCRIBE_BUTTON]]))
         await callback.answer()
         return
 
-    keyboard_buttons = []
-    for job in jobs:
-        callback_data = f"user_job_{tuman}|{job}"
-        keyboard_buttons.append([InlineKeyboardButton(text=f"💼 {job}", callback_data=callback_data)])
-        
-    keyboard_buttons.extend(get_back_buttons("back_to_tuman_selection"))
-    
-    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text(f"**{tuman}** tumanidagi bo'sh ish o'rinlaridan birini tanlang:", reply_markup=kb, parse_mode="Markdown")
+    kb = jobs_page_keyboard(tuman, page)
+    await renderer.edit(callback.message, f"**{tuman}** tumanidagi bo'sh ish o'rinlaridan birini tanlang:", reply_markup=kb, parse_mode="Markdown")
     await callback.answer()
 
-@dp.callback_query(F.data.startswith("user_job_"))
-async def job_selected(callback: types.CallbackQuery, state: FSMContext):
+@dp.callback_query(F.data.startswith("user_tuman_"))
+async def tuman_selected(callback: types.CallbackQuery, state: FSMContext):
+    """Tuman tanlanganda ish o'rinlarining birinchi sahifasini ko'rsatish."""
+    await show_jobs_page(callback, state, callback.data.replace("user_tuman_", ""), 0)
+
+@dp.callback_query(JobPageCallback.filter())
+async def jobs_page_selected(callback: types.CallbackQuery, callback_data: JobPageCallback, state: FSMContext):
+    """Ish o'rinlari sahifalari orasida o'tish."""
+    await show_jobs_page(callback, state, callback_data.tuman, callback_data.page)
+
+@dp.callback_query(F.data == "noop")
+async def noop_handler(callback: types.CallbackQuery):
+    """Sahifa raqami kabi bosilganda hech narsa qilmaydigan tugmalar."""
+    await callback.answer()
+
+# --- Obunalar ---
+
+SUBSCRIPTIONS_TEXT = ("🔔 Belgilangan tumanlarda yangi bo'sh ish o'rni paydo bo'lganda sizga xabar yuboramiz.\n"
+                      "Tumanni bosib obunani yoqing yoki o'chiring:")
+
+async def show_subscriptions(callback: types.CallbackQuery, notice: Optional[str] = None):
+    subscribed = await subscriptions.user_tumans(callback.from_user.id)
+    await renderer.edit(callback.message, SUBSCRIPTIONS_TEXT, reply_markup=subscriptions_keyboard(subscribed))
+    await callback.answer(notice)
+
+@dp.callback_query(F.data == "subscriptions")
+async def subscriptions_menu(callback: types.CallbackQuery):
+    """Obunalar menyusi."""
+    await show_subscriptions(callback)
+
+@dp.callback_query(SubscribeCallback.filter())
+async def toggle_subscription(callback: types.CallbackQuery, callback_data: SubscribeCallback):
+    """Bitta tumanga obunani yoqish/o'chirish."""
+    tuman = callback_data.tuman
+    if tuman in await subscriptions.user_tumans(callback.from_user.id):
+        await subscriptions.unsubscribe(callback.from_user.id, [tuman])
+        await show_subscriptions(callback, f"🔕 {tuman}: obuna o'chirildi")
+    else:
+        await subscriptions.subscribe(callback.from_user.id, [tuman])
+        await show_subscriptions(callback, f"🔔 {tuman}: obuna bo'ldingiz")
+
+@dp.callback_query(F.data == "subscribe_all")
+async def subscribe_all(callback: types.CallbackQuery):
+    await subscriptions.subscribe(callback.from_user.id, all_tumans)
+    await show_subscriptions(callback, "🔔 Barcha tumanlarga obuna bo'ldingiz")
+
+@dp.callback_query(F.data == "unsubscribe_all")
+async def unsubscribe_all(callback: types.CallbackQuery):
+    await subscriptions.unsubscribe(callback.from_user.id)
+    await show_subscriptions(callback, "🔕 Barcha obunalar o'chirildi")
+
+def has_jobs(tuman: str) -> bool:
+    return bool(store.snapshot.jobs(tuman))
+
+async def send_vacancy_notice(user_id: int, tuman: str):
+    """Obunachiga bitta xabar (Subscriptions fon ishchisi chaqiradi)."""
+    kb = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="👀 Ish o'rinlarini ko'rish", callback_data=f"user_tuman_{tuman}")],
+        [InlineKeyboardButton(text="🔕 Obunalarni boshqarish", callback_data="subscriptions")],
+    ])
+    await bot.send_message(
+        user_id,
+        f"🔔 **{tuman}** tumanida yangi bo'sh ish o'rinlari paydo bo'ldi (jami {len(store.snapshot.jobs(tuman))} ta).",
+        parse_mode="Markdown",
+        reply_markup=kb,
+    )
+
+@dp.callback_query(JobCallback.filter())
+async def job_selected(callback: types.CallbackQuery, callback_data: JobCallback, state: FSMContext):
     """Ish o'rni tanlanganda F.I.Sh. ni so'rash."""
-    try:
-        tuman_job_str = callback.data.replace("user_job_", "")
-        tuman, job = tuman_job_str.split("|", 1)
-    except ValueError:
-        await callback.message.answer("Xatolik yuz berdi. Iltimos, boshidan boshlang (/start).")
-        await callback.answer()
+    selected = store.get_job(callback_data.id)
+    if selected is None:
+        # Eski tugma: ish o'rni o'chirilgan
+        await callback.answer("⚠️ Bu ish o'rni endi mavjud emas. Ro'yxat yangilandi.", show_alert=True)
+        kb = user_tumans_keyboard()
+        if kb is None:
+            await renderer.edit(callback.message, "⚠️ **Hozirda hech qaysi tumanda bo'sh ish o'rinlari mavjud emas!**", parse_mode="Markdown")
+        else:
+            await renderer.edit(callback.message, "👇 Bo'sh ish o'rinlari mavjud tumanni tanlang:", reply_markup=kb)
         return
+    tuman, job = selected
 
-    await state.update_data(selected_tuman=tuman, selected_job=job)
+    await state.update_data(selected_tuman=tuman, selected_job=job, selected_job_id=callback_data.id)
     
     # Orqaga qaytish: Tuman ish o'rinlari ro'yxatiga
     kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"user_tuman_{tuman}"))
 
-    await callback.message.edit_text(
+    await renderer.edit(
+        callback.message,
         f"Siz **{tuman}** tumanidagi **{job}** ish o'rnini tanladingiz.\n\n"
         "Iltimos, **F.I.Sh.**'ngizni to'liq kiriting:",
         reply_markup=kb,
@@ -256,6 +676,13 @@ async def job_selected(callback: types.CallbackQuery, state: FSMContext):
     await state.set_state(Form.waiting_for_name)
     await callback.answer()
 
+@dp.callback_query(F.data.startswith("user_job_"))
+async def legacy_job_selected(callback: types.CallbackQuery, state: FSMContext):
+    """Eski formatdagi ("user_job_<tuman>|<ish>") tugmalarni yangi ID'ga o'tkazish."""
+    tuman, _, job = callback.data.replace("user_job_", "", 1).partition("|")
+    job_id = store.job_id(tuman, job)
+    await job_selected(callback, JobCallback(id=job_id or 0), state)
+
 @dp.message(Form.waiting_for_name)
 async def process_name(message: types.Message, state: FSMContext):
     """F.I.Sh. qabul qilingandan keyin telefon raqamni so'rash."""
@@ -277,6 +704,15 @@ async def process_name(message: types.Message, state: FSMContext):
     await message.answer("Endi **telefon raqamingizni** yuboring:", reply_markup=kb, parse_mode="Markdown")
     await state.set_state(Form.waiting_for_phone)
 
+async def reject_duplicate_application(message: types.Message, state: FSMContext, data: Dict[str, Any]):
+    """Takroriy arizani rad etish va suhbatni yakunlash."""
+    await message.answer(
+        f"⚠️ Siz ushbu telefon raqam bilan \"{data.get('selected_job')}\" ({data.get('selected_tuman')}) ish joyiga "
+        "allaqachon ariza topshirgansiz. Arizangiz ko'rib chiqilmoqda, qayta yuborish shart emas.",
+        reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="/start")]], resize_keyboard=True, one_time_keyboard=True)
+    )
+    await state.clear()
+
 @dp.message(Form.waiting_for_phone, F.content_type.in_({"contact", "text"}))
 async def process_phone(message: types.Message, state: FSMContext):
     """Telefon raqam qabul qilingandan keyin birinchi hujjatni (Diplom) so'rash."""
@@ -293,6 +729,11 @@ async def process_phone(message: types.Message, state: FSMContext):
     if not phone:
         await message.answer("Telefon raqam aniqlanmadi. Iltimos, 'Telefon raqamni yuborish' tugmasini bosing yoki raqamni to'g'ri kiriting.")
         return
+
+    data = await state.get_data()
+    if duplicates.has_application(phone, data.get("selected_tuman"), data.get("selected_job")):
+        await reject_duplicate_application(message, state, data)
+        return
         
     await state.update_data(phone=phone)
     
@@ -311,6 +752,94 @@ async def process_phone(message: types.Message, state: FSMContext):
     )
     await state.set_state(Form.waiting_for_diploma)
 
+DOCUMENT_FIELDS = ("diploma_info", "reference_info", "manager_cert_info")
+# Hujjat bosqichlari tartibda: (holat, maydon, xato xabaridagi "ortga" tugmasi)
+DOCUMENT_STEPS = (
+    (Form.waiting_for_diploma, "diploma_info", "back_to_name"),
+    (Form.waiting_for_reference_letter, "reference_info", "back_to_diploma"),
+    (Form.waiting_for_manager_cert, "manager_cert_info", "back_to_reference"),
+)
+# Hujjat qabul qilingandan keyingi so'rov: (matn, "ortga" tugmasi, keyingi holat)
+DOCUMENT_NEXT = (
+    ("2. Diplom qabul qilindi. Endi **ma'lumotnomangizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
+     "back_to_diploma", Form.waiting_for_reference_letter),
+    ("3. Ma'lumotnoma qabul qilindi. Endi **menejerlik sertifikatingizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
+     "back_to_reference", Form.waiting_for_manager_cert),
+    ("4. Barcha hujjatlar qabul qilindi. Iltimos, **pasport** ma'lumotlarini quyidagi tartibda kiriting:\n\n"
+     "**[Kim tomonidan berilgan]**\n"
+     "**[Qachongacha amal qiladi (dd.mm.yyyy)]**",
+     "back_to_manager_cert", Form.waiting_for_passport_info),
+)
+
+# Hujjatlar albom bo'lib kelsa, qismlar bitta handler chaqiruviga to'planadi
+dp.message.outer_middleware(AlbumMiddleware([step[0].state for step in DOCUMENT_STEPS],
+                                            wait=config.get("album_wait", DEFAULT_ALBUM_WAIT)))
+DOCUMENT_TITLES = ("1. Diplom", "2. Ma'lumotnoma", "3. Menejerlik Sertifikati")
+
+def document_info(document: types.Document) -> Dict[str, Any]:
+    """Holatda (va arxivda) saqlanadigan hujjat ma'lumotlari."""
+    return {
+        "file_id": document.file_id,
+        "file_unique_id": document.file_unique_id,
+        "file_name": document.file_name,
+        "mime_type": document.mime_type,
+        "file_size": document.file_size,
+    }
+
+async def reject_duplicate_document(message: types.Message, state: FSMContext, field: str, back_to: str) -> bool:
+    """Hujjat shu arizada yoki shu ish joyiga oldingi arizada ishlatilgan bo'lsa rad etish."""
+    data = await state.get_data()
+    unique_id = message.document.file_unique_id
+    # Orqaga qaytib shu hujjatni qayta yuborish takror hisoblanmaydi
+    own = [(data.get(other) or {}).get("file_unique_id") for other in DOCUMENT_FIELDS if other != field]
+    if unique_id in own:
+        text = "⚠️ Bu fayl shu arizada allaqachon yuborilgan. Iltimos, kerakli hujjatni yuboring."
+    elif duplicates.has_file(unique_id, data.get("selected_tuman"), data.get("selected_job")):
+        text = "⚠️ Bu fayl shu ish joyiga oldin topshirilgan arizada ishlatilgan. Takroriy ariza qabul qilinmaydi."
+    else:
+        return False
+    await message.answer(text, reply_markup=InlineKeyboardMarkup(inline_keyboard=get_back_buttons(back_to)))
+    return True
+
+async def ask_after_document(message: types.Message, state: FSMContext, step: int, note: str = ""):
+    """`step`-hujjat qabul qilingach keyingi hujjatni (yoki pasportni) so'rash."""
+    text, back_to, next_state = DOCUMENT_NEXT[step]
+    await message.answer(text + note, reply_markup=InlineKeyboardMarkup(inline_keyboard=get_back_buttons(back_to)),
+                         parse_mode="Markdown")
+    await state.set_state(next_state)
+
+# --- Albom: bir nechta hujjat bitta xabarda ---
+@dp.message(StateFilter(*(step[0] for step in DOCUMENT_STEPS)), F.media_group_id)
+async def process_document_album(message: types.Message, state: FSMContext, album: Optional[List[types.Message]] = None):
+    """Albomdagi fayllarni joriy bosqichdan boshlab tartib bilan hujjatlarga taqsimlash, bitta javob bilan."""
+    album = album or [message]
+    current = await state.get_state()
+    first = next(i for i, step in enumerate(DOCUMENT_STEPS) if step[0].state == current)
+
+    accepted = 0
+    for part, (_, field, back_to) in zip(album, DOCUMENT_STEPS[first:]):
+        if not part.document or part.document.mime_type not in ALLOWED_MIME_TYPES:
+            allowed_extensions = ", ".join([mime.split('/')[-1] if '/' in mime else mime for mime in ALLOWED_MIME_TYPES])
+            await message.answer(
+                f"⚠️ **Xatolik!** Albomdagi {accepted + 1}-fayl (**{DOCUMENT_TITLES[first + accepted]}**) qabul qilinmadi: "
+                f"faqat **PDF, ZIP yoki RAR** fayl (ruxsat berilgan turlar: `{allowed_extensions}`) yuboring.",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=get_back_buttons(back_to)),
+                parse_mode="Markdown"
+            )
+            break
+        if await reject_duplicate_document(part, state, field, back_to):
+            break
+        info = document_info(part.document)
+        await state.update_data({field: info})
+        verifier.submit(info) # Tekshiruv fonda: arizachi kutmaydi
+        accepted += 1
+
+    if not accepted:
+        return # Xato xabari yuborildi, bosqich o'zgarmaydi
+    extra = len(album) - len(DOCUMENT_STEPS[first:])
+    note = f"\n\n_Ortiqcha {extra} ta fayl qabul qilinmadi._" if extra > 0 else ""
+    await ask_after_document(message, state, first + accepted - 1, note)
+
 # --- 1. Diplom nusxasini qabul qilish ---
 @dp.message(Form.waiting_for_diploma)
 async def process_diploma(message: types.Message, state: FSMContext):
@@ -324,22 +853,16 @@ async def process_diploma(message: types.Message, state: FSMContext):
             parse_mode="Markdown"
         )
         return
+
+    if await reject_duplicate_document(message, state, "diploma_info", "back_to_name"):
+        return
     
-    await state.update_data(diploma_info={
-        "file_id": message.document.file_id,
-        "file_name": message.document.file_name,
-    })
+    info = document_info(message.document)
+    await state.update_data(diploma_info=info)
+    verifier.submit(info) # Tekshiruv fonda: arizachi kutmaydi
     
     # Ikkinchi hujjatni so'rash (Ma'lumotnoma)
-    # Orqaga qaytish: Diplom kiritish bosqichiga
-    kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_diploma"))
-
-    await message.answer(
-        "2. Diplom qabul qilindi. Endi **ma'lumotnomangizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
-        reply_markup=kb,
-        parse_mode="Markdown"
-    )
-    await state.set_state(Form.waiting_for_reference_letter)
+    await ask_after_document(message, state, 0)
 
 # --- 2. Ma'lumotnomani qabul qilish ---
 @dp.message(Form.waiting_for_reference_letter)
@@ -354,22 +877,16 @@ async def process_reference_letter(message: types.Message, state: FSMContext):
             parse_mode="Markdown"
         )
         return
+
+    if await reject_duplicate_document(message, state, "reference_info", "back_to_diploma"):
+        return
     
-    await state.update_data(reference_info={
-        "file_id": message.document.file_id,
-        "file_name": message.document.file_name,
-    })
+    info = document_info(message.document)
+    await state.update_data(reference_info=info)
+    verifier.submit(info) # Tekshiruv fonda: arizachi kutmaydi
     
     # Uchinchi hujjatni so'rash (Menejerlik sertifikati)
-    # Orqaga qaytish: Ma'lumotnoma kiritish bosqichiga
-    kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_reference"))
-
-    await message.answer(
-        "3. Ma'lumotnoma qabul qilindi. Endi **menejerlik sertifikatingizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
-        reply_markup=kb,
-        parse_mode="Markdown"
-    )
-    await state.set_state(Form.waiting_for_manager_cert)
+    await ask_after_document(message, state, 1)
 
 # --- 3. Menejerlik sertifikatini qabul qilish ---
 @dp.message(Form.waiting_for_manager_cert)
@@ -384,110 +901,227 @@ async def process_manager_cert(message: types.Message, state: FSMContext):
             parse_mode="Markdown"
         )
         return
+
+    if await reject_duplicate_document(message, state, "manager_cert_info", "back_to_reference"):
+        return
     
-    await state.update_data(manager_cert_info={
-        "file_id": message.document.file_id,
-        "file_name": message.document.file_name,
-    })
+    info = document_info(message.document)
+    await state.update_data(manager_cert_info=info)
+    verifier.submit(info) # Tekshiruv fonda: arizachi kutmaydi
     
     # Pasport ma'lumotlarini so'rash (yakuniy bosqich)
-    # Orqaga qaytish: Sertifikat kiritish bosqichiga
-    kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_manager_cert"))
+    await ask_after_document(message, state, 2)
 
-    await message.answer(
-        "4. Barcha hujjatlar qabul qilindi. Iltimos, **pasport** ma'lumotlarini quyidagi tartibda kiriting:\n\n"
-        "**[Kim tomonidan berilgan]**\n"
-        "**[Qachongacha amal qiladi (dd.mm.yyyy)]**",
-        reply_markup=kb,
-        parse_mode="Markdown"
+# --- Arizani Admin'ga Yetkazish (Outbox orqali) ---
+
+async def document_checks(documents: List[Dict[str, Any]]) -> str:
+    """Hujjatlarni tekshirish natijalari (tayyor bo'lmasa VERIFY_WAIT gacha kutiladi)."""
+    results = await asyncio.gather(*(verifier.result(document or {}, VERIFY_WAIT) for document in documents))
+    return "\n".join(f"{title}: {result.summary() if result else 'tekshirilmadi'}"
+                     for title, result in zip(DOCUMENT_TITLES, results))
+
+async def deliver_application(application: Dict[str, Any]):
+    """Arizani admin'ga yuborish. Muvaffaqiyatsiz bo'lsa xato ko'taradi (outbox qayta urinadi)."""
+    diploma_info, reference_info, manager_cert_info = application["documents"]
+    checks = await document_checks(application["documents"])
+
+    # Admin'ga yuboriladigan yakuniy matn
+    caption = (
+        f"🔔 **Yangi Ariza!**\n\n"
+        f"🏢 **Tuman:** {application['tuman']}\n"
+        f"💼 **Ish joyi:** {application['job']}\n"
+        f"👤 **F.I.Sh.:** {application['name']}\n"
+        f"📞 **Telefon:** `{application['phone']}`\n"
+        f"📃 **Pasport:** {application['passport_info']}\n\n"
+        f"🔎 **Hujjatlar tekshiruvi:**\n{checks}\n\n"
+        f"**Yuqorida arizachining 3 ta hujjati ketma-ket biriktirilgan.**"
     )
-    await state.set_state(Form.waiting_for_passport_info)
 
-# --- 4. Pasport ma'lumotini qabul qilish va barchasini Admin'ga yuborish ---
-@dp.message(Form.waiting_for_passport_info)
-async def process_passport(message: types.Message, state: FSMContext):
-    """Pasport ma'lumotini qabul qilish, barcha ma'lumotlarni Admin'ga yuborish."""
-    if message.text == "/start":
-        await start(message, state)
-        return
-        
-    await state.update_data(passport_info=message.text)
-    
-    data = await state.get_data()
-    tuman = data.get("selected_tuman")
-    job = data.get("selected_job")
-    name = data.get("name")
-    phone = data.get("phone")
-    passport_info = data.get("passport_info")
-    
-    diploma_info = data.get("diploma_info")
-    reference_info = data.get("reference_info")
-    manager_cert_info = data.get("manager_cert_info")
-    
-    # MediaGroup uchun barcha hujjatlarni tayyorlash
+    # MediaGroup xabarining caption'i faqat birinchi hujjatga biriktirilishi kerak
     media_group = [
-        types.InputMediaDocument(
-            media=diploma_info["file_id"],
-            caption=f"📄 **1. Diplom Nusxasi:** `{diploma_info['file_name']}`"
-        ),
+        types.InputMediaDocument(media=diploma_info["file_id"], caption=caption, parse_mode="Markdown"),
         types.InputMediaDocument(
             media=reference_info["file_id"],
-            caption=f"📃 **2. Ma'lumotnoma:** `{reference_info['file_name']}`"
+            caption=f"📃 **2. Ma'lumotnoma:** `{reference_info.get('file_name') or 'nomsiz fayl'}`"
         ),
         types.InputMediaDocument(
             media=manager_cert_info["file_id"],
-            caption=f"🏆 **3. Menejerlik Sertifikati:** `{manager_cert_info['file_name']}`"
+            caption=f"🏆 **3. Menejerlik Sertifikati:** `{manager_cert_info.get('file_name') or 'nomsiz fayl'}`"
         )
     ]
 
-    # Admin'ga yuboriladigan yakuniy matn
-    caption = (
-        f"🔔 **Yangi Ariza!**\n\n"
-        f"🏢 **Tuman:** {tuman}\n"
-        f"💼 **Ish joyi:** {job}\n"
-        f"👤 **F.I.Sh.:** {name}\n"
-        f"📞 **Telefon:** `{phone}`\n"
-        f"📃 **Pasport:** {passport_info}\n\n"
-        f"**Yuqorida arizachining 3 ta hujjati ketma-ket biriktirilgan.**"
-    )
-    
-    # MediaGroup xabarining caption'i faqat birinchi hujjatga biriktirilishi kerak
-    media_group[0].caption = caption
-    media_group[0].parse_mode = "Markdown"
-    
-    admin_success = False
     try:
         # Hamma hujjatlarni bitta MediaGroup qilib yuboramiz
         await bot.send_media_group(ADMIN_ID, media=media_group)
-        admin_success = True
-        logging.info(f"Admin'ga MediaGroup muvaffaqiyatli yuborildi. User: {message.from_user.id}")
+        logging.info(f"Admin'ga MediaGroup muvaffaqiyatli yuborildi. User: {application['user_id']}")
+    except TelegramRetryAfter:
+        raise # Cheklov: outbox kutib, qayta urinadi
     except Exception as e:
         # Agar MediaGroup yuborishda xato bo'lsa (masalan, caption juda uzun bo'lsa), bittalab yuborishga urinish
         logging.error(f"Admin'ga MediaGroup yuborishda xato: {e}. Bittalab yuborishga urinish...")
-        try:
-            # 1. Matnni yuborish
-            await bot.send_message(ADMIN_ID, caption, parse_mode="Markdown")
-            # 2. Hujjatlarni bittalab yuborish
-            await bot.send_document(ADMIN_ID, diploma_info["file_id"], caption="1. Diplom")
-            await bot.send_document(ADMIN_ID, reference_info["file_id"], caption="2. Ma'lumotnoma")
-            await bot.send_document(ADMIN_ID, manager_cert_info["file_id"], caption="3. Menejerlik Sertifikati")
-            admin_success = True
-            logging.info(f"Admin'ga hujjatlar bittalab yuborildi. User: {message.from_user.id}")
-        except Exception as inner_e:
-            logging.critical(f"Admin'ga xabar yuborish butunlay muvaffaqiyatsiz tugadi: {inner_e}")
-            admin_success = False
-
-    # Foydalanuvchiga tasdiqlash xabari (Admin'ga borganidan keyin)
-    if admin_success:
+        # 1. Matnni yuborish
+        await bot.send_message(ADMIN_ID, caption, parse_mode="Markdown")
+        # 2. Hujjatlarni bittalab yuborish
+        await bot.send_document(ADMIN_ID, diploma_info["file_id"], caption="1. Diplom")
+        await bot.send_document(ADMIN_ID, reference_info["file_id"], caption="2. Ma'lumotnoma")
+        await bot.send_document(ADMIN_ID, manager_cert_info["file_id"], caption="3. Menejerlik Sertifikati")
+        logging.info(f"Admin'ga hujjatlar bittalab yuborildi. User: {application['user_id']}")
+
+# To'plab yuborish (digest)
+DIGEST_LIST_SIZE = 20 # Bitta xulosa xabaridagi arizalar (va "batafsil" tugmalari) soni
+MEDIA_GROUP_SIZE = 10 # Telegram chegarasi
+
+async def digest_mark(documents: List[Dict[str, Any]]) -> str:
+    """Hujjatlar tekshiruvining qisqa belgisi: hammasi joyida, muammo bor yoki tekshirilmagan."""
+    results = await asyncio.gather(*(verifier.result(document or {}, VERIFY_WAIT) for document in documents))
+    if any(result is not None and not result.ok for result in results):
+        return "⚠️"
+    return "✅" if all(results) else "⏳"
+
+async def deliver_digest_group(tuman: str, job: str, applications: List[Dict[str, Any]]):
+    """Bitta tuman/ish joyi arizalari: xulosa xabari(lar)i va hujjatlar imkon qadar kam media group'da."""
+    marks = await asyncio.gather(*(digest_mark(application["documents"]) for application in applications))
+    for start in range(0, len(applications), DIGEST_LIST_SIZE):
+        chunk = list(zip(applications, marks))[start:start + DIGEST_LIST_SIZE]
+        lines = [f"📦 Arizalar to'plami: {tuman} / {job} — {len(applications)} ta\n"]
+        buttons = []
+        for application, mark in chunk:
+            archive_id = application.get("archive_id")
+            line = f"{mark} #{archive_id or '?'} {application['name']} · 📞 {application['phone']}"
+            if archive_id:
+                buttons.append(InlineKeyboardButton(text=f"🔎 #{archive_id}",
+                                                    callback_data=ApplicationCallback(id=archive_id).pack()))
+            else:
+                # Arxivga yozilmagan ariza: batafsil ma'lumot shu yerning o'zida
+                line += f"\n    📃 Pasport: {application['passport_info']}"
+            lines.append(line)
+        lines.append("\n🔎 tugmasi - ariza tafsilotlari va hujjatlar tekshiruvi.")
+        kb = InlineKeyboardMarkup(inline_keyboard=[buttons[i:i + 4] for i in range(0, len(buttons), 4)])
+        await bot.send_message(ADMIN_ID, "\n".join(lines), reply_markup=kb if buttons else None)
+
+    media = []
+    for application in applications:
+        label = f"#{application['archive_id']}" if application.get("archive_id") else application["name"]
+        for title, document in zip(DOCUMENT_TITLES, application["documents"]):
+            if document:
+                media.append(types.InputMediaDocument(media=document["file_id"], caption=f"{label} · {title}"))
+    for start in range(0, len(media), MEDIA_GROUP_SIZE):
+        part = media[start:start + MEDIA_GROUP_SIZE]
+        if len(part) == 1: # Media group kamida 2 ta fayldan iborat bo'ladi
+            await bot.send_document(ADMIN_ID, part[0].media, caption=part[0].caption)
+        else:
+            await bot.send_media_group(ADMIN_ID, media=part)
+
+def digest_key(kind: str, payload: Dict[str, Any]) -> Tuple[str, str]:
+    """Outbox to'plami guruhlanadigan kalit: tuman va ish joyi (har bir guruh alohida yetkaziladi)."""
+    return payload.get("tuman"), payload.get("job")
+
+async def deliver_digest(kind: str, payloads: List[Dict[str, Any]]):
+    """Outbox to'plamidagi bitta guruhni (bir tuman/ish joyi arizalari) yetkazish."""
+    if kind != "application":
+        logging.error(f"Noma'lum outbox to'plami turi: {kind}")
+        return
+    tuman, job = digest_key(kind, payloads[0])
+    with priority(PRIORITY_HIGH):
+        await deliver_digest_group(tuman, job, payloads)
+    logging.info(f"Admin'ga {tuman} / {job} bo'yicha {len(payloads)} ta ariza to'plamda yuborildi.")
+
+async def deliver_outbox_item(kind: str, payload: Dict[str, Any]):
+    """Outbox yozuvini turiga qarab yetkazish."""
+    if kind == "application":
+        # Admin'ga arizalar boshqa so'rovlardan oldin yuboriladi
+        with priority(PRIORITY_HIGH):
+            await deliver_application(payload)
+    else:
+        logging.error(f"Noma'lum outbox yozuvi turi: {kind}")
+
+# --- 4. Pasport ma'lumotini qabul qilish va arizani navbatga qo'yish ---
+@dp.message(Form.waiting_for_passport_info)
+async def process_passport(message: types.Message, state: FSMContext):
+    """Pasport ma'lumotini qabul qilish, arizani admin'ga yuborish navbatiga qo'yish."""
+    if message.text == "/start":
+        await start(message, state)
+        return
+        
+    await state.update_data(passport_info=message.text)
+    
+    data = await state.get_data()
+    application = {
+        "user_id": message.from_user.id,
+        "tuman": data.get("selected_tuman"),
+        "job": data.get("selected_job"),
+        "name": data.get("name"),
+        "phone": data.get("phone"),
+        "passport_info": data.get("passport_info"),
+        "documents": [data.get(field) for field in DOCUMENT_FIELDS],
+    }
+
+    # Parallel topshirilgan bir xil arizalar ham shu yerda ushlanadi
+    unique_ids = [(document or {}).get("file_unique_id") for document in application["documents"]]
+    if (duplicates.has_application(application["phone"], application["tuman"], application["job"])
+            or duplicates.find_file(unique_ids, application["tuman"], application["job"])):
+        await reject_duplicate_application(message, state, data)
+        return
+    duplicates.add(application) # Darhol: parallel kelgan ikkinchi nusxa ham ushlanadi
+
+    try:
+        application["archive_id"] = await archive.add(application)
+    except Exception as e:
+        # Arxiv - qo'shimcha: ariza baribir admin'ga yetkaziladi
+        logging.error(f"Arizani arxivga yozib bo'lmadi: {e}")
+
+    try:
+        # Ariza diskka yozilgach, admin'ga yetkazish fon ishchilariga qoldiriladi
+        await outbox.enqueue("application", application)
+        enqueued = True
+    except Exception as e:
+        logging.critical(f"Arizani navbatga yozib bo'lmadi: {e}")
+        enqueued = False
+        # Ariza saqlanmadi: qayta urinish takror deb rad etilmasligi kerak
+        duplicates.remove(application)
+        if "archive_id" in application:
+            try:
+                await archive.delete(application["archive_id"])
+            except Exception as e:
+                logging.error(f"Saqlanmagan arizani arxivdan o'chirib bo'lmadi: {e}")
+
+    if enqueued:
         await message.answer("✅ Arizangiz va hujjatlaringiz qabul qilindi! **Siz bilan 48 soat ichida admin aloqaga chiqadi.** E'tiboringiz uchun rahmat.", 
                              reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="/start")]], resize_keyboard=True, one_time_keyboard=True))
-        await state.clear()
     else:
-        # Agar admin'ga hech qanday xabar yetkazilmasa (juda kamdan-kam holat)
+        # Agar ariza navbatga ham yozilmasa (juda kamdan-kam holat)
         await message.answer(f"❌ Texnik xatolik yuz berdi. Arizangiz saqlanmadi. Iltimos, /start buyrug'i orqali qayta urinib ko'ring yoki admin bilan bog'laning.",
                               reply_markup=ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="/start")]], resize_keyboard=True, one_time_keyboard=True))
+    if enqueued:
+        # Faqat navbatga yozilgan ariza sessiyani "completed" deb yopadi
+        await dp.storage.complete(state.key)
+    else:
         await state.clear()
 
+# --- Tugallanmagan Ariza Eslatmasi ---
+
+# Bosqich -> foydalanuvchidan kutilayotgan ma'lumot
+REMINDER_STEPS = {
+    Form.waiting_for_name.state: "F.I.Sh.",
+    Form.waiting_for_phone.state: "telefon raqamingiz",
+    Form.waiting_for_diploma.state: "diplom fayli",
+    Form.waiting_for_reference_letter.state: "ma'lumotnoma fayli",
+    Form.waiting_for_manager_cert.state: "menejerlik sertifikati fayli",
+    Form.waiting_for_passport_info.state: "pasport ma'lumotlari",
+}
+
+async def remind_unfinished(chat_id: int, user_id: int, state: str):
+    """Sessiya muddati tugashidan oldin arizachiga eslatma (admin holatlari uchun yuborilmaydi)."""
+    step = REMINDER_STEPS.get(state)
+    if step is None:
+        return
+    with priority(PRIORITY_LOW):
+        await bot.send_message(
+            chat_id,
+            f"⏳ Sizda tugallanmagan ariza bor. Davom ettirish uchun {step}ni yuboring "
+            "yoki qaytadan boshlash uchun /start bosing.\n\nTugallanmagan ariza tez orada o'chiriladi.",
+        )
+
 # --- Orqaga Qaytish Funksiyalari ---
 
 # Qaytish mantiqlari to'g'rilangan
@@ -510,7 +1144,8 @@ async def back_to_name(callback: types.CallbackQuery, state: FSMContext):
     # Orqaga qaytish: Ish tanlash bosqichiga
     kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"user_tuman_{tuman}")) 
 
-    await callback.message.edit_text(
+    await renderer.edit(
+        callback.message,
         f"Siz **{tuman}** tumanidagi **{job}** ish o'rnini tanladingiz.\n\n"
         "Iltimos, **F.I.Sh.**'ngizni to'liq kiriting:",
         reply_markup=kb,
@@ -531,7 +1166,7 @@ async def back_to_phone(callback: types.CallbackQuery, state: FSMContext):
         resize_keyboard=True,
         one_time_keyboard=True
     )
-    await callback.message.edit_text("Endi **telefon raqamingizni** yuboring:", reply_markup=kb, parse_mode="Markdown")
+    await renderer.edit(callback.message, "Endi **telefon raqamingizni** yuboring:", reply_markup=kb, parse_mode="Markdown")
     await state.set_state(Form.waiting_for_phone)
 
 @dp.callback_query(F.data == "back_to_diploma")
@@ -541,7 +1176,8 @@ async def back_to_diploma(callback: types.CallbackQuery, state: FSMContext):
     # Orqaga qaytish: F.I.Sh. kiritish bosqichiga
     kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_name")) # Telefon bosqichini o'tkazib yuboramiz
 
-    await callback.message.edit_text(
+    await renderer.edit(
+        callback.message,
         "📄 Hujjatlarni yuborish bosqichi:\n\n"
         "1. Iltimos, **diplomingiz nusxasini (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
         reply_markup=kb,
@@ -556,7 +1192,8 @@ async def back_to_reference(callback: types.CallbackQuery, state: FSMContext):
     # Orqaga qaytish: Diplom kiritish bosqichiga
     kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_diploma"))
 
-    await callback.message.edit_text(
+    await renderer.edit(
+        callback.message,
         "2. Endi **ma'lumotnomangizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
         reply_markup=kb,
         parse_mode="Markdown"
@@ -570,7 +1207,8 @@ async def back_to_manager_cert(callback: types.CallbackQuery, state: FSMContext)
     # Orqaga qaytish: Ma'lumotnoma kiritish bosqichiga
     kb = InlineKeyboardMarkup(inline_keyboard=get_back_buttons(f"back_to_reference"))
 
-    await callback.message.edit_text(
+    await renderer.edit(
+        callback.message,
         "3. Endi **menejerlik sertifikatingizni (PDF, ZIP yoki RAR fayl)** ko'rinishida yuboring.",
         reply_markup=kb,
         parse_mode="Markdown"
@@ -579,6 +1217,14 @@ async def back_to_manager_cert(callback: types.CallbackQuery, state: FSMContext)
 
 # --- Admin Panel Funksiyalari ---
 
+ADMIN_PANEL_TEXT = ("Admin paneliga xush kelibsiz:\n\n🔎 Arizalarni qidirish: /find <telefon | F.I.Sh. | tuman | sana | #raqam>\n"
+                    "📊 Jadvalga eksport: /export [xlsx | csv] [tuman]")
+ADMIN_PANEL_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="➕ Ish joy qo'shish", callback_data="add_job")],
+    [InlineKeyboardButton(text="📜 Mavjud ish joylari ro'yxati", callback_data="list_tumans")],
+    [InlineKeyboardButton(text="🗑️ Tuman ish joylarini tozalash", callback_data="clear_tuman_jobs")]
+])
+
 @dp.message(F.text == "/admin")
 async def admin_panel(message: types.Message, state: FSMContext):
     """Admin panel menyusini ko'rsatish."""
@@ -587,31 +1233,126 @@ async def admin_panel(message: types.Message, state: FSMContext):
         return
         
     await state.clear() 
+    await message.answer(ADMIN_PANEL_TEXT, reply_markup=ADMIN_PANEL_KEYBOARD)
 
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="➕ Ish joy qo'shish", callback_data="add_job")],
-        [InlineKeyboardButton(text="📜 Mavjud ish joylari ro'yxati", callback_data="list_tumans")],
-        [InlineKeyboardButton(text="🗑️ Tuman ish joylarini tozalash", callback_data="clear_tuman_jobs")] 
-    ])
-    await message.answer("Admin paneliga xush kelibsiz:", reply_markup=kb)
+# --- Eksport (CSV/XLSX) ---
+
+@dp.message(F.text.regexp(r"^/export(\s|$)"))
+async def export_data(message: types.Message, state: FSMContext):
+    """Arizalar va ish joylarini jadval fayl qilib yuborish: /export [xlsx|csv] [tuman]."""
+    if str(message.from_user.id) != ADMIN_ID:
+        await message.answer("Siz admin emassiz!")
+        return
+
+    args = message.text.split()[1:]
+    fmt = args.pop(0).lower() if args and args[0].lower() in ("xlsx", "csv") else "xlsx"
+    tuman = None
+    if args:
+        tuman = tuman_index(all_tumans).get(normalize_tuman(" ".join(args)))
+        if tuman is None:
+            await message.answer(f"⚠️ Noma'lum tuman: {' '.join(args)}")
+            return
+
+    await message.answer("⏳ Eksport tayyorlanmoqda...")
+    await store.refresh()
+    # Bitta o'zgarmas snapshot'dan: eksport paytida qo'shilgan ish o'rinlari faylni buzmaydi
+    snapshot = store.snapshot
+    vacancies = {t: [(snapshot.job_id(t, job), job) for job in jobs] for t, jobs in snapshot.data.items()}
+    try:
+        # Fayl executor'da yoziladi: event loop boshqa foydalanuvchilarga xizmat qilishda davom etadi
+        files = await asyncio.get_running_loop().run_in_executor(None, build_export, DB_FILE, vacancies, fmt, tuman)
+    except ImportError:
+        await message.answer("⚠️ XLSX yaratish uchun serverda `openpyxl` o'rnatilmagan. /export csv dan foydalaning.")
+        return
+    except Exception as e:
+        logging.error(f"Eksport faylini yaratishda xato: {e}")
+        await message.answer("❌ Eksport faylini yaratib bo'lmadi.")
+        return
+
+    try:
+        for path, file_name in files:
+            await message.answer_document(FSInputFile(path, filename=file_name))
+    finally:
+        for path, _ in files:
+            os.remove(path)
+
+# --- Arizalar Arxividan Qidirish ---
+
+def format_application(row: Dict[str, Any], full: bool = False) -> str:
+    """Arxiv yozuvini admin uchun matnga aylantirish."""
+    created = time.strftime("%d.%m.%Y %H:%M", time.localtime(row["created_at"]))
+    text = (f"#{row['id']} · {created}\n"
+            f"🏢 {row['tuman']} / 💼 {row['job']}\n"
+            f"👤 {row['name']} · 📞 {row['phone']}")
+    if full:
+        files = ", ".join(doc.get("file_name") or "?" for doc in row["documents"] if doc)
+        text += f"\n📃 Pasport: {row['passport_info']}\n📎 Hujjatlar: {files}"
+    return text
+
+@dp.message(F.text.regexp(r"^/find(\s|$)"))
+async def find_applications(message: types.Message, state: FSMContext):
+    """Arxivdan arizalarni qidirish: /find <so'rov>."""
+    if str(message.from_user.id) != ADMIN_ID:
+        await message.answer("Siz admin emassiz!")
+        return
+
+    query = message.text[len("/find"):].strip()
+    if not query:
+        await message.answer(
+            "🔎 Qidiruv namunalari:\n"
+            "/find 90 123 45 67 — telefon (boshi ham bo'ladi)\n"
+            "/find Aliyev — F.I.Sh.\n"
+            "/find Zomin yoki /find Zomin / 5-DMTT — tuman va ish joyi\n"
+            "/find 18.10.2026 — sana\n"
+            "/find #15 — ariza raqami (hujjatlari bilan)"
+        )
+        return
+
+    started = time.perf_counter()
+    rows = await archive.find(query, tuman_index(all_tumans))
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if not rows:
+        await message.answer(f"Hech narsa topilmadi ({elapsed:.0f} ms).")
+        return
+
+    full = len(rows) == 1
+    parts = [format_application(row, full=full) for row in rows]
+    await message.answer("\n\n".join(parts) + f"\n\n🔎 {len(rows)} ta natija ({elapsed:.0f} ms)")
+
+    if full:
+        await answer_documents(message, rows[0]["documents"])
+
+async def answer_documents(message: types.Message, documents: List[Optional[Dict[str, Any]]]):
+    """Arxivdagi ariza hujjatlarini bitta media group (yoki bitta fayl) qilib yuborish."""
+    documents = [doc for doc in documents if doc]
+    if len(documents) > 1:
+        await message.answer_media_group([types.InputMediaDocument(media=doc["file_id"]) for doc in documents])
+    elif documents:
+        await message.answer_document(documents[0]["file_id"])
+
+@dp.callback_query(ApplicationCallback.filter())
+async def application_details(callback: types.CallbackQuery, callback_data: ApplicationCallback):
+    """Arizalar to'plamidan bitta arizaning to'liq ma'lumoti va hujjatlari."""
+    if str(callback.from_user.id) != ADMIN_ID:
+        await callback.answer("Siz admin emassiz!", show_alert=True)
+        return
+    await callback.answer()
+
+    row = await archive.get(callback_data.id)
+    if row is None:
+        await callback.message.answer(f"#{callback_data.id} ariza arxivda topilmadi.")
+        return
+    checks = await document_checks(row["documents"])
+    await callback.message.answer(format_application(row, full=True) + f"\n\n🔎 Hujjatlar tekshiruvi:\n{checks}")
+    await answer_documents(callback.message, row["documents"])
 
 @dp.callback_query(F.data == "add_job")
 async def add_job(callback: types.CallbackQuery, state: FSMContext):
     """Ish joyi qo'shish uchun tumanni tanlash."""
     await callback.answer()
-    keyboard_buttons = []
-    row = []
-    for i, tuman in enumerate(all_tumans, 1):
-        row.append(InlineKeyboardButton(text=tuman, callback_data=f"admin_tuman_{tuman}"))
-        if i % 2 == 0:
-            keyboard_buttons.append(row)
-            row = []
-    if row:
-        keyboard_buttons.append(row)
-    keyboard_buttons.append([InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")])
-    
-    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text("Ish joyi qo'shmoqchi bo'lgan tumanni tanlang:", reply_markup=kb)
+    kb = admin_tumans_keyboard()
+    await renderer.edit(callback.message, "Ish joyi qo'shmoqchi bo'lgan tumanni tanlang:", reply_markup=kb)
     await state.set_state(Form.admin_select_tuman)
 
 @dp.callback_query(F.data.startswith("admin_tuman_"), Form.admin_select_tuman)
@@ -624,10 +1365,64 @@ async def admin_tuman_selected(callback: types.CallbackQuery, state: FSMContext)
     back_button = [[InlineKeyboardButton(text="⬅️ Tuman tanlash", callback_data="add_job")]] 
     kb = InlineKeyboardMarkup(inline_keyboard=back_button)
 
-    await callback.message.edit_text(f"**{tuman}** tumaniga qo'shiladigan **har bir** bog‘cha nomini **alohida SMS** qilib kiriting! (masalan: `2-DMTT` yoki `bosh o'qituvchi`)\n\n"
+    await renderer.edit(callback.message, f"**{tuman}** tumaniga qo'shiladigan **har bir** bog‘cha nomini **alohida SMS** qilib kiriting! (masalan: `2-DMTT` yoki `bosh o'qituvchi`)\n\n"
+                                     "📥 Ko'p ish joyini bir yo'la qo'shish uchun ularni **bitta xabarda har birini yangi qatordan** yozing "
+                                     "(boshqa tuman uchun: `Zomin: 5-DMTT`) yoki **CSV/XLSX** fayl yuboring (1-ustun: tuman, 2-ustun: ish joyi).\n\n"
                                      "Barcha ish joylarini kiritib bo'lgach, /admin buyrug'ini yozing.", reply_markup=kb, parse_mode="Markdown")
     await state.set_state(Form.admin_add_jobs)
 
+# --- Ommaviy Import ---
+
+IMPORT_MAX_BYTES = 20 * 1024 * 1024 # Bot API orqali yuklab olish chegarasi
+
+async def import_jobs(message: types.Message, result: ImportResult):
+    """Import natijasini omborga bitta amal bilan yozish va hisobot yuborish."""
+    added = store.add_jobs(result.items)
+    await store.flush() # Hisobot yuborilishidan oldin diskka yoziladi
+    await subscriptions.notify(tuman for tuman, _ in added)
+
+    skipped = len(result.items) - len(added) + result.duplicates
+    lines = [
+        "📥 Import yakunlandi.",
+        f"✅ Qo'shildi: {len(added)} ta",
+        f"♻️ Takroriy (o'tkazib yuborildi): {skipped} ta",
+    ]
+    for tuman, count in Counter(tuman for tuman, _ in added).items():
+        lines.append(f"   • {tuman}: +{count}")
+    if result.errors:
+        lines.append(f"⚠️ Xato qatorlar: {len(result.errors)} ta")
+        lines.extend(f"   • {error}" for error in result.errors[:MAX_ERRORS_SHOWN])
+    lines.append("\nYana ish joyi kiriting yoki /admin buyrug'ini yozing.")
+    await message.answer("\n".join(lines))
+
+@dp.message(Form.admin_add_jobs, F.document)
+async def admin_import_jobs_file(message: types.Message, state: FSMContext):
+    """Admin yuborgan CSV/XLSX fayldan ish joylarini import qilish."""
+    file_name = message.document.file_name or ""
+    if not file_name.lower().endswith((".csv", ".xlsx")):
+        await message.answer("⚠️ Faqat CSV yoki XLSX fayl qabul qilinadi (1-ustun: tuman, 2-ustun: ish joyi).")
+        return
+    if (message.document.file_size or 0) > IMPORT_MAX_BYTES:
+        await message.answer("⚠️ Fayl juda katta (20 MB dan oshmasligi kerak).")
+        return
+
+    data = await state.get_data()
+    buffer = io.BytesIO()
+    await bot.download(message.document, destination=buffer)
+    try:
+        # Tahlil executor'da: katta fayl event loop'ni to'xtatmaydi
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, parse_file, file_name, buffer.getvalue(), data.get("tuman"), tuman_index(all_tumans)
+        )
+    except ImportError:
+        await message.answer("⚠️ XLSX faylni o'qish uchun serverda `openpyxl` o'rnatilmagan. CSV yuboring.")
+        return
+    except Exception as e:
+        logging.error(f"Import faylini o'qishda xato: {e}")
+        await message.answer("⚠️ Faylni o'qib bo'lmadi. Formatini tekshiring.")
+        return
+    await import_jobs(message, result)
+
 @dp.message(Form.admin_add_jobs)
 async def admin_add_jobs_message(message: types.Message, state: FSMContext):
     """Admin kiritgan ish joylarini saqlash."""
@@ -635,104 +1430,99 @@ async def admin_add_jobs_message(message: types.Message, state: FSMContext):
         await admin_panel(message, state)
         return
         
-    global vacancies
     data = await state.get_data()
     tuman = data.get("tuman")
     
-    job_name = message.text.strip()
+    job_name = (message.text or "").strip()
+
+    if "\n" in job_name:
+        # Ko'p qatorli xabar: ommaviy import
+        await import_jobs(message, parse_text(job_name, tuman, tuman_index(all_tumans)))
+        return
 
     if not job_name:
         await message.answer("Ish joyi nomini kiritmadingiz. Qayta urinib ko'ring.")
         return
 
-    if tuman not in vacancies:
-        vacancies[tuman] = []
-        
-    if job_name in vacancies[tuman]:
+    if not store.add_job(tuman, job_name):
         await message.answer(f"⚠️ **{tuman}** tumaniga **{job_name}** allaqachon qo'shilgan. Boshqa nom kiriting yoki tugatish uchun /admin yozing.", parse_mode="Markdown")
         return
+    # Ketma-ket qo'shilgan ish o'rinlari obunachilarga bitta xabar bo'lib boradi
+    await subscriptions.notify([tuman])
 
-    vacancies[tuman].append(job_name)
-    save_data(vacancies)
-    
     await message.answer(f"✅ **{tuman}** tumaniga ish joyi: **{job_name}** muvaffaqiyatli qo‘shildi. Yana bir ish joyi nomini kiriting yoki /admin buyrug'ini yozing.", parse_mode="Markdown")
 
+async def show_admin_list_page(callback: types.CallbackQuery, page: int):
+    """Mavjud ish joylari ro'yxatining bitta sahifasini ko'rsatish."""
+    await callback.answer()
+    await store.refresh() # Fayl tashqaridan o'zgargan bo'lsagina qayta o'qiladi
+
+    pages = admin_list_pages()
+    page = min(max(page, 0), len(pages) - 1)
+
+    keyboard_buttons = []
+    if len(pages) > 1:
+        keyboard_buttons.append(page_nav_row(page, len(pages), lambda p: AdminListCallback(page=p).pack()))
+    keyboard_buttons.append([InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")])
+    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+    
+    await renderer.edit(callback.message, pages[page], parse_mode="Markdown", reply_markup=kb)
+
 @dp.callback_query(F.data == "list_tumans")
 async def list_tumans(callback: types.CallbackQuery):
     """Mavjud barcha ish joylarini ro'yxatini ko'rsatish."""
-    await callback.answer()
-    global vacancies
-    vacancies = load_data() 
+    await show_admin_list_page(callback, 0)
 
-    text = "Tumanlar va mavjud ish joylari ro'yxati:\n\n"
-    
-    if not vacancies or all(not jobs for jobs in vacancies.values()):
-        text = "Hozircha hech qaysi tumanda ish joylari mavjud emas."
-    else:
-        for tuman in all_tumans:
-            jobs = vacancies.get(tuman)
-            if jobs:
-                jobs_list = "\n * " + "\n * ".join(sorted(jobs))
-                text += f"**{tuman}** ({len(jobs)} ta):{jobs_list}\n"
-            else:
-                text += f"**{tuman}**: _Ish joyi yo'q._\n"
-                
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")]
-    ])
-    
-    await callback.message.edit_text(text, parse_mode="Markdown", reply_markup=kb)
+@dp.callback_query(AdminListCallback.filter())
+async def list_tumans_page(callback: types.CallbackQuery, callback_data: AdminListCallback):
+    """Ro'yxat sahifalari orasida o'tish."""
+    await show_admin_list_page(callback, callback_data.page)
 
 @dp.callback_query(F.data == "go_to_admin_panel")
 async def go_to_admin_panel_handler(callback: types.CallbackQuery, state: FSMContext):
-    """Admin paneliga qaytish uchun tugma ishlashi."""
+    """Admin paneliga qaytish: joriy xabar admin menyusiga tahrirlanadi."""
     await callback.answer()
-    await admin_panel(callback.message, state)
+    if str(callback.from_user.id) != ADMIN_ID:
+        return
+    await state.clear()
+    await renderer.edit(callback.message, ADMIN_PANEL_TEXT, reply_markup=ADMIN_PANEL_KEYBOARD)
     
 @dp.callback_query(F.data == "clear_tuman_jobs")
 async def clear_tuman_jobs_selection(callback: types.CallbackQuery, state: FSMContext):
     """Ish joylarini tozalash uchun tuman tanlash."""
     await callback.answer()
-    global vacancies
-    vacancies = load_data()
-    
-    available_tumans = [tuman for tuman, jobs in vacancies.items() if jobs]
+    await store.refresh() # Fayl tashqaridan o'zgargan bo'lsagina qayta o'qiladi
 
-    if not available_tumans:
+    kb = clear_tumans_keyboard()
+
+    if kb is None:
         kb = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")]
         ])
-        await callback.message.edit_text("Hozircha hech qaysi tumanda ish joylari mavjud emas. Tozalash uchun ma'lumot yo'q.", reply_markup=kb)
+        await renderer.edit(callback.message, "Hozircha hech qaysi tumanda ish joylari mavjud emas. Tozalash uchun ma'lumot yo'q.", reply_markup=kb)
         return
 
-    keyboard_buttons = []
-    row = []
-    for i, tuman in enumerate(available_tumans, 1):
-        row.append(InlineKeyboardButton(text=f"🗑️ {tuman}", callback_data=f"confirm_clear_{tuman}"))
-        if i % 2 == 0:
-            keyboard_buttons.append(row)
-            row = []
-    if row:
-        keyboard_buttons.append(row)
-
-    keyboard_buttons.append([InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")])
-    
-    kb = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-    await callback.message.edit_text("Ish joylarini tozalash (o'chirish) uchun tumanni tanlang:", reply_markup=kb)
+    await renderer.edit(callback.message, "Ish joylarini tozalash (o'chirish) uchun tumanni tanlang:", reply_markup=kb)
     await state.set_state(Form.admin_select_tuman_to_clear) 
 
 @dp.callback_query(F.data.startswith("confirm_clear_"), Form.admin_select_tuman_to_clear)
 async def confirm_clear_tuman_jobs(callback: types.CallbackQuery, state: FSMContext):
     """Ish joylarini tozalashni tasdiqlash."""
     await callback.answer()
-    tuman = callback.data.replace("confirm_clear_", "")
+    await ask_clear_confirmation(callback, state, callback.data.replace("confirm_clear_", ""))
+
+async def ask_clear_confirmation(callback: types.CallbackQuery, state: FSMContext, tuman: str):
+    """Tozalashni tasdiqlash xabari (ko'rsatilgan son bilan birga snapshot versiyasi saqlanadi)."""
+    snapshot = store.snapshot
+    # Tasdiqlash paytidagi versiya: o'chirishgacha tuman o'zgarsa, qayta so'raladi
+    await state.update_data(clear_tuman=tuman, clear_version=snapshot.version)
     
     kb = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="✅ Ha, tozalash", callback_data=f"do_clear_{tuman}")],
         [InlineKeyboardButton(text="❌ Yo'q, qaytish", callback_data="clear_tuman_jobs")] 
     ])
 
-    await callback.message.edit_text(f"⚠️ **DIQQAT!** Siz **{tuman}** tumanidagi barcha ({len(vacancies.get(tuman, []))} ta) ish joylarini **butunlay o'chirmoqchisiz**.\n\n"
+    await renderer.edit(callback.message, f"⚠️ **DIQQAT!** Siz **{tuman}** tumanidagi barcha ({len(snapshot.jobs(tuman))} ta) ish joylarini **butunlay o'chirmoqchisiz**.\n\n"
                                      "Tasdiqlaysizmi?", reply_markup=kb, parse_mode="Markdown")
 
 
@@ -740,33 +1530,79 @@ async def confirm_clear_tuman_jobs(callback: types.CallbackQuery, state: FSMCont
 async def do_clear_tuman_jobs(callback: types.CallbackQuery, state: FSMContext):
     """Tanlangan tuman ish joylarini o'chirish."""
     await callback.answer()
-    global vacancies
     tuman = callback.data.replace("do_clear_", "")
+    data = await state.get_data()
+    confirmed = data.get("clear_version") if data.get("clear_tuman") == tuman else None
 
-    if tuman in vacancies:
-        cleared_jobs_count = len(vacancies[tuman])
-        vacancies[tuman] = [] 
-        save_data(vacancies)
+    if confirmed is None or store.snapshot.changed_at(tuman) > confirmed:
+        # Tasdiqlangandan keyin ish o'rinlari qo'shilgan/o'chirilgan (yoki eski tugma)
+        await state.set_state(Form.admin_select_tuman_to_clear)
+        await ask_clear_confirmation(callback, state, tuman)
+        await callback.message.answer("ℹ️ Ro'yxat tasdiqlangandan keyin o'zgardi. Yangi sonni tekshirib, qayta tasdiqlang.")
+        return
+
+    if store.snapshot.jobs(tuman):
+        cleared_jobs_count = store.clear_tuman(tuman)
 
         kb = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")]
         ])
         
-        await callback.message.edit_text(f"✅ **{tuman}** tumanidan **{cleared_jobs_count}** ta ish joyi muvaffaqiyatli tozalandi.", reply_markup=kb, parse_mode="Markdown")
+        await renderer.edit(callback.message, f"✅ **{tuman}** tumanidan **{cleared_jobs_count}** ta ish joyi muvaffaqiyatli tozalandi.", reply_markup=kb, parse_mode="Markdown")
     else:
         kb = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(text="⬅️ Admin Panel", callback_data="go_to_admin_panel")]
         ])
-        await callback.message.edit_text(f"⚠️ **{tuman}** tumanida tozalash uchun ish joylari topilmadi.", reply_markup=kb, parse_mode="Markdown")
+        await renderer.edit(callback.message, f"⚠️ **{tuman}** tumanida tozalash uchun ish joylari topilmadi.", reply_markup=kb, parse_mode="Markdown")
 
     await state.clear()
 
 
+# --- Botni Ishga Tushirish / To'xtatish ---
+
+@dp.startup()
+async def on_startup():
+    """Takroriy arizalar indeksini qurish, fon ishchilarini ishga tushirish."""
+    global metrics_runner
+    await duplicates.rebuild(archive)
+    logging.info(f"Takroriy arizalar indeksi qurildi: {len(duplicates)} ta ariza.")
+    verifier.start()
+    outbox.start(deliver_outbox_item, deliver_digest, digest_key)
+    subscriptions.start(send_vacancy_notice, has_jobs)
+    dp.storage.start(remind_unfinished)
+    watcher.start()
+    if config.get("metrics"):
+        # Prometheus uchun alohida port (webhook manzilidan ajratilgan)
+        settings = config["metrics"]
+        metrics_runner = await metrics.start_server(settings.get("host", "127.0.0.1"), int(settings.get("port", 9100)))
+
+@dp.shutdown()
+async def on_shutdown():
+    """Bot to'xtashida fon ishchilarini to'xtatish va buferdagi o'zgarishlarni diskka yozish."""
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await watcher.close()
+    await outbox.close()
+    await verifier.close()
+    await subscriptions.close()
+    await archive.close()
+    await store.close()
+
+
+async def run_polling():
+    """Long polling rejimi (avval o'rnatilgan webhook o'chiriladi)."""
+    await bot.delete_webhook(drop_pending_updates=False)
+    await dp.start_polling(bot)
+
+
 if __name__ == "__main__":
-    # Botni ishga tushirish
+    # Botni ishga tushirish: config.json dagi "mode" - "polling" (standart) yoki "webhook"
     try:
         logging.info("Bot ishga tushirilmoqda...")
-        asyncio.run(dp.start_polling(bot))
+        if config.get("mode", "polling") == "webhook":
+            run_webhook(dp, bot, config["webhook"])
+        else:
+            asyncio.run(run_polling())
     except (KeyboardInterrupt, SystemExit):
         logging.info("Bot qo'lda to'xtatildi.")
     except Exception as e:
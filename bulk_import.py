@@ -0,0 +1,136 @@
+import csv
+import io
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# --- Ish O'rinlarini Ommaviy Import Qilish ---
+#
+# Admin bir xabarda ko'p qatorli ro'yxat yoki CSV/XLSX fayl yuborishi mumkin.
+# Har bir qator: "Tuman: ish o'rni" (ajratgich ":" ";" yoki tab) yoki faqat
+# "ish o'rni" (u holda admin tanlagan tumanga qo'shiladi). CSV/XLSX'da
+# birinchi ustun - tuman, ikkinchisi - ish o'rni (bitta ustun bo'lsa - faqat
+# ish o'rni). Qatorlar oqim ko'rinishida o'qiladi, takrorlar to'plam (set)
+# orqali tashlab ketiladi, noma'lum tumanlar xato sifatida sanaladi.
+
+SEPARATORS = (":", ";", "\t")
+APOSTROPHES = "ʻʼ‘’`´"
+MAX_ERRORS_SHOWN = 5
+
+
+def normalize_tuman(name: str) -> str:
+    """Tuman nomini solishtirish uchun: kichik harf, apostrof turlari bir xil."""
+    for ch in APOSTROPHES:
+        name = name.replace(ch, "'")
+    return " ".join(name.split()).casefold()
+
+
+def tuman_index(all_tumans: Iterable[str]) -> Dict[str, str]:
+    """Normallashtirilgan nom -> asl tuman nomi. "tumani" qo'shimchasi bilan ham, usiz ham topiladi."""
+    index = {}
+    for tuman in all_tumans:
+        key = normalize_tuman(tuman)
+        index[key] = tuman
+        if key.endswith(" tumani"):
+            index[key[:-len(" tumani")]] = tuman
+        else:
+            index.setdefault(key + " tumani", tuman)
+    return index
+
+
+class ImportResult:
+    """Import natijasi: qo'shiladigan juftliklar va xato qatorlar."""
+
+    __slots__ = ("items", "duplicates", "errors", "_seen")
+
+    def __init__(self):
+        self.items: List[Tuple[str, str]] = []
+        self.duplicates = 0
+        self.errors: List[str] = []
+        self._seen: Set[Tuple[str, str]] = set()
+
+    def add(self, tuman: str, job: str):
+        key = (tuman, job)
+        if key in self._seen:
+            self.duplicates += 1
+            return
+        self._seen.add(key)
+        self.items.append(key)
+
+
+def _resolve(tuman: str, index: Dict[str, str]) -> Optional[str]:
+    return index.get(normalize_tuman(tuman))
+
+
+def parse_rows(rows: Iterable[List[str]], default_tuman: Optional[str], index: Dict[str, str]) -> ImportResult:
+    """(tuman, ish o'rni) yoki (ish o'rni,) qatorlarini tekshirib yig'ish."""
+    result = ImportResult()
+    for line_no, row in enumerate(rows, 1):
+        cells = [str(cell).strip() for cell in row if cell is not None and str(cell).strip()]
+        if not cells:
+            continue
+        if len(cells) == 1:
+            tuman, job = default_tuman, cells[0]
+        else:
+            tuman, job = _resolve(cells[0], index), " ".join(cells[1:])
+            if tuman is None:
+                if line_no == 1 and normalize_tuman(cells[0]) == "tuman":
+                    continue # Sarlavha qatori
+                result.errors.append(f"{line_no}-qator: noma'lum tuman \"{cells[0]}\"")
+                continue
+        if tuman is None:
+            result.errors.append(f"{line_no}-qator: tuman ko'rsatilmagan")
+            continue
+        result.add(tuman, job)
+    return result
+
+
+def split_line(line: str, index: Dict[str, str]) -> List[str]:
+    """Matn qatorini ["tuman", "ish o'rni"] yoki ["ish o'rni"] ga ajratish."""
+    first = None
+    for sep in SEPARATORS:
+        head, found, tail = line.partition(sep)
+        if not (found and head.strip() and tail.strip()):
+            continue
+        # Oldingi qismi haqiqiy tuman bo'lgan ajratgich afzal ("Zomin; 5-DMTT: 0,5 stavka")
+        if _resolve(head, index) is not None:
+            return [head, tail]
+        first = first or [head, tail]
+    # Tuman topilmadi: noto'g'ri yozilgan tuman parse_rows'da xato bo'lib chiqadi
+    return first or [line]
+
+
+def parse_text(text: str, default_tuman: Optional[str], index: Dict[str, str]) -> ImportResult:
+    """Ko'p qatorli xabarni tahlil qilish."""
+    return parse_rows((split_line(line, index) for line in text.splitlines()), default_tuman, index)
+
+
+def iter_csv_rows(data: bytes) -> Iterator[List[str]]:
+    """CSV faylni qatorma-qator o'qish (ajratgich avtomatik aniqlanadi)."""
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def iter_xlsx_rows(data: bytes) -> Iterator[List[str]]:
+    """XLSX faylning birinchi varag'ini qatorma-qator o'qish (openpyxl kerak)."""
+    from openpyxl import load_workbook # Ixtiyoriy kutubxona: faqat XLSX uchun kerak
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield ["" if cell is None else cell for cell in row]
+    finally:
+        workbook.close()
+
+
+def parse_file(file_name: str, data: bytes, default_tuman: Optional[str], index: Dict[str, str]) -> ImportResult:
+    """CSV yoki XLSX faylni tahlil qilish (executor'da chaqiriladi)."""
+    if file_name.lower().endswith(".xlsx"):
+        rows = iter_xlsx_rows(data)
+    else:
+        rows = iter_csv_rows(data)
+    return parse_rows(rows, default_tuman, index)
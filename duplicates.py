@@ -0,0 +1,68 @@
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from archive import Archive, normalize_phone
+
+# --- Takroriy Arizalarni Aniqlash ---
+#
+# Bir xil telefon raqami bilan bitta ish joyiga qayta-qayta ariza topshirish
+# admin'ga ortiqcha xabarlar yuboradi. Xotiradagi ikkita to'plam (set) har
+# ishga tushishda arxivdan qayta quriladi va tekshiruv O(1) da bajariladi:
+#
+# - (telefon, tuman, ish joyi) - shu raqamdan shu ish joyiga ariza bor;
+# - (file_unique_id, tuman, ish joyi) - shu fayl shu ish joyiga yuborilgan
+#   (raqamni o'zgartirib qayta topshirishni ushlaydi). Bitta hujjat boshqa
+#   ish joyiga yuborilishi mumkin.
+#
+# Bir nechta bot jarayoni bo'lsa, har biri faqat o'zi qabul qilgan yangi
+# arizalarni ko'radi (qolganlari keyingi ishga tushishda qo'shiladi).
+
+Key = Tuple[str, str, str]
+
+
+class DuplicateIndex:
+    """Arxivdan quriladigan takroriy ariza va hujjatlar indeksi."""
+
+    def __init__(self):
+        self._applications: Set[Key] = set()
+        self._files: Set[Key] = set()
+
+    def __len__(self) -> int:
+        return len(self._applications)
+
+    async def rebuild(self, archive: Archive):
+        """Indeksni arxivdagi barcha arizalardan qayta qurish."""
+        applications: Set[Key] = set()
+        files: Set[Key] = set()
+        for phone_norm, tuman, job, unique_ids in await archive.keys():
+            if phone_norm:
+                applications.add((phone_norm, tuman, job))
+            files.update((unique_id, tuman, job) for unique_id in unique_ids)
+        self._applications, self._files = applications, files
+
+    def has_application(self, phone: Optional[str], tuman: str, job: str) -> bool:
+        phone_norm = normalize_phone(phone)
+        return bool(phone_norm) and (phone_norm, tuman, job) in self._applications
+
+    def has_file(self, unique_id: Optional[str], tuman: str, job: str) -> bool:
+        return bool(unique_id) and (unique_id, tuman, job) in self._files
+
+    def find_file(self, unique_ids: Iterable[Optional[str]], tuman: str, job: str) -> bool:
+        return any(self.has_file(unique_id, tuman, job) for unique_id in unique_ids)
+
+    def add(self, application: Dict[str, Any]):
+        """Qabul qilingan arizani indeksga qo'shish."""
+        tuman, job = application.get("tuman"), application.get("job")
+        phone_norm = normalize_phone(application.get("phone"))
+        if phone_norm:
+            self._applications.add((phone_norm, tuman, job))
+        for document in application.get("documents") or []:
+            if document and document.get("file_unique_id"):
+                self._files.add((document["file_unique_id"], tuman, job))
+
+    def remove(self, application: Dict[str, Any]):
+        """add() ni bekor qilish (ariza saqlanmay qolgan bo'lsa, qayta topshirish rad etilmasin)."""
+        tuman, job = application.get("tuman"), application.get("job")
+        self._applications.discard((normalize_phone(application.get("phone")), tuman, job))
+        for document in application.get("documents") or []:
+            if document and document.get("file_unique_id"):
+                self._files.discard((document["file_unique_id"], tuman, job))
@@ -0,0 +1,139 @@
+import csv
+import datetime
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# --- Arizalar va Ish O'rinlarini Eksport Qilish (CSV/XLSX) ---
+#
+# Qatorlar generator orqali bazadan FETCH_SIZE tadan o'qiladi va darhol
+# vaqtinchalik faylga yoziladi, shuning uchun xotira sarfi qatorlar soniga
+# bog'liq emas. Funksiyalar executor oqimida chaqiriladi (event loop
+# to'xtamaydi): baza bilan alohida, faqat o'qish uchun ulanish ochiladi.
+
+FETCH_SIZE = 1000
+# Jadval dasturlari shu belgilar bilan boshlangan matnni formula deb o'qiydi
+# (arizachi kiritgan F.I.Sh./pasport orqali formula kiritish mumkin bo'lmasin).
+# "+"/"-" dan keyin faqat raqamlar kelsa (telefon, manfiy son) - formula emas.
+FORMULA_PREFIXES = ("=", "+", "-", "@")
+PLAIN_NUMBER = re.compile(r"[+-][\d\s.,()-]*")
+
+APPLICATION_HEADER = ["ID", "Sana", "Tuman", "Ish joyi", "F.I.Sh.", "Telefon", "Pasport",
+                      "Diplom", "Ma'lumotnoma", "Menejerlik sertifikati"]
+VACANCY_HEADER = ["ID", "Tuman", "Ish joyi"]
+
+Sheet = Tuple[str, List[str], Iterator[Sequence[Any]]]
+
+
+def iter_applications(db_path: str, tuman: Optional[str] = None) -> Iterator[List[Any]]:
+    """Arxivdagi arizalar: tuman, ish joyi, sana tartibida (indeks bo'yicha)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        where, params = ("WHERE tuman = ?", (tuman,)) if tuman else ("", ())
+        cur = conn.execute(
+            "SELECT id, created_at, tuman, job, name, phone, passport_info, documents FROM applications "
+            f"{where} ORDER BY tuman, job, created_at",
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for app_id, created_at, app_tuman, job, name, phone, passport_info, documents in rows:
+                files = [(doc or {}).get("file_name", "") for doc in json.loads(documents)]
+                files += [""] * (3 - len(files))
+                created = datetime.datetime.fromtimestamp(created_at).strftime("%d.%m.%Y %H:%M")
+                yield [app_id, created, app_tuman, job, name, phone, passport_info, *files[:3]]
+    except sqlite3.OperationalError:
+        return # Arxiv hali yaratilmagan
+    finally:
+        conn.close()
+
+
+def iter_vacancies(vacancies: Dict[str, List[Tuple[int, str]]], tuman: Optional[str] = None) -> Iterator[List[Any]]:
+    """Ish o'rinlari: {tuman: [(id, nom), ...]} nusxasidan."""
+    for name in sorted(vacancies):
+        if tuman and name != tuman:
+            continue
+        for job_id, job in vacancies[name]:
+            yield [job_id, name, job]
+
+
+def _is_formula_like(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PLAIN_NUMBER.fullmatch(value)
+
+
+def _csv_safe(value: Any) -> Any:
+    """Formulaga o'xshash matn oldiga "'" qo'shiladi - Excel uni oddiy matn sifatida ko'rsatadi."""
+    return "'" + value if _is_formula_like(value) else value
+
+
+def write_csv(path: str, header: List[str], rows: Iterator[Sequence[Any]]):
+    # utf-8-sig: Excel o'zbekcha harflarni to'g'ri ochishi uchun
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows([_csv_safe(value) for value in row] for row in rows)
+
+
+def write_xlsx(path: str, sheets: List[Sheet]):
+    """Har bir varaq qatorma-qator yoziladi (openpyxl write_only rejimi)."""
+    from openpyxl import Workbook # Ixtiyoriy kutubxona: faqat XLSX uchun kerak
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        sheet.append(header)
+        for row in rows:
+            cells = []
+            for value in row:
+                if _is_formula_like(value):
+                    # openpyxl "=" bilan boshlangan matnni formula qilib saqlaydi: turini matnga majburlaymiz
+                    value = WriteOnlyCell(sheet, value)
+                    value.data_type = "s"
+                cells.append(value)
+            sheet.append(cells)
+    workbook.save(path)
+
+
+def _temp_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="export_", suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def build_export(db_path: str, vacancies: Dict[str, List[Tuple[int, str]]], fmt: str,
+                 tuman: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Eksport fayllarini yaratish. [(vaqtinchalik fayl yo'li, yuboriladigan nom)] qaytaradi."""
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M")
+    suffix = f"_{tuman}" if tuman else ""
+    if fmt == "xlsx":
+        path = _temp_path(".xlsx")
+        try:
+            write_xlsx(path, [
+                ("Arizalar", APPLICATION_HEADER, iter_applications(db_path, tuman)),
+                ("Ish joylari", VACANCY_HEADER, iter_vacancies(vacancies, tuman)),
+            ])
+        except BaseException:
+            os.remove(path)
+            raise
+        return [(path, f"eksport{suffix}_{stamp}.xlsx")]
+
+    files = []
+    try:
+        for name, header, rows in (
+            ("arizalar", APPLICATION_HEADER, iter_applications(db_path, tuman)),
+            ("ish_joylari", VACANCY_HEADER, iter_vacancies(vacancies, tuman)),
+        ):
+            path = _temp_path(".csv")
+            files.append((path, f"{name}{suffix}_{stamp}.csv"))
+            write_csv(path, header, rows)
+    except BaseException:
+        for path, _ in files:
+            os.remove(path)
+        raise
+    return files
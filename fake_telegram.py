@@ -0,0 +1,215 @@
+"""Yuklama testlari uchun soxta Telegram Bot API serveri (aiohttp).
+
+bot.py ishlatadigan metodlarni (getMe, getUpdates, sendMessage, editMessageText,
+sendMediaGroup, sendDocument, answerCallbackQuery, deleteMessage, getFile, ...)
+va fayl yuklab olishni (/file/bot<token>/<path>) taqlid qiladi. Yangilanishlar
+`push_update()` bilan navbatga qo'yiladi, bot yuborgan xabarlar esa chat
+bo'yicha navbatlarda (`outgoing(chat_id)`) yig'iladi. Yuklab olinadigan fayl
+tarkibi `files[file_id]` da beriladi, bo'lmasa kichik to'g'ri PDF qaytadi.
+Sun'iy kechikish (latency, jitter) va tasodifiy 429 javoblari qo'shish mumkin.
+
+Alohida ishga tushirish (bot config.json'da "api_server": "http://127.0.0.1:8081"):
+    python fake_telegram.py --port 8081 --latency 0.05 --rate-429 0.01
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+DEFAULT_PORT = 8081
+BOT_INFO = {"id": 42, "is_bot": True, "first_name": "Fake", "username": "fake_vakansiya_bot",
+            "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": True}
+MAX_UPDATES = 100
+DEFAULT_FILE = b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog >>\nendobj\ntrailer\n<< /Root 1 0 R >>\n%%EOF\n"
+
+
+class FakeTelegram:
+    """Bot API'ning yuklama testi uchun yetarli qismi."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.injected_429 = 0
+        self._updates: List[Dict[str, Any]] = []
+        self._update_id = itertools.count(1)
+        self._message_id = itertools.count(1)
+        self._has_updates = asyncio.Event()
+        self._outgoing: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._runner: Optional[web.AppRunner] = None
+        self.files: Dict[str, bytes] = {} # file_id -> yuklab olinadigan tarkib
+        self.handlers = {
+            "getMe": self._get_me,
+            "getUpdates": self._get_updates,
+            "sendMessage": self._send_message,
+            "editMessageText": self._edit_message_text,
+            "sendMediaGroup": self._send_media_group,
+            "sendDocument": self._send_document,
+            "getFile": self._get_file,
+        }
+
+    # --- Test tomoni ---
+
+    def push_update(self, update: Dict[str, Any]) -> int:
+        """Botga yangilanish yuborish (update_id avtomatik qo'yiladi)."""
+        update_id = next(self._update_id)
+        self._updates.append({"update_id": update_id, **update})
+        self._has_updates.set()
+        return update_id
+
+    def outgoing(self, chat_id: int) -> asyncio.Queue:
+        """Bot shu chatga yuborgan xabarlar navbati: {"method", "text", "reply_markup", ...}."""
+        return self._outgoing[chat_id]
+
+    # --- Javoblar ---
+
+    def _message(self, chat_id: Any, text: Optional[str] = None, message_id: Optional[int] = None,
+                 **extra: Any) -> Dict[str, Any]:
+        message = {
+            "message_id": message_id or next(self._message_id),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": BOT_INFO,
+            **extra,
+        }
+        if text is not None:
+            message["text"] = text
+        return message
+
+    def _record(self, method: str, params: Dict[str, Any], **extra: Any):
+        chat_id = params.get("chat_id")
+        if chat_id is None:
+            return
+        markup = params.get("reply_markup")
+        self._outgoing[int(chat_id)].put_nowait({
+            "method": method,
+            "text": params.get("text") or params.get("caption"),
+            "reply_markup": json.loads(markup) if isinstance(markup, str) else markup,
+            **extra,
+        })
+
+    async def _get_me(self, params: Dict[str, Any]) -> Any:
+        return BOT_INFO
+
+    async def _get_updates(self, params: Dict[str, Any]) -> Any:
+        offset = int(params.get("offset") or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout=float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:MAX_UPDATES]
+
+    async def _send_message(self, params: Dict[str, Any]) -> Any:
+        self._record("sendMessage", params)
+        return self._message(params["chat_id"], params.get("text"))
+
+    async def _edit_message_text(self, params: Dict[str, Any]) -> Any:
+        self._record("editMessageText", params)
+        return self._message(params["chat_id"], params.get("text"), message_id=int(params.get("message_id") or 0))
+
+    async def _send_media_group(self, params: Dict[str, Any]) -> Any:
+        media = json.loads(params["media"])
+        self._record("sendMediaGroup", {"chat_id": params["chat_id"], "caption": media[0].get("caption")},
+                     count=len(media))
+        return [self._message(params["chat_id"], document={"file_id": item["media"], "file_unique_id": item["media"]})
+                for item in media]
+
+    async def _send_document(self, params: Dict[str, Any]) -> Any:
+        self._record("sendDocument", params)
+        document = params.get("document")
+        return self._message(params["chat_id"], document={"file_id": str(document), "file_unique_id": str(document)})
+
+    async def _get_file(self, params: Dict[str, Any]) -> Any:
+        file_id = params["file_id"]
+        return {"file_id": file_id, "file_unique_id": file_id, "file_path": file_id,
+                "file_size": len(self.files.get(file_id, DEFAULT_FILE))}
+
+    # --- HTTP ---
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params: Dict[str, Any] = dict(await request.post())
+
+        if method != "getUpdates":
+            if self.latency or self.jitter:
+                await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+            if self.rate_429 and random.random() < self.rate_429:
+                self.injected_429 += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                })
+
+        handler = self.handlers.get(method)
+        result = await handler(params) if handler else True # answerCallbackQuery, deleteMessage, ...
+        return web.json_response({"ok": True, "result": result})
+
+    async def download(self, request: web.Request) -> web.Response:
+        """Fayl yuklab olish: getFile qaytargan file_path (= file_id) bo'yicha."""
+        self.calls["download"] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        return web.Response(body=self.files.get(request.match_info["path"], DEFAULT_FILE),
+                            content_type="application/octet-stream")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/file/bot{token}/{path:.+}", self.download)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> str:
+        """Serverni ishga tushirish, bazaviy URL ni qaytaradi."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        # Kutib turgan getUpdates so'rovlari yopilishi uchun
+        self._has_updates.set()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soxta Telegram Bot API serveri")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="har bir so'rovga qo'shiladigan kechikish (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="kechikishning tasodifiy o'zgarishi (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 javobi ehtimoli (0..1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 dagi retry_after (s)")
+    args = parser.parse_args()
+
+    async def serve():
+        fake = FakeTelegram(args.latency, args.jitter, args.rate_429, args.retry_after)
+        print(f"Soxta Bot API: {await fake.start(args.host, args.port)}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await fake.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
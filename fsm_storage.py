@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+import metrics
+
+# --- SQLite asosidagi FSM Ombori ---
+#
+# MemoryStorage o'rniga: foydalanuvchi bosqichi (state) va yig'ilgan ma'lumotlar
+# SQLite faylida (WAL rejimida) saqlanadi, shuning uchun bot qayta ishga
+# tushganda yarim to'ldirilgan arizalar yo'qolmaydi.
+#
+# - O'qish: jarayon ichidagi keshdan, bo'lmasa bazadan (executor'da).
+# - Yozish: keshga darhol, bazaga esa FLUSH_DELAY ichida yig'ilgan barcha
+#   o'zgarishlar bitta tranzaksiyada yoziladi.
+# - Bir xostdagi bir nechta bot jarayoni bitta faylni ishlatishi mumkin. Har
+#   bir yozuvga umumiy hisoblagichdan "rev" raqami beriladi. Faylga boshqa
+#   ulanish yozgani "PRAGMA data_version" orqali aniqlanadi (VALIDATE_INTERVAL
+#   dan ko'p bo'lmagan kechikish bilan), shunda faqat oxirgi ko'rilgan rev'dan
+#   keyin o'zgargan kalitlar keshdan chiqariladi - outbox, arxiv va boshqa
+#   jadvallarga yozish FSM keshini tozalamaydi. Tozalangan sessiya o'chirilmay,
+#   bo'sh yozuv (tombstone) sifatida qoladi va TOMBSTONE_TTL dan keyin
+#   o'chiriladi; shundan uzoq tekshirilmagan kesh butunlay tozalanadi.
+#
+# Sessiyalar cheklangan: kesh - LRU (max_cached), bazadagi sessiyalar `ttl`
+# soniya o'zgarmasa o'chiriladi, soni max_sessions dan oshsa eng eskilari
+# o'chiriladi. Muddati tugashidan `remind_before` soniya oldin (yoqilgan
+# bo'lsa) foydalanuvchiga tugallanmagan ariza haqida eslatma yuboriladi.
+# Keshdagi ariza qoralamasi erkin lug'at emas, __slots__ yozuv (Draft).
+
+FLUSH_DELAY = 0.05 # Yozishlarni jamlash oynasi (soniya)
+VALIDATE_INTERVAL = 0.25 # Boshqa jarayon o'zgarishlarini tekshirish oralig'i (soniya)
+DEFAULT_TTL = 14 * 24 * 3600.0 # O'zgarmagan sessiya shuncha vaqtdan keyin o'chiriladi (soniya)
+DEFAULT_MAX_SESSIONS = 100_000 # Bazadagi sessiyalar chegarasi
+DEFAULT_MAX_CACHED = 10_000 # Xotiradagi sessiyalar chegarasi
+SWEEP_INTERVAL = 60.0 # Muddati o'tgan sessiyalarni tozalash oralig'i (soniya)
+TOMBSTONE_TTL = SWEEP_INTERVAL # Bo'sh (tozalangan) yozuvlar kamida shuncha saqlanadi (soniya)
+REMIND_BATCH = 500 # Bitta aylanishdagi eslatmalar soni
+
+Remind = Callable[[int, int, str], Awaitable[None]] # (chat_id, user_id, state)
+
+# Tozalangan sessiya yozuvi (boshqa jarayonlar o'chirilganini rev orqali ko'rishi uchun)
+TOMBSTONE = "state IS NULL AND data = '{}'"
+
+sessions_closed = metrics.REGISTRY.counter(
+    "bot_sessions_closed_total", "Yopilgan FSM sessiyalari (completed - ariza topshirildi, cleared - bekor qilindi/menyu, expired - ttl, evicted - chegara)",
+    ("reason",))
+session_reminders = metrics.REGISTRY.counter("bot_session_reminders_total", "Tugallanmagan ariza eslatmalari",
+                                             ("result",))
+
+
+def _key_str(key: StorageKey) -> str:
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or 0}:{key.destiny}"
+
+
+def _key_ids(skey: str) -> Tuple[int, int]:
+    """Kalit satridan (chat_id, user_id)."""
+    _, chat_id, user_id, _ = skey.split(":", 3)
+    return int(chat_id), int(user_id)
+
+
+# --- Ixcham Qoralama ---
+
+DOCUMENT_KEYS = ("file_id", "file_unique_id", "file_name", "mime_type", "file_size")
+
+
+class Draft:
+    """Ariza qoralamasi: ma'lum maydonlar slot'larda, hujjatlar tuple'da, qolgani `extra` da."""
+
+    __slots__ = ("selected_tuman", "selected_job", "selected_job_id", "current_tuman", "name", "phone",
+                 "passport_info", "diploma_info", "reference_info", "manager_cert_info", "extra")
+
+    FIELDS = __slots__[:-1]
+    DOCUMENTS = ("diploma_info", "reference_info", "manager_cert_info")
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, None)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Draft":
+        draft = cls()
+        extra = {}
+        for key, value in data.items():
+            if key in cls.DOCUMENTS and isinstance(value, dict) and value.keys() <= set(DOCUMENT_KEYS):
+                setattr(draft, key, tuple(value.get(name) for name in DOCUMENT_KEYS))
+            elif key in cls.FIELDS and value is not None:
+                setattr(draft, key, value)
+            else:
+                extra[key] = value # Admin holatlari va boshqa kalitlar
+        draft.extra = extra or None
+        return draft
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is None:
+                continue
+            if field in self.DOCUMENTS and isinstance(value, tuple):
+                # Barcha kalitlar (None bo'lsa ham) saqlanadi: yetkazish document["file_name"] kabi o'qiydi
+                value = dict(zip(DOCUMENT_KEYS, value))
+            data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __bool__(self) -> bool:
+        return bool(self.extra) or any(getattr(self, field) is not None for field in self.FIELDS)
+
+
+EMPTY_DRAFT = Draft()
+
+
+class Session:
+    """Kesh yozuvi: bosqich, qoralama, o'zgargan vaqt va bazadagi rev (har bir o'zgarishda yangi obyekt)."""
+
+    __slots__ = ("state", "draft", "updated_at", "rev")
+
+    def __init__(self, state: Optional[str], draft: Draft, updated_at: float = 0.0, rev: int = 0):
+        self.state = state
+        self.draft = draft
+        self.updated_at = updated_at
+        self.rev = rev
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.draft
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram uchun SQLite (WAL) asosidagi doimiy, cheklangan FSM ombori."""
+
+    def __init__(self, path: str, flush_delay: float = FLUSH_DELAY, validate_interval: float = VALIDATE_INTERVAL,
+                 ttl: float = DEFAULT_TTL, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 max_cached: int = DEFAULT_MAX_CACHED, remind_before: Optional[float] = None):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.validate_interval = validate_interval
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_cached = max_cached
+        self.remind_before = remind_before
+        self._cache: "OrderedDict[str, Session]" = OrderedDict() # LRU: oxirgi ishlatilgan - oxirida
+        self._dirty: Dict[str, Session] = {} # Bazaga hali yozilmagan yozuvlar
+        self._flush_task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._data_version: Optional[int] = None
+        self._rev = 0 # Kesh tekshirilgan oxirgi rev
+        self._validated_at = 0.0
+        # Bitta oqim: ulanish faqat shu oqimda ishlatiladi
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-storage")
+        self._conn = self._executor.submit(self._connect).result()
+        self._data_version, self._rev = self._executor.submit(self._read_position).result()
+
+    # --- Baza bilan ishlash (executor oqimida) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " state TEXT,"
+            " data TEXT NOT NULL DEFAULT '{}',"
+            " updated_at REAL NOT NULL,"
+            " reminded INTEGER NOT NULL DEFAULT 0,"
+            " rev INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(fsm)")}
+        if "reminded" not in columns:
+            # Eski baza: eslatma ustuni keyin qo'shilgan
+            conn.execute("ALTER TABLE fsm ADD COLUMN reminded INTEGER NOT NULL DEFAULT 0")
+        if "rev" not in columns:
+            conn.execute("ALTER TABLE fsm ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS fsm_updated ON fsm (updated_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS fsm_rev ON fsm (rev)")
+        # Umumiy rev hisoblagichi: oshirish yozish qulfini oladi, shuning uchun rev commit tartibida o'sadi
+        conn.execute("CREATE TABLE IF NOT EXISTS fsm_meta (id INTEGER PRIMARY KEY CHECK (id = 0),"
+                     " rev INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO fsm_meta (id, rev) VALUES (0, 0)")
+        conn.commit()
+        return conn
+
+    def _fetch(self, key: str) -> Session:
+        row = self._conn.execute("SELECT state, data, rev FROM fsm WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return Session(None, EMPTY_DRAFT)
+        return Session(row[0], Draft.from_dict(json.loads(row[1])), rev=row[2])
+
+    def _write_batch(self, batch: List[Tuple[str, Optional[str], Dict[str, Any], float]]) -> int:
+        """Yozuvlarni bitta tranzaksiyada saqlash; ularga berilgan rev'ni qaytaradi."""
+        with self._conn:
+            self._conn.execute("UPDATE fsm_meta SET rev = rev + 1 WHERE id = 0")
+            rev = self._conn.execute("SELECT rev FROM fsm_meta WHERE id = 0").fetchone()[0]
+            # Bo'sh sessiya ham yoziladi (tombstone): boshqa jarayonlar uni rev orqali ko'radi
+            self._conn.executemany(
+                "INSERT INTO fsm (key, state, data, updated_at, rev) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "updated_at = excluded.updated_at, reminded = 0, rev = excluded.rev",
+                [(key, state, json.dumps(data, ensure_ascii=False), updated_at, rev)
+                 for key, state, data, updated_at in batch],
+            )
+        return rev
+
+    def _count_states(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT state, COUNT(*) FROM fsm WHERE state IS NOT NULL GROUP BY state")
+        return dict(rows.fetchall())
+
+    def _read_position(self) -> Tuple[int, int]:
+        """(data_version, oxirgi rev) - kesh shu joydan boshlab tekshiriladi."""
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return data_version, self._conn.execute("SELECT rev FROM fsm_meta WHERE id = 0").fetchone()[0]
+
+    def _read_changes(self, data_version: int, since: int) -> Tuple[int, Optional[List[Tuple[str, int]]]]:
+        """Fayl o'zgargan bo'lsa, since'dan keyin yozilgan (kalit, rev) lar; o'zgarmagan bo'lsa None."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == data_version:
+            return version, None
+        return version, self._conn.execute("SELECT key, rev FROM fsm WHERE rev > ?", (since,)).fetchall()
+
+    def _take_reminders(self, now: float) -> List[Tuple[str, str]]:
+        """Muddati tugashiga oz qolgan, hali eslatilmagan sessiyalar (eslatilgan deb belgilanadi)."""
+        with self._conn:
+            rows = self._conn.execute(
+                "SELECT key, state FROM fsm WHERE updated_at < ? AND updated_at >= ? "
+                "AND reminded = 0 AND state IS NOT NULL LIMIT ?",
+                (now - (self.ttl - self.remind_before), now - self.ttl, REMIND_BATCH),
+            ).fetchall()
+            self._conn.executemany("UPDATE fsm SET reminded = 1 WHERE key = ?", [(key,) for key, _ in rows])
+        return rows
+
+    def _sweep(self, now: float) -> Tuple[List[str], List[str]]:
+        """Muddati o'tgan va chegaradan ortiq sessiyalarni o'chirish: (expired, evicted) kalitlari."""
+        with self._conn:
+            self._conn.execute(f"DELETE FROM fsm WHERE {TOMBSTONE} AND updated_at < ?", (now - TOMBSTONE_TTL,))
+            expired = [row[0] for row in self._conn.execute(
+                f"SELECT key FROM fsm WHERE updated_at < ? AND NOT ({TOMBSTONE})", (now - self.ttl,))]
+            self._conn.executemany("DELETE FROM fsm WHERE key = ?", [(key,) for key in expired])
+            excess = self._conn.execute(f"SELECT COUNT(*) FROM fsm WHERE NOT ({TOMBSTONE})").fetchone()[0] \
+                - self.max_sessions
+            evicted = []
+            if excess > 0:
+                evicted = [row[0] for row in self._conn.execute(
+                    f"SELECT key FROM fsm WHERE NOT ({TOMBSTONE}) ORDER BY updated_at LIMIT ?", (excess,))]
+                self._conn.executemany("DELETE FROM fsm WHERE key = ?", [(key,) for key in evicted])
+        return expired, evicted
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Kesh ---
+
+    async def _validate_cache(self):
+        """Boshqa jarayon o'zgartirgan sessiyalarni keshdan chiqarish."""
+        now = time.monotonic()
+        if now - self._validated_at < self.validate_interval:
+            return
+        stale = now - self._validated_at > TOMBSTONE_TTL
+        self._validated_at = now
+        self._data_version, changes = await self._run(self._read_changes, self._data_version, self._rev)
+        if changes is None:
+            return
+        if stale:
+            # O'chirilgan sessiyalar tombstone'lari tozalangan bo'lishi mumkin.
+            # Yozilmagan o'zgarishlarimiz eng yangi holat sifatida qoladi
+            self._cache = OrderedDict(self._dirty)
+        for skey, rev in changes:
+            session = self._cache.get(skey)
+            if session is not None and session.rev != rev and skey not in self._dirty:
+                del self._cache[skey]
+            self._rev = max(self._rev, rev)
+
+    async def _get_session(self, key: StorageKey) -> Session:
+        await self._validate_cache()
+        skey = _key_str(key)
+        session = self._cache.get(skey)
+        if session is None:
+            session = await self._run(self._fetch, skey)
+            # O'qish paytida shu kalitga yozilgan bo'lishi mumkin
+            session = self._cache.setdefault(skey, session)
+        self._cache.move_to_end(skey)
+        self._trim_cache(skey)
+        return session
+
+    def _trim_cache(self, keep: Optional[str] = None):
+        """Kesh chegarasidan oshsa, eng uzoq ishlatilmagan (bazaga yozilgan) sessiyalarni chiqarish."""
+        excess = len(self._cache) - self.max_cached
+        if excess <= 0:
+            return
+        victims = []
+        for skey in self._cache: # Eng eskisidan boshlab
+            if len(victims) == excess:
+                break
+            if skey not in self._dirty and skey != keep:
+                victims.append(skey)
+        for skey in victims:
+            del self._cache[skey] # Bazada qoladi, kerak bo'lsa qayta o'qiladi
+
+    def _update(self, key: StorageKey, old: Session, new: Session, reason: str = "cleared"):
+        skey = _key_str(key)
+        if new.empty and not old.empty:
+            sessions_closed.inc(reason)
+        self._cache[skey] = new
+        self._cache.move_to_end(skey)
+        self._dirty[skey] = new
+        self._trim_cache(skey)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while self._dirty:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def flush(self):
+        """Yig'ilgan o'zgarishlarni bitta tranzaksiyada bazaga yozish."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        batch = [(key, session.state, session.draft.to_dict(), session.updated_at) for key, session in dirty.items()]
+        try:
+            rev = await self._run(self._write_batch, batch)
+        except sqlite3.Error as e:
+            logging.error(f"FSM ma'lumotlarini bazaga yozishda xato: {e}")
+            for key, session in dirty.items():
+                self._dirty.setdefault(key, session)
+            return
+        for key, session in dirty.items():
+            session.rev = rev # Keshdagi yozuv endi bazadagi shu rev'ga mos
+            # Yakunlangan (bo'sh) sessiyalarni keshda saqlab o'tirmaymiz
+            if session.empty and key not in self._dirty:
+                self._cache.pop(key, None)
+        self._trim_cache() # Yozilganlari endi keshdan chiqarilishi mumkin
+
+    async def state_counts(self) -> Dict[str, int]:
+        """Har bir bosqichda (state) turgan foydalanuvchilar soni (metrikalar uchun)."""
+        await self.flush()
+        return await self._run(self._count_states)
+
+    def cached_count(self) -> int:
+        """Xotiradagi sessiyalar soni (metrikalar uchun)."""
+        return len(self._cache)
+
+    # --- Muddati O'tgan Sessiyalar ---
+
+    def start(self, remind: Optional[Remind] = None):
+        """Tozalovchi fon vazifasini ishga tushirish (remind - eslatma yuboruvchi, ixtiyoriy)."""
+        self._sweep_task = asyncio.create_task(self._sweep_loop(remind))
+
+    async def _sweep_loop(self, remind: Optional[Remind]):
+        while True:
+            try:
+                await self.sweep(remind)
+            except sqlite3.Error as e:
+                logging.error(f"FSM sessiyalarini tozalashda xato: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+    async def sweep(self, remind: Optional[Remind] = None):
+        """Eslatmalarni yuborish, muddati o'tgan va ortiqcha sessiyalarni o'chirish."""
+        await self.flush()
+        now = time.time()
+        if remind is not None and self.remind_before:
+            for skey, state in await self._run(self._take_reminders, now):
+                chat_id, user_id = _key_ids(skey)
+                try:
+                    await remind(chat_id, user_id, state)
+                    session_reminders.inc("sent")
+                except Exception as e:
+                    session_reminders.inc("error")
+                    logging.warning(f"Foydalanuvchi {user_id} ga eslatma yuborilmadi: {e}")
+
+        expired, evicted = await self._run(self._sweep, now)
+        for reason, keys in (("expired", expired), ("evicted", evicted)):
+            for skey in keys:
+                if skey not in self._dirty: # Shu orada yangilangan sessiya qayta yoziladi
+                    self._cache.pop(skey, None)
+            if keys:
+                sessions_closed.inc(reason, amount=len(keys))
+                logging.info(f"FSM: {len(keys)} ta sessiya o'chirildi ({reason}).")
+
+    # --- BaseStorage interfeysi ---
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        session = await self._get_session(key)
+        state = state.state if isinstance(state, State) else state
+        self._update(key, session, Session(state, session.draft, time.time()))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_session(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        session = await self._get_session(key)
+        self._update(key, session, Session(session.state, Draft.from_dict(data), time.time()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_session(key)).draft.to_dict()
+
+    async def complete(self, key: StorageKey) -> None:
+        """Ariza topshirilgach sessiyani tozalash (state.clear() o'rniga, "completed" deb hisoblanadi)."""
+        session = await self._get_session(key)
+        self._update(key, session, Session(None, EMPTY_DRAFT, time.time()), reason="completed")
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            await asyncio.gather(self._sweep_task, return_exceptions=True)
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
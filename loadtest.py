@@ -0,0 +1,289 @@
+"""To'liq ariza oqimi uchun yuklama testi (soxta Bot API serveri bilan).
+
+Bitta bot jarayoni nechta arizachini bir vaqtda to'liq oqimdan (tuman -> ish
+o'rni -> F.I.Sh. -> telefon -> 3 ta hujjat -> pasport -> admin'ga yetkazish)
+o'tkaza olishini o'lchaydi. Bot vaqtinchalik papkada import qilinadi va
+long polling orqali lokal soxta serverga (fake_telegram.py) ulanadi.
+
+Ishlatish:
+    python loadtest.py --applicants 200 --ramp 10
+    python loadtest.py --applicants 500 --latency 0.05 --jitter 0.02 --rate-429 0.01
+    python loadtest.py --applicants 1000 --unthrottled   # RateLimitMiddleware cheklovlarisiz
+
+Natija: umumiy vaqt, oqim va yetkazish kechikishlari (p50/p99), xatolar
+(qaysi bosqichda kutish muddati o'tgani), admin'ga yetkazilgan hujjatlar
+tekshiruvi natijalari (soxta server to'g'ri PDF beradi - ✅ dan boshqasi xato
+hisoblanadi), kiritilgan 429 lar va jarayon xotirasining (RSS) o'sishi.
+Xotira bot va soxta server uchun birgalikda.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from bench import REPO_DIR, import_bot, percentile
+from fake_telegram import FakeTelegram
+
+DEFAULT_PORT = 8099
+STEP_TIMEOUT = 60.0
+DELIVERY_TIMEOUT = 600.0 # Admin chati ~1 xabar/s: media guruh (3 hujjat) ~3 s oladi
+THINK_TIME = 0.5 # Foydalanuvchi javob yozishidan oldingi pauza (s)
+# Soxta Bot API kechikishisiz: cheklovlar o'lchovga xalaqit bermasligi uchun
+UNTHROTTLED = {"global_rate": 1e6, "chat_rate": 1e6, "chat_burst": 1e6, "group_rate": 1e6}
+
+Message = Dict[str, Any]
+
+
+class StepTimeout(Exception):
+    pass
+
+
+def rss_mb() -> float:
+    """Jarayonning joriy RSS xotirasi (MB)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def buttons(message: Message) -> List[str]:
+    markup = message.get("reply_markup") or {}
+    return [button.get("callback_data") or "" for row in markup.get("inline_keyboard", []) for button in row]
+
+
+def has_text(fragment: str) -> Callable[[Message], bool]:
+    return lambda message: fragment in (message.get("text") or "")
+
+
+def has_button(prefix: str) -> Callable[[Message], bool]:
+    return lambda message: any(data.startswith(prefix) for data in buttons(message))
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, fake: FakeTelegram, admin_id: int, document_titles: List[str]):
+        self.args = args
+        self.fake = fake
+        self.admin_id = admin_id
+        self.document_titles = document_titles
+        self._message_id = itertools.count(1)
+        self.errors: Counter = Counter()
+        self.flow_times: List[float] = []
+        self.delivery_times: List[float] = []
+        self.admin_actions = 0
+        self.checks: Counter = Counter() # Hujjat tekshiruvi natijalari (admin'ga yetkazilgan matndan)
+        self._deliveries: Dict[str, asyncio.Future] = {}
+        self._admin_replies: asyncio.Queue = asyncio.Queue()
+        self.running = True
+
+    # --- Yangilanishlar ---
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"Load{user_id}"}
+
+    def _message(self, user_id: int, **content: Any) -> Dict[str, Any]:
+        return {"message_id": next(self._message_id), "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"}, "from": self._user(user_id), **content}
+
+    def send_text(self, user_id: int, text: str):
+        self.fake.push_update({"message": self._message(user_id, text=text)})
+
+    def send_document(self, user_id: int, name: str):
+        document = {"file_id": f"F{user_id}_{name}", "file_unique_id": f"U{user_id}_{name}", "file_name": name,
+                    "mime_type": "application/pdf", "file_size": 1024}
+        self.fake.push_update({"message": self._message(user_id, document=document)})
+
+    def send_callback(self, user_id: int, data: str):
+        message = {"message_id": next(self._message_id), "date": int(time.time()),
+                   "chat": {"id": user_id, "type": "private"}, "text": "x"}
+        self.fake.push_update({"callback_query": {"id": str(next(self._message_id)), "from": self._user(user_id),
+                                                  "chat_instance": "load", "message": message, "data": data}})
+
+    async def expect(self, queue: asyncio.Queue, predicate: Callable[[Message], bool], step: str) -> Message:
+        """Shart bajariladigan xabar kelguncha kutish (boshqalari tashlab ketiladi)."""
+        deadline = time.monotonic() + self.args.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise StepTimeout(step)
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise StepTimeout(step)
+            if predicate(message):
+                # Handler'lar avval javob beradi, keyin holatni o'zgartiradi: "o'ylash" pauzasi
+                await asyncio.sleep(random.uniform(0.5, 1.5) * self.args.think if self.args.think else 0)
+                return message
+
+    # --- Virtual foydalanuvchilar ---
+
+    async def applicant(self, n: int):
+        user_id = 1_000_000 + n
+        name = f"Arizachi {n}"
+        queue = self.fake.outgoing(user_id)
+        await asyncio.sleep(random.uniform(0, self.args.ramp))
+        started = time.perf_counter()
+        try:
+            self.send_text(user_id, "/start")
+            message = await self.expect(queue, has_button("user_tuman_"), "start")
+            self.send_callback(user_id, random.choice([d for d in buttons(message) if d.startswith("user_tuman_")]))
+            message = await self.expect(queue, has_button("j1:"), "tuman")
+            self.send_callback(user_id, random.choice([d for d in buttons(message) if d.startswith("j1:")]))
+            await self.expect(queue, has_text("F.I.Sh."), "job")
+            self.send_text(user_id, name)
+            await self.expect(queue, has_text("telefon raqamingizni"), "name")
+            self.send_text(user_id, f"+99890{n:07d}")
+            await self.expect(queue, has_text("Hujjatlarni yuborish"), "phone")
+            for document, marker in (("diplom.pdf", "Diplom qabul"), ("malumotnoma.pdf", "Ma'lumotnoma qabul"),
+                                     ("sertifikat.pdf", "Barcha hujjatlar")):
+                self.send_document(user_id, document)
+                await self.expect(queue, has_text(marker), document)
+            delivered = self._deliveries[name] = asyncio.get_running_loop().create_future()
+            submitted = time.perf_counter()
+            self.send_text(user_id, "IIV, 01.01.2030")
+            await self.expect(queue, has_text("Arizangiz va hujjatlaringiz qabul qilindi"), "passport")
+            self.flow_times.append(time.perf_counter() - started)
+            await asyncio.wait_for(delivered, timeout=self.args.delivery_timeout)
+            self.delivery_times.append(time.perf_counter() - submitted)
+        except StepTimeout as e:
+            self.errors[f"timeout:{e}"] += 1
+        except asyncio.TimeoutError:
+            self.errors["timeout:delivery"] += 1
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+
+    async def admin_inbox(self):
+        """Admin chatidagi xabarlarni arizalar va admin javoblariga ajratish."""
+        queue = self.fake.outgoing(self.admin_id)
+        while True:
+            message = await queue.get()
+            text = message.get("text") or ""
+            if message["method"] in ("sendMediaGroup", "sendDocument") or "Yangi Ariza" in text:
+                for name, future in self._deliveries.items():
+                    if f"{name}\n" in text and not future.done():
+                        self.count_checks(text)
+                        future.set_result(None)
+                        break
+            else:
+                self._admin_replies.put_nowait(message)
+
+    def count_checks(self, text: str):
+        """Arizadagi "Diplom: ✅ PDF, ..." qatorlaridan tekshiruv natijalarini sanash."""
+        for title in self.document_titles:
+            line = next((line for line in text.splitlines() if line.startswith(f"{title}: ")), None)
+            result = "yo'q" if line is None else line[len(title) + 2:].split(" ", 1)[0]
+            self.checks[result] += 1
+            if result != "✅":
+                self.errors[f"verify:{result}"] += 1
+
+    async def admin(self):
+        """Admin: panelni ochib, ish o'rinlari ro'yxatini ko'rib turadi."""
+        while self.running:
+            try:
+                self.send_text(self.admin_id, "/admin")
+                await self.expect(self._admin_replies, has_text("Admin paneliga"), "admin_panel")
+                self.send_callback(self.admin_id, "list_tumans")
+                await self.expect(self._admin_replies, lambda message: message["method"] == "editMessageText", "admin_list")
+                self.admin_actions += 1
+            except StepTimeout as e:
+                self.errors[f"timeout:{e}"] += 1
+            await asyncio.sleep(self.args.admin_interval)
+
+
+def report(test: LoadTest, fake: FakeTelegram, elapsed: float, rss: Dict[str, float]):
+    applicants = test.args.applicants
+    print(f"\n=== Yuklama testi: {applicants} ta arizachi ===")
+    print(f"Umumiy vaqt:            {elapsed:.1f} s")
+    print(f"Yakunlangan oqimlar:    {len(test.flow_times)}/{applicants}")
+    print(f"Admin'ga yetkazilgan:   {len(test.delivery_times)}/{applicants}")
+    for title, samples in (("Oqim vaqti", test.flow_times), ("Yetkazish kechikishi", test.delivery_times)):
+        if samples:
+            print(f"{title + ':':23} p50 {percentile(samples, 50):.2f} s, p99 {percentile(samples, 99):.2f} s, "
+                  f"max {max(samples):.2f} s")
+    failed = sum(test.errors.values())
+    print(f"Xatolar:                {failed} ({failed / max(applicants, 1) * 100:.1f}%) {dict(test.errors)}")
+    print(f"Hujjat tekshiruvi:      {dict(test.checks)} (yuklab olingan: {fake.calls['download']})")
+    print(f"Admin amallari:         {test.admin_actions}")
+    print(f"Kiritilgan 429 lar:     {fake.injected_429}")
+    print(f"Bot API so'rovlari:     {dict(fake.calls)}")
+    print(f"Xotira (RSS):           boshida {rss['start']:.1f} MB, eng ko'pi {rss['peak']:.1f} MB, "
+          f"oxirida {rss['end']:.1f} MB (o'sish {rss['end'] - rss['start']:+.1f} MB)")
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    fake = FakeTelegram(args.latency, args.jitter, args.rate_429, args.retry_after)
+    base_url = await fake.start(port=args.port)
+    overrides: Dict[str, Any] = {"api_server": base_url, "mode": "polling"}
+    if args.unthrottled:
+        overrides["rate_limit"] = UNTHROTTLED
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    try:
+        B = import_bot(workdir, overrides)
+        logging.getLogger().setLevel(logging.WARNING)
+        tumans = B.all_tumans
+        B.store.add_jobs([(tumans[i % len(tumans)], f"{i + 1}-DMTT") for i in range(args.jobs)])
+
+        test = LoadTest(args, fake, int(B.ADMIN_ID), list(B.DOCUMENT_TITLES))
+        polling = asyncio.create_task(B.dp.start_polling(B.bot, handle_signals=False))
+        inbox = asyncio.create_task(test.admin_inbox())
+        admins = [asyncio.create_task(test.admin()) for _ in range(args.admins)]
+
+        rss = {"start": rss_mb()}
+        rss["peak"] = rss["start"]
+
+        async def sample_memory():
+            while True:
+                rss["peak"] = max(rss["peak"], rss_mb())
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample_memory())
+        started = time.perf_counter()
+        await asyncio.gather(*(test.applicant(n) for n in range(args.applicants)))
+        elapsed = time.perf_counter() - started
+        rss["end"] = rss_mb()
+
+        test.running = False
+        for task in (sampler, inbox, *admins):
+            task.cancel()
+        await B.dp.stop_polling()
+        await asyncio.gather(polling, sampler, inbox, *admins, return_exceptions=True)
+    finally:
+        await fake.stop()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report(test, fake, elapsed, rss)
+    return 1 if test.errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vakansiya-bot yuklama testi")
+    parser.add_argument("-n", "--applicants", type=int, default=100, help="virtual arizachilar soni")
+    parser.add_argument("--admins", type=int, default=1, help="admin panelini ishlatuvchi virtual adminlar")
+    parser.add_argument("--admin-interval", type=float, default=1.0, help="admin amallari orasidagi pauza (s)")
+    parser.add_argument("--ramp", type=float, default=5.0, help="arizachilar shu vaqt ichida tasodifiy boshlaydi (s)")
+    parser.add_argument("--jobs", type=int, default=100, help="ish o'rinlari soni")
+    parser.add_argument("--timeout", type=float, default=STEP_TIMEOUT, help="bitta bosqich uchun kutish (s)")
+    parser.add_argument("--delivery-timeout", type=float, default=DELIVERY_TIMEOUT, help="admin'ga yetkazishni kutish (s)")
+    parser.add_argument("--think", type=float, default=THINK_TIME, help="foydalanuvchi bosqichlar orasidagi pauzasi (s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Bot API kechikishi (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="kechikishning tasodifiy o'zgarishi (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 javobi ehtimoli (0..1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 dagi retry_after (s)")
+    parser.add_argument("--unthrottled", action="store_true", help="RateLimitMiddleware cheklovlarini o'chirish")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
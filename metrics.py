@@ -0,0 +1,241 @@
+import bisect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple, Union
+
+from aiohttp import web
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+# --- Metrikalar (Prometheus formati) ---
+#
+# Tashqi kutubxonasiz, yengil hisoblagichlar va gistogrammalar: har bir
+# yozish - lug'atdan olish va bisect, shuning uchun production'da yoqilgan
+# holda qoldirish mumkin. Holat ko'rsatkichlari (FSM bosqichlari, outbox
+# navbati, ish o'rinlari soni) faqat /metrics so'ralganda hisoblanadi.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+GaugeValues = Union[float, Dict[Labels, float]]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """O'sib boruvchi hisoblagich."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    async def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+                for labels, value in self._values.items()]
+
+
+class Histogram:
+    """Kechikishlar gistogrammasi (Prometheus "le" chelaklari bilan)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [har bir chelakdagi soni (kumulyativ emas)..., +Inf, yig'indi]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        record = self._values.get(labels)
+        if record is None:
+            record = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+        record[bisect.bisect_left(self.buckets, value)] += 1
+        record[-1] += value
+
+    async def samples(self) -> List[str]:
+        lines = []
+        for labels, record in self._values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), record):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {record[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative:g}")
+        return lines
+
+
+class Gauge:
+    """So'ralgan paytda hisoblanadigan ko'rsatkich (async funksiya orqali)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Awaitable[GaugeValues]],
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    async def samples(self) -> List[str]:
+        values = await self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}" for labels, value in values.items()]
+
+
+class Registry:
+    """Barcha metrikalar ro'yxati va Prometheus matn formatiga chiqarish."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Union[Counter, Histogram, Gauge]] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, collect: Callable[[], Awaitable[GaugeValues]],
+              labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, collect, labelnames))
+
+    async def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = await metric.samples()
+            except Exception as e:
+                # Bitta ko'rsatkich xatosi butun sahifani buzmasin
+                logging.error(f"{metric.name} metrikasini hisoblashda xato: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+updates_total = REGISTRY.counter("bot_updates_total", "Qabul qilingan yangilanishlar", ("type",))
+update_seconds = REGISTRY.histogram("bot_update_seconds", "Yangilanishni to'liq ishlash vaqti", ("type",))
+handler_seconds = REGISTRY.histogram("bot_handler_seconds", "Handler ishlash vaqti", ("handler",))
+handler_errors = REGISTRY.counter("bot_handler_errors_total", "Handler xatolari", ("handler", "error"))
+api_requests = REGISTRY.counter("bot_api_requests_total", "Bot API so'rovlari (qayta urinishlar ham)", ("method",))
+api_errors = REGISTRY.counter("bot_api_errors_total", "Bot API xatolari", ("method", "error"))
+api_seconds = REGISTRY.histogram("bot_api_request_seconds", "Bot API so'rovi vaqti (navbatsiz)", ("method",))
+
+
+# --- Middleware'lar ---
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """dp.update uchun: har bir yangilanish turi va umumiy ishlash vaqti."""
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        updates_total.inc(update_type)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            update_seconds.observe(time.perf_counter() - started, update_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Har bir handler (funksiya nomi bo'yicha) vaqti va xatolari."""
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            handler_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, name)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Bot sessiyasi uchun: metod bo'yicha so'rovlar, xatolar va kechikish."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        name = type(method).__name__
+        api_requests.inc(name)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            api_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            api_seconds.observe(time.perf_counter() - started, name)
+
+
+def instrument(dp: Dispatcher, bot: Bot):
+    """Dispatcher va bot sessiyasiga metrika middleware'larini ulash.
+
+    Sessiya middleware'i oxirida ulanadi: cheklovchidagi navbat vaqti emas,
+    faqat haqiqiy HTTP so'rov vaqti o'lchanadi.
+    """
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_middleware = HandlerMetricsMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(handler_middleware)
+    bot.session.middleware(ApiMetricsMiddleware())
+
+
+# --- HTTP ---
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    body = await request.app.get("metrics_registry", REGISTRY).render()
+    return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                        headers={"X-Prometheus-Format": "0.0.4"})
+
+
+async def start_server(host: str, port: int, registry: Registry = REGISTRY) -> web.AppRunner:
+    """/metrics ni alohida portda ishga tushirish."""
+    app = web.Application()
+    app["metrics_registry"] = registry
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrikalar: http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramRetryAfter
+
+# --- Chiquvchi Xabarlar Navbati (Outbox) ---
+#
+# Tayyor arizalar avval SQLite'dagi navbatga yoziladi, foydalanuvchiga darhol
+# javob beriladi, admin'ga yetkazish esa fon ishchilari (worker) tomonidan
+# bajariladi. Yetkazib bo'lmasa qayta urinish eksponensial kechikish bilan
+# davom etadi (Telegram "retry_after" bersa, shuncha kutiladi) - ariza
+# hech qachon tashlab yuborilmaydi.
+#
+# To'plab yuborish (batching): ko'rsatilgan turdagi yozuvlar bittalab emas,
+# eng eskisi `window` soniya kutgach yoki `max_count` taga yetganda bitta
+# to'plam qilib olinadi va birga yetkaziladi (admin uchun "digest" rejimi).
+# To'plam `batch_key` bo'yicha guruhlarga bo'linadi, har bir guruh alohida
+# yetkazilib, alohida "done" qilinadi: keyingi guruh xato bersa, oldin
+# yuborilganlari qayta yuborilmaydi.
+#
+# Yetkazilayotgan yozuvlarning "ijarasi" (claimed_at) har LEASE_RENEW soniyada
+# yangilanadi: uzoq davom etgan yetkazish (tekshiruvni kutish, retry_after)
+# boshqa ishchi tomonidan qayta olinmaydi. Yetkazilgan yozuvlar RETENTION
+# dan keyin o'chiriladi.
+
+BASE_BACKOFF = 2.0 # Birinchi qayta urinishgacha kutish (soniya)
+MAX_BACKOFF = 300.0 # Qayta urinishlar orasidagi eng uzun kutish (soniya)
+LEASE_TIMEOUT = 300.0 # Shuncha vaqt ijarasi yangilanmagan "sending" yozuv qayta navbatga qo'yiladi
+LEASE_RENEW = LEASE_TIMEOUT / 3 # Yetkazilayotgan yozuvlar ijarasini yangilash oralig'i (soniya)
+RETENTION = 7 * 24 * 3600.0 # Yetkazilgan yozuvlar shuncha saqlanadi (soniya)
+POLL_INTERVAL = 1.0 # Kechiktirilgan yozuvlarni tekshirish oralig'i (soniya)
+ALERT_ATTEMPTS = 10 # Shuncha urinishdan keyin kritik log yoziladi
+
+Deliver = Callable[[str, Dict[str, Any]], Awaitable[None]]
+DeliverBatch = Callable[[str, List[Dict[str, Any]]], Awaitable[None]]
+Batching = Dict[str, Tuple[float, int]] # tur -> (window soniya, max_count)
+BatchKey = Callable[[str, Dict[str, Any]], Hashable]
+Item = Tuple[int, Dict[str, Any], int] # (id, payload, attempts)
+
+
+class Outbox:
+    """SQLite asosidagi doimiy navbat va uni yetkazuvchi fon ishchilari."""
+
+    def __init__(self, path: str, workers: int = 2, batching: Optional[Batching] = None, retention: float = RETENTION):
+        self.path = path
+        self.workers = workers
+        self.batching = batching or {}
+        self.retention = retention
+        self._batch_key: BatchKey = lambda kind, payload: None # Standart: butun to'plam bitta guruh
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Set[int] = set() # Shu jarayon hozir yetkazayotgan yozuvlar
+        self._wakeup: Optional[asyncio.Event] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._conn = self._executor.submit(self._connect).result()
+
+    # --- Baza bilan ishlash (executor oqimida) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " created_at REAL NOT NULL,"
+            " last_error TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        conn.commit()
+        return conn
+
+    def _insert(self, kind: str, payload: str) -> int:
+        now = time.time()
+        with self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (kind, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                (kind, payload, now, now),
+            )
+        return cur.lastrowid
+
+    def _claim(self) -> Optional[Tuple[int, str, str, int]]:
+        """Vaqti kelgan bitta yozuvni "sending" holatiga o'tkazib olish."""
+        now = time.time()
+        batched = list(self.batching)
+        not_batched = f"AND kind NOT IN ({', '.join('?' * len(batched))}) " if batched else ""
+        with self._conn:
+            # Ishchi jarayon o'lib qolgan bo'lsa, uning yozuvlarini qaytarib olamiz
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                (now - LEASE_TIMEOUT,),
+            )
+            row = self._conn.execute(
+                "SELECT id, kind, payload, attempts FROM outbox "
+                f"WHERE status = 'pending' AND next_attempt_at <= ? {not_batched}ORDER BY id LIMIT 1",
+                (now, *batched),
+            ).fetchone()
+            if row is None:
+                return None
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ? AND status = 'pending'",
+                (now, row[0]),
+            )
+            if cur.rowcount == 0:
+                return None # Boshqa jarayon olib qo'ydi
+        return row
+
+    def _claim_batch(self, kind: str, window: float, max_count: int) -> List[Tuple[int, str, int]]:
+        """Bir turdagi yozuvlar to'plamini olish: max_count ta yig'ilgan yoki eng eskisi window kutgan bo'lsa."""
+        now = time.time()
+        with self._conn:
+            rows = self._conn.execute(
+                "SELECT id, payload, attempts, created_at FROM outbox "
+                "WHERE status = 'pending' AND kind = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (kind, now, max_count),
+            ).fetchall()
+            if not rows or (len(rows) < max_count and min(row[3] for row in rows) > now - window):
+                return []
+            # SELECT va UPDATE orasida boshqa jarayon olib qo'ygan yozuvlar to'plamga kirmaydi
+            return [
+                row[:3] for row in rows
+                if self._conn.execute(
+                    "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ? AND status = 'pending'",
+                    (now, row[0]),
+                ).rowcount
+            ]
+
+    def _mark_done(self, item_id: int):
+        with self._conn:
+            self._conn.execute("UPDATE outbox SET status = 'done', last_error = NULL WHERE id = ?", (item_id,))
+
+    def _reschedule(self, item_id: int, attempts: int, delay: float, error: str):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + delay, error[:500], item_id),
+            )
+
+    def _renew(self, item_ids: List[int]):
+        with self._conn:
+            self._conn.executemany("UPDATE outbox SET claimed_at = ? WHERE id = ? AND status = 'sending'",
+                                   [(time.time(), item_id) for item_id in item_ids])
+
+    def _prune(self) -> int:
+        with self._conn:
+            cur = self._conn.execute("DELETE FROM outbox WHERE status = 'done' AND claimed_at < ?",
+                                     (time.time() - self.retention,))
+        return cur.rowcount
+
+    def _release(self, item_ids: List[int]):
+        with self._conn:
+            self._conn.executemany("UPDATE outbox SET status = 'pending' WHERE id = ? AND status = 'sending'",
+                                   [(item_id,) for item_id in item_ids])
+
+    def _count_pending(self) -> int:
+        # IN - outbox_due indeksidan foydalanadi (yetkazilganlar ko'payib boradi)
+        return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Ommaviy interfeys ---
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Yozuvni navbatga qo'shish (diskka yozilgandan keyin qaytadi)."""
+        item_id = await self._run(self._insert, kind, json.dumps(payload, ensure_ascii=False))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return item_id
+
+    async def depth(self) -> int:
+        """Hali yetkazilmagan yozuvlar soni."""
+        return await self._run(self._count_pending)
+
+    def start(self, deliver: Deliver, deliver_batch: Optional[DeliverBatch] = None,
+              batch_key: Optional[BatchKey] = None):
+        """Fon ishchilarini ishga tushirish (batching bo'lsa deliver_batch ham kerak).
+
+        deliver_batch har bir guruh uchun alohida chaqiriladi (batch_key bo'lmasa - butun to'plam bitta guruh).
+        """
+        self._wakeup = asyncio.Event()
+        self._wakeup.set() # Qayta ishga tushishdan oldin qolgan yozuvlar uchun
+        if batch_key is not None:
+            self._batch_key = batch_key
+        self._tasks = [asyncio.create_task(self._worker(deliver, n)) for n in range(self.workers)]
+        self._tasks += [asyncio.create_task(self._batch_worker(deliver_batch, kind, window, max_count))
+                        for kind, (window, max_count) in self.batching.items()]
+        self._tasks.append(asyncio.create_task(self._lease_loop()))
+
+    async def _lease_loop(self):
+        """Yetkazilayotgan yozuvlar ijarasini yangilash va eski yetkazilganlarni o'chirish."""
+        last_prune = 0.0
+        while True:
+            await asyncio.sleep(LEASE_RENEW)
+            try:
+                if self._inflight:
+                    await self._run(self._renew, list(self._inflight))
+                if time.monotonic() - last_prune >= LEASE_TIMEOUT:
+                    last_prune = time.monotonic()
+                    pruned = await self._run(self._prune)
+                    if pruned:
+                        logging.info(f"Outbox: {pruned} ta eski yetkazilgan yozuv o'chirildi.")
+            except sqlite3.Error as e:
+                logging.error(f"Outbox ijarasini yangilashda xato: {e}")
+
+    async def _batch_worker(self, deliver_batch: DeliverBatch, kind: str, window: float, max_count: int):
+        """Bir turdagi yozuvlarni to'plab yetkazuvchi ishchi (har bir tur uchun bitta)."""
+        while True:
+            try:
+                items = await self._run(self._claim_batch, kind, window, max_count)
+            except sqlite3.Error as e:
+                logging.error(f"Outbox navbatidan o'qishda xato: {e}")
+                items = []
+            if not items:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            ids = [item[0] for item in items]
+            self._inflight.update(ids)
+            try:
+                await self._process_batch(deliver_batch, kind, items)
+            except sqlite3.Error as e:
+                # Ishchi to'xtamaydi: holati saqlanmagan yozuvlar ijara tugagach qayta olinadi
+                logging.error(f"Outbox to'plami #{ids[0]}..#{ids[-1]} holatini saqlashda xato: {e}")
+                await asyncio.sleep(POLL_INTERVAL)
+            except Exception as e:
+                logging.error(f"Outbox to'plami #{ids[0]}..#{ids[-1]} ni qayta ishlashda kutilmagan xato: {e!r}")
+                await asyncio.sleep(POLL_INTERVAL)
+            finally:
+                self._inflight.difference_update(ids)
+
+    async def _process_batch(self, deliver_batch: DeliverBatch, kind: str, items: List[Tuple[int, str, int]]):
+        groups: Dict[Hashable, List[Item]] = {}
+        for item_id, payload, attempts in items:
+            payload = json.loads(payload)
+            groups.setdefault(self._batch_key(kind, payload), []).append((item_id, payload, attempts))
+        groups_left = list(groups.values())
+        while groups_left:
+            group = groups_left.pop(0)
+            if not await self._process_group(deliver_batch, kind, group):
+                # Hali urinilmagan guruhlar: navbatga darhol qaytadi (xato bergan guruhni kutmaydi)
+                await self._run(self._release, [item[0] for rest in groups_left for item in rest])
+                return
+
+    async def _process_group(self, deliver_batch: DeliverBatch, kind: str, group: List[Item]) -> bool:
+        label = f"#{group[0][0]}..#{group[-1][0]} ({len(group)} ta)"
+        try:
+            await deliver_batch(kind, [payload for _, payload, _ in group])
+        except TelegramRetryAfter as e:
+            logging.warning(f"Outbox to'plami {label}: Telegram {e.retry_after} soniya kutishni so'radi.")
+            for item_id, _, attempts in group:
+                await self._run(self._reschedule, item_id, attempts, float(e.retry_after), str(e))
+            return False
+        except Exception as e:
+            attempts = max(item[2] for item in group) + 1
+            delay = min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+            log = logging.critical if attempts >= ALERT_ATTEMPTS else logging.error
+            log(f"Outbox to'plami {label} ({kind}) yetkazilmadi ({attempts}-urinish): {e}. {delay:.0f} soniyadan keyin qayta urinish.")
+            for item_id, _, _ in group:
+                await self._run(self._reschedule, item_id, attempts, delay, str(e))
+            return False
+        for item_id, _, _ in group:
+            await self._run(self._mark_done, item_id)
+        logging.info(f"Outbox to'plami {label} ({kind}) yetkazildi.")
+        return True
+
+    async def _worker(self, deliver: Deliver, n: int):
+        while True:
+            try:
+                item = await self._run(self._claim)
+            except sqlite3.Error as e:
+                logging.error(f"Outbox navbatidan o'qishda xato: {e}")
+                item = None
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._inflight.add(item[0])
+            try:
+                await self._process(deliver, *item)
+            except sqlite3.Error as e:
+                # Ishchi to'xtamaydi: holati saqlanmagan yozuv ijara tugagach qayta olinadi
+                logging.error(f"Outbox #{item[0]} holatini saqlashda xato: {e}")
+                await asyncio.sleep(POLL_INTERVAL)
+            except Exception as e:
+                logging.error(f"Outbox #{item[0]} ni qayta ishlashda kutilmagan xato: {e!r}")
+                await asyncio.sleep(POLL_INTERVAL)
+            finally:
+                self._inflight.discard(item[0])
+
+    async def _process(self, deliver: Deliver, item_id: int, kind: str, payload: str, attempts: int):
+        try:
+            await deliver(kind, json.loads(payload))
+        except TelegramRetryAfter as e:
+            # Telegram cheklovi: urinish sanalmaydi, aytilgan vaqtcha kutiladi
+            logging.warning(f"Outbox #{item_id}: Telegram {e.retry_after} soniya kutishni so'radi.")
+            await self._run(self._reschedule, item_id, attempts, float(e.retry_after), str(e))
+        except Exception as e:
+            attempts += 1
+            delay = min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF)
+            log = logging.critical if attempts >= ALERT_ATTEMPTS else logging.error
+            log(f"Outbox #{item_id} ({kind}) yetkazilmadi ({attempts}-urinish): {e}. {delay:.0f} soniyadan keyin qayta urinish.")
+            await self._run(self._reschedule, item_id, attempts, delay, str(e))
+        else:
+            await self._run(self._mark_done, item_id)
+            logging.info(f"Outbox #{item_id} ({kind}) yetkazildi.")
+
+    async def close(self):
+        """Ishchilarni to'xtatish va bazani yopish."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._inflight:
+            # Yarim yo'lda to'xtatilgan yozuvlar keyingi ishga tushishda qayta yuboriladi
+            await self._run(self._release, list(self._inflight))
+            self._inflight.clear()
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import metrics
+
+# --- Fayllarni Qayta Yuklash (hot reload) ---
+#
+# config.json va ish o'rinlari fayllari mtime/hajm bo'yicha har INTERVAL
+# soniyada tekshiriladi. O'zgarish bitta interval davomida barqaror qolsa
+# (muharrir faylni yozib bo'lgach) qayta yuklash funksiyasi chaqiriladi.
+# Yangi ma'lumot noto'g'ri bo'lsa, funksiya xato ko'taradi va eski holat
+# saqlanib qoladi.
+
+DEFAULT_INTERVAL = 2.0
+
+Signature = Tuple[Optional[Tuple[int, int]], ...]
+Reload = Callable[[], Awaitable[bool]]
+
+reloads_total = metrics.REGISTRY.counter("bot_reloads_total", "Fayllarni qayta yuklashlar", ("source", "result"))
+
+
+def _signature(paths: Sequence[str]) -> Signature:
+    result = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            result.append(None)
+        else:
+            result.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(result)
+
+
+class _Watch:
+    __slots__ = ("name", "paths", "reload", "seen", "loaded")
+
+    def __init__(self, name: str, paths: Sequence[str], reload: Reload):
+        self.name = name
+        self.paths = list(paths)
+        self.reload = reload
+        self.loaded = _signature(self.paths) # Ishga tushishdagi holat allaqachon yuklangan
+        self.seen = self.loaded
+
+
+class FileWatcher:
+    """Fayllarni davriy tekshirib, o'zgarganda qayta yuklovchi."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self._watches: List[_Watch] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, name: str, paths: Sequence[str], reload: Reload):
+        """`reload` - async funksiya: qayta yuklangan bo'lsa True, xato bo'lsa istisno."""
+        self._watches.append(_Watch(name, paths, reload))
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            for watch in self._watches:
+                signature = await loop.run_in_executor(None, _signature, watch.paths)
+                stable = signature == watch.seen
+                watch.seen = signature
+                if signature == watch.loaded or not stable:
+                    continue
+                watch.loaded = signature
+                await self._reload(watch)
+
+    async def _reload(self, watch: _Watch):
+        try:
+            reloaded = await watch.reload()
+        except Exception as e:
+            reloads_total.inc(watch.name, "error")
+            logging.error(f"{watch.name} qayta yuklanmadi, eski holat saqlandi: {e}")
+            return
+        if reloaded:
+            reloads_total.inc(watch.name, "ok")
+            logging.info(f"{watch.name} qayta yuklandi.")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
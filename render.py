@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message, MessageEntity, ReplyKeyboardMarkup, ReplyKeyboardRemove
+
+import metrics
+
+# --- Xabarlarni Yangilash (tahrirlarni tejash) ---
+#
+# "Ortga" va "Admin Panel" tugmalari ko'pincha xabarni aynan o'sha matn va
+# klaviatura bilan qayta tahrirlaydi - Telegram buni "message is not modified"
+# xatosi bilan rad etadi. Har bir (chat, xabar) uchun oxirgi so'rov izi va
+# Telegram qaytargan natija (matn, entities, klaviatura) cheklangan LRU'da
+# saqlanadi. Tahrir faqat iz yangi so'rovga mos kelsa VA callback bilan kelgan
+# xabar hali ham o'sha natijani ko'rsatsa tashlab ketiladi - xabarni boshqa
+# ishchi/jarayon o'zgartirgan bo'lsa, tahrir yuboriladi. Markdown tahrirlar
+# ham shu tarzda tejaladi. Tahrirlab bo'lmaydigan holatda (reply klaviatura,
+# xabar o'chirilgan yoki eskirgan) yangi xabar yuboriladi.
+
+MAX_MESSAGES = 10_000 # Izi saqlanadigan xabarlar soni (eng eskisi o'chiriladi)
+
+Markup = Union[InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove, None]
+
+render_calls = metrics.REGISTRY.counter(
+    "bot_render_calls_total",
+    "Xabarni yangilash natijalari (skipped - tejalgan API chaqiruvlari)",
+    ("action",), # edit, send, skipped, not_modified, fallback
+)
+
+# Telegram tahrirni rad etadigan, lekin yangi xabar yuborish mumkin bo'lgan holatlar
+_CANNOT_EDIT = ("message can't be edited", "message to edit not found", "there is no text in the message to edit")
+
+
+class _Rendered(NamedTuple):
+    """Oxirgi ko'rsatilgan holat: so'rov izi va Telegram qaytargan xabar."""
+    fingerprint: int
+    text: Optional[str]
+    entities: Optional[List[MessageEntity]]
+    reply_markup: Optional[InlineKeyboardMarkup]
+
+
+def _fingerprint(text: str, reply_markup: Markup, parse_mode: Optional[str]) -> int:
+    markup = reply_markup.model_dump_json(exclude_none=True) if reply_markup is not None else None
+    return hash((text, markup, parse_mode))
+
+
+class MessageRenderer:
+    """Har bir (chat, xabar) uchun oxirgi ko'rsatilgan holat izi bilan tahrirlash va yuborish."""
+
+    def __init__(self, max_messages: int = MAX_MESSAGES):
+        self.max_messages = max_messages
+        self._last: "OrderedDict[Tuple[int, int], _Rendered]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def _remember(self, message: Message, fingerprint: int):
+        key = (message.chat.id, message.message_id)
+        self._last[key] = _Rendered(fingerprint, message.text, message.entities, message.reply_markup)
+        self._last.move_to_end(key)
+        while len(self._last) > self.max_messages:
+            self._last.popitem(last=False)
+
+    def _unchanged(self, message: Message, fingerprint: int, text: str, reply_markup: Markup,
+                   parse_mode: Optional[str]) -> bool:
+        known = self._last.get((message.chat.id, message.message_id))
+        if known is None:
+            # Iz yo'q (masalan, qayta ishga tushgandan keyin): Markdown'siz matnni xabarning o'zi bilan solishtiramiz
+            return parse_mode is None and message.text == text and message.reply_markup == reply_markup
+        # Xabar hali ham biz ko'rsatgan holatda bo'lishi kerak (boshqa jarayon tahrirlamagan)
+        return (known.fingerprint == fingerprint and message.text == known.text
+                and message.entities == known.entities and message.reply_markup == known.reply_markup)
+
+    async def send(self, message: Message, text: str, reply_markup: Markup = None,
+                   parse_mode: Optional[str] = None) -> Message:
+        """Shu chatga yangi xabar yuborish va uning izini saqlash."""
+        sent = await message.answer(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        render_calls.inc("send")
+        self._remember(sent, _fingerprint(text, reply_markup, parse_mode))
+        return sent
+
+    async def edit(self, message: Message, text: str, reply_markup: Markup = None,
+                   parse_mode: Optional[str] = None) -> Message:
+        """Xabarni tahrirlash; o'zgarmagan bo'lsa API chaqirilmaydi, tahrirlab bo'lmasa yangi xabar yuboriladi."""
+        if reply_markup is not None and not isinstance(reply_markup, InlineKeyboardMarkup):
+            # Reply klaviaturani faqat yangi xabar bilan ko'rsatish mumkin
+            render_calls.inc("fallback")
+            return await self.send(message, text, reply_markup, parse_mode)
+
+        fingerprint = _fingerprint(text, reply_markup, parse_mode)
+        if self._unchanged(message, fingerprint, text, reply_markup, parse_mode):
+            render_calls.inc("skipped")
+            return message
+        try:
+            edited = await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        except TelegramBadRequest as e:
+            error = e.message.lower()
+            if "message is not modified" in error:
+                # Xabar allaqachon shu holatda (masalan, tugma ikki marta bosildi)
+                render_calls.inc("not_modified")
+                self._remember(message, fingerprint)
+                return message
+            if not any(reason in error for reason in _CANNOT_EDIT):
+                raise
+            render_calls.inc("fallback")
+            return await self.send(message, text, reply_markup, parse_mode)
+        render_calls.inc("edit")
+        if not isinstance(edited, Message):
+            return message
+        self._remember(edited, fingerprint)
+        return edited
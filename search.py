@@ -0,0 +1,139 @@
+import re
+from typing import Dict, List, Set, Tuple
+
+from vacancy_store import Snapshot
+
+# --- Ish O'rinlarini Qidirish (inline rejim) ---
+#
+# Barcha tumanlar va ish o'rinlari nomlari bo'yicha xotiradagi indeks:
+# uzun so'zlar uchun trigramlar (so'z ichidan qidirish), 1-2 harfli so'zlar
+# (masalan "12") uchun so'z boshlanishi. Matn avval normallashtiriladi:
+# kirill -> lotin, o‘/o'/oʻ/ў kabi variantlar va tutuq belgisi olib
+# tashlanadi, shuning uchun "Ғаллаорол", "G‘allaorol" va "gallaorol" bir xil.
+#
+# Indeks har so'rovda to'liq qurilmaydi: snapshot versiyasi o'zgarsa, faqat
+# qo'shilgan va o'chirilgan ish o'rinlari yangilanadi.
+
+NGRAM = 3
+PREFIX_MAX = NGRAM - 1 # Qisqa so'zlar uchun saqlanadigan boshlanish uzunligi
+
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g'", "д": "d", "е": "e", "ё": "yo", "ж": "j", "з": "z",
+    "и": "i", "й": "y", "к": "k", "қ": "q", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ў": "o'", "ф": "f", "х": "x", "ҳ": "h", "ц": "s", "ч": "ch", "ш": "sh",
+    "щ": "sh", "ъ": "'", "ы": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+APOSTROPHES = "'‘’ʻʼ`´"
+_TRANSLATE = str.maketrans({**CYRILLIC, **{char: "" for char in APOSTROPHES}})
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+Result = Tuple[int, str, str] # (ID, tuman, ish o'rni)
+
+
+def normalize(text: str) -> str:
+    """Qidiruv uchun: kichik harf, lotin yozuvi, tutuq belgilarisiz, so'zlar bitta bo'shliq bilan."""
+    # Kirill harflari lotinga o'giriladi, barcha tutuq belgilari olib tashlanadi: o'/g'/ў/ғ -> o/g
+    text = text.lower().translate(_TRANSLATE)
+    # Kirilldan kelgan "'" (ғ -> g') ikkinchi marta olib tashlanadi
+    return _NON_WORD.sub(" ", text.replace("'", "")).strip()
+
+
+def _tokens(text: str) -> List[str]:
+    return text.split()
+
+
+def _grams(token: str) -> Set[str]:
+    return {token[i:i + NGRAM] for i in range(len(token) - NGRAM + 1)}
+
+
+def _natural_key(text: str) -> List[object]:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+
+class SearchIndex:
+    """Ish o'rinlari bo'yicha n-gram/prefiks indeksi (VacancyStore snapshot'lari bilan sinxronlanadi)."""
+
+    def __init__(self):
+        self.version = -1
+        self._docs: Dict[int, Tuple[str, str, List[str]]] = {} # ID -> (tuman, ish o'rni, so'zlar)
+        self._grams: Dict[str, Set[int]] = {}
+        self._prefixes: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _keys(self, tokens: List[str]) -> Tuple[Set[str], Set[str]]:
+        grams: Set[str] = set()
+        prefixes: Set[str] = set()
+        for token in tokens:
+            grams |= _grams(token)
+            prefixes.update(token[:n] for n in range(1, min(len(token), PREFIX_MAX) + 1))
+        return grams, prefixes
+
+    def _add(self, job_id: int, tuman: str, job: str):
+        tokens = _tokens(normalize(f"{tuman} {job}"))
+        self._docs[job_id] = (tuman, job, tokens)
+        grams, prefixes = self._keys(tokens)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(job_id)
+        for prefix in prefixes:
+            self._prefixes.setdefault(prefix, set()).add(job_id)
+
+    def _remove(self, job_id: int):
+        _, _, tokens = self._docs.pop(job_id)
+        grams, prefixes = self._keys(tokens)
+        for postings, keys in ((self._grams, grams), (self._prefixes, prefixes)):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(job_id)
+                    if not ids:
+                        del postings[key]
+
+    def sync(self, snapshot: Snapshot):
+        """Indeksni snapshot'ga moslash: faqat qo'shilgan/o'chirilgan ish o'rinlari qayta ishlanadi."""
+        if snapshot.version == self.version:
+            return
+        current = snapshot.jobs_by_id
+        for job_id in [job_id for job_id in self._docs if job_id not in current]:
+            self._remove(job_id)
+        for job_id, (tuman, job) in current.items():
+            if job_id not in self._docs:
+                self._add(job_id, tuman, job)
+        self.version = snapshot.version
+
+    def _candidates(self, token: str) -> Set[int]:
+        if len(token) < NGRAM:
+            return self._prefixes.get(token, set())
+        postings = [self._grams.get(gram) for gram in _grams(token)]
+        if not all(postings):
+            return set()
+        return set.intersection(*sorted(postings, key=len))
+
+    @staticmethod
+    def _matches(token: str, tokens: List[str]) -> bool:
+        if len(token) < NGRAM:
+            return any(word.startswith(token) for word in tokens)
+        return any(token in word for word in tokens)
+
+    def search(self, query: str) -> List[Result]:
+        """So'rovdagi barcha so'zlar mos kelgan ish o'rinlari, eng mosi birinchi."""
+        tokens = _tokens(normalize(query))
+        if not tokens:
+            ids: Set[int] = set(self._docs)
+        else:
+            ids = None
+            for token in sorted(tokens, key=len, reverse=True): # Uzun so'z - kamroq nomzod
+                candidates = self._candidates(token)
+                ids = candidates if ids is None else ids & candidates
+                if not ids:
+                    return []
+            # Trigramlar so'z ichida ketma-ket kelmasligi mumkin: aniq tekshiruv
+            ids = {job_id for job_id in ids if all(self._matches(token, self._docs[job_id][2]) for token in tokens)}
+
+        def rank(job_id: int):
+            tuman, job, words = self._docs[job_id]
+            exact = sum(token in words for token in tokens)
+            return -exact, tuman, _natural_key(job.lower())
+
+        return [(job_id, *self._docs[job_id][:2]) for job_id in sorted(ids, key=rank)]
@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramForbiddenError
+
+import metrics
+from throttle import TokenBucket, priority, PRIORITY_LOW
+
+# --- Obunalar va Ommaviy Xabarlar ---
+#
+# Arizachilar tumanlarga obuna bo'ladi (SQLite, (tuman, user_id) indeksi).
+# Tumanga ish o'rni qo'shilganda darhol xabar yuborilmaydi: tuman uchun
+# bitta "broadcast" yozuvi COALESCE_DELAY soniyaga kechiktiriladi va shu
+# vaqt ichida qo'shilgan boshqa ish o'rinlari uni yana surib qo'yadi (lekin
+# MAX_DELAY dan ortiq emas) - ketma-ket 10 ta ish o'rni bitta xabar bo'ladi.
+# Yuborish user_id tartibida sahifalab boriladi va har sahifadan keyin
+# "last_user_id" saqlanadi: bot qulasa, xabar shu joydan davom ettiriladi.
+# Tezlik o'z token bucket'i va bir vaqtdagi so'rovlar soni bilan cheklanadi,
+# so'rovlar PRIORITY_LOW bilan yuboriladi - arizalar va javoblar kutmaydi.
+#
+# Bir nechta bot jarayoni bitta bazada ishlasa, xabarni faqat bittasi
+# yuboradi: olingan yozuvga egasi (owner) va ijara vaqti (claimed_at)
+# yoziladi, ijara yuborish davomida har LEASE_RENEW soniyada yangilanadi.
+# Boshqa jarayon "sending" yozuvni faqat ijarasi LEASE_TIMEOUT dan ko'p
+# yangilanmagan bo'lsa (egasi qulagan) davom ettiradi.
+
+COALESCE_DELAY = 60.0 # Oxirgi qo'shilgan ish o'rnidan keyin kutish (soniya)
+MAX_DELAY = 600.0 # Birinchi qo'shilgan ish o'rnidan keyin ko'pi bilan kutish (soniya)
+PAGE_SIZE = 200 # Bitta sahifadagi obunachilar (checkpoint oralig'i)
+DEFAULT_RATE = 20.0 # Soniyasiga xabarlar (umumiy 30 dan javoblar uchun joy qoladi)
+DEFAULT_CONCURRENCY = 8
+POLL_INTERVAL = 5.0
+LEASE_TIMEOUT = 300.0 # Shuncha vaqt ijarasi yangilanmagan "sending" xabarni boshqa jarayon davom ettiradi
+LEASE_RENEW = LEASE_TIMEOUT / 3 # Yuborilayotgan xabar ijarasini yangilash oralig'i (soniya)
+
+Send = Callable[[int, str], Awaitable[None]]
+Active = Callable[[str], bool]
+
+broadcast_messages = metrics.REGISTRY.counter("bot_broadcast_messages_total", "Obunachilarga yuborilgan xabarlar",
+                                              ("result",))
+
+
+class LeaseLost(Exception):
+    """Xabar ijarasi boshqa jarayonga o'tgan - yuborishni to'xtatish kerak."""
+
+
+class Subscriptions:
+    """Tumanlarga obunalar indeksi va ommaviy xabar yuboruvchi."""
+
+    def __init__(self, path: str, rate: float = DEFAULT_RATE, concurrency: int = DEFAULT_CONCURRENCY,
+                 coalesce_delay: float = COALESCE_DELAY, max_delay: float = MAX_DELAY):
+        self.path = path
+        self.rate = rate
+        self.concurrency = concurrency
+        self.coalesce_delay = coalesce_delay
+        self.max_delay = max_delay
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._owner = uuid.uuid4().hex # Shu jarayonning ijara belgisi
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="subscriptions")
+        self._conn = self._executor.submit(self._connect).result()
+
+    # --- Baza bilan ishlash (executor oqimida) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " tuman TEXT NOT NULL,"
+            " user_id INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (tuman, user_id)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS subscriptions_user ON subscriptions (user_id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcasts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " tuman TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " created_at REAL NOT NULL,"
+            " due_at REAL NOT NULL,"
+            " last_user_id INTEGER NOT NULL DEFAULT 0,"
+            " sent INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " owner TEXT,"
+            " claimed_at REAL)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(broadcasts)")}
+        if "owner" not in columns:
+            # Eski baza: ijara ustunlari keyin qo'shilgan
+            conn.execute("ALTER TABLE broadcasts ADD COLUMN owner TEXT")
+            conn.execute("ALTER TABLE broadcasts ADD COLUMN claimed_at REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS broadcasts_due ON broadcasts (status, due_at)")
+        conn.commit()
+        return conn
+
+    def _subscribe(self, user_id: int, tumans: List[str]):
+        now = time.time()
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO subscriptions (tuman, user_id, created_at) VALUES (?, ?, ?)",
+                                   [(tuman, user_id, now) for tuman in tumans])
+
+    def _unsubscribe(self, user_id: int, tumans: Optional[List[str]]):
+        with self._conn:
+            if tumans is None:
+                self._conn.execute("DELETE FROM subscriptions WHERE user_id = ?", (user_id,))
+            else:
+                self._conn.executemany("DELETE FROM subscriptions WHERE tuman = ? AND user_id = ?",
+                                       [(tuman, user_id) for tuman in tumans])
+
+    def _user_tumans(self, user_id: int) -> Set[str]:
+        return {row[0] for row in self._conn.execute("SELECT tuman FROM subscriptions WHERE user_id = ?", (user_id,))}
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(DISTINCT user_id) FROM subscriptions").fetchone()[0]
+
+    def _schedule(self, tumans: List[str]):
+        """Tuman uchun kutayotgan xabar bo'lsa - surib qo'yish, bo'lmasa - yangisini qo'shish."""
+        now = time.time()
+        with self._conn:
+            for tuman in tumans:
+                row = self._conn.execute(
+                    "SELECT id, created_at FROM broadcasts WHERE tuman = ? AND status = 'pending'", (tuman,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("INSERT INTO broadcasts (tuman, created_at, due_at) VALUES (?, ?, ?)",
+                                       (tuman, now, now + self.coalesce_delay))
+                else:
+                    due_at = min(now + self.coalesce_delay, row[1] + self.max_delay)
+                    self._conn.execute("UPDATE broadcasts SET due_at = ? WHERE id = ?", (due_at, row[0]))
+
+    def _claim(self) -> Optional[Tuple[int, str, int, int, int]]:
+        """Ijarasi tugagan (egasi qulagan) yoki vaqti kelgan xabarni olish."""
+        now = time.time()
+        claimable = "((status = 'sending' AND COALESCE(claimed_at, 0) < ?) OR (status = 'pending' AND due_at <= ?))"
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT id, tuman, last_user_id, sent, failed FROM broadcasts "
+                f"WHERE {claimable} ORDER BY status = 'sending' DESC, due_at LIMIT 1",
+                (now - LEASE_TIMEOUT, now),
+            ).fetchone()
+            if row is None:
+                return None
+            # "sending" bo'lgach, shu tumandagi yangi ish o'rinlari keyingi xabarga yig'iladi
+            cur = self._conn.execute(
+                f"UPDATE broadcasts SET status = 'sending', owner = ?, claimed_at = ? WHERE id = ? AND {claimable}",
+                (self._owner, now, row[0], now - LEASE_TIMEOUT, now),
+            )
+            if cur.rowcount == 0:
+                return None # Boshqa jarayon olib qo'ydi
+        return row
+
+    def _next_due(self) -> Optional[float]:
+        return self._conn.execute("SELECT MIN(due_at) FROM broadcasts WHERE status = 'pending'").fetchone()[0]
+
+    def _page(self, tuman: str, after: int) -> List[int]:
+        return [row[0] for row in self._conn.execute(
+            "SELECT user_id FROM subscriptions WHERE tuman = ? AND user_id > ? ORDER BY user_id LIMIT ?",
+            (tuman, after, PAGE_SIZE),
+        )]
+
+    def _renew(self, broadcast_id: int) -> bool:
+        with self._conn:
+            cur = self._conn.execute(
+                "UPDATE broadcasts SET claimed_at = ? WHERE id = ? AND status = 'sending' AND owner = ?",
+                (time.time(), broadcast_id, self._owner),
+            )
+        return cur.rowcount > 0
+
+    def _checkpoint(self, broadcast_id: int, last_user_id: int, sent: int, failed: int, blocked: List[int]):
+        with self._conn:
+            cur = self._conn.execute(
+                "UPDATE broadcasts SET last_user_id = ?, sent = ?, failed = ?, claimed_at = ? "
+                "WHERE id = ? AND status = 'sending' AND owner = ?",
+                (last_user_id, sent, failed, time.time(), broadcast_id, self._owner),
+            )
+            if cur.rowcount == 0:
+                raise LeaseLost(broadcast_id)
+            # Botni bloklaganlar boshqa tumanlardan ham chiqariladi
+            self._conn.executemany("DELETE FROM subscriptions WHERE user_id = ?", [(user_id,) for user_id in blocked])
+
+    def _finish(self, broadcast_id: int):
+        with self._conn:
+            self._conn.execute("UPDATE broadcasts SET status = 'done' WHERE id = ? AND owner = ?",
+                               (broadcast_id, self._owner))
+
+    def _release(self):
+        """To'xtatilgan jarayon ijaralarini bo'shatish: qayta ishga tushganda darhol davom ettiriladi."""
+        with self._conn:
+            self._conn.execute("UPDATE broadcasts SET claimed_at = NULL WHERE status = 'sending' AND owner = ?",
+                               (self._owner,))
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Ommaviy interfeys ---
+
+    async def subscribe(self, user_id: int, tumans: Iterable[str]):
+        await self._run(self._subscribe, user_id, list(tumans))
+
+    async def unsubscribe(self, user_id: int, tumans: Optional[Iterable[str]] = None):
+        """Obunani bekor qilish (tumans=None - barcha tumanlardan)."""
+        await self._run(self._unsubscribe, user_id, None if tumans is None else list(tumans))
+
+    async def user_tumans(self, user_id: int) -> Set[str]:
+        return await self._run(self._user_tumans, user_id)
+
+    async def count(self) -> int:
+        """Obunachilar soni (metrika uchun)."""
+        return await self._run(self._count)
+
+    async def notify(self, tumans: Iterable[str]):
+        """Tumanlarda yangi ish o'rni paydo bo'ldi: xabarni rejalashtirish (birlashtirib)."""
+        tumans = sorted(set(tumans))
+        if tumans:
+            await self._run(self._schedule, tumans)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def start(self, send: Send, active: Active):
+        """Fon ishchisini ishga tushirish. send(user_id, tuman) - bitta xabar; active(tuman) - hali ish o'rni bormi."""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._loop(send, active))
+
+    async def _loop(self, send: Send, active: Active):
+        bucket = TokenBucket(self.rate, self.rate)
+        while True:
+            try:
+                claimed = await self._run(self._claim)
+            except sqlite3.Error as e:
+                logging.error(f"Obunachilarga xabar navbatidan o'qishda xato: {e}")
+                claimed = None
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    next_due = await self._run(self._next_due)
+                except sqlite3.Error:
+                    next_due = None
+                timeout = POLL_INTERVAL if next_due is None else min(POLL_INTERVAL, max(0.0, next_due - time.time()))
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            renewer = asyncio.create_task(self._lease_loop(claimed[0]))
+            try:
+                await self._broadcast(send, active, bucket, *claimed)
+            except LeaseLost:
+                logging.warning(f"Obunachilarga xabar #{claimed[0]} ijarasi boshqa jarayonga o'tdi, to'xtatildi.")
+            except sqlite3.Error as e:
+                # Checkpoint'dan keyingi ishga tushishda yoki keyingi aylanishda davom etadi
+                logging.error(f"Obunachilarga xabar #{claimed[0]} to'xtadi: {e}")
+                await asyncio.sleep(POLL_INTERVAL)
+            finally:
+                renewer.cancel()
+                await asyncio.gather(renewer, return_exceptions=True)
+
+    async def _lease_loop(self, broadcast_id: int):
+        """Yuborilayotgan xabar ijarasini yangilab turish."""
+        while True:
+            await asyncio.sleep(LEASE_RENEW)
+            try:
+                if not await self._run(self._renew, broadcast_id):
+                    return # Ijara yo'qolgan: keyingi checkpoint yuborishni to'xtatadi
+            except sqlite3.Error as e:
+                logging.error(f"Obunachilarga xabar #{broadcast_id} ijarasini yangilashda xato: {e}")
+
+    async def _broadcast(self, send: Send, active: Active, bucket: TokenBucket,
+                         broadcast_id: int, tuman: str, last_user_id: int, sent: int, failed: int):
+        if not active(tuman):
+            # Xabar kutilayotganda tuman tozalangan
+            await self._run(self._finish, broadcast_id)
+            logging.info(f"Obunachilarga xabar #{broadcast_id} ({tuman}) bekor qilindi: ish o'rinlari qolmagan.")
+            return
+        if last_user_id:
+            logging.info(f"Obunachilarga xabar #{broadcast_id} ({tuman}) {last_user_id} dan davom ettirilmoqda.")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = {"sent": sent, "failed": failed}
+        blocked: List[int] = []
+
+        async def deliver(user_id: int):
+            try:
+                with priority(PRIORITY_LOW):
+                    await send(user_id, tuman)
+            except TelegramForbiddenError:
+                blocked.append(user_id) # Botni bloklagan yoki akkauntini o'chirgan
+                results["failed"] += 1
+                broadcast_messages.inc("blocked")
+            except Exception as e:
+                results["failed"] += 1
+                broadcast_messages.inc("error")
+                logging.warning(f"Obunachi {user_id} ga xabar yuborilmadi: {e}")
+            else:
+                results["sent"] += 1
+                broadcast_messages.inc("sent")
+            finally:
+                semaphore.release()
+
+        while True:
+            page = await self._run(self._page, tuman, last_user_id)
+            if not page:
+                break
+            tasks = []
+            for user_id in page:
+                await semaphore.acquire()
+                delay = bucket.wait_time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                bucket.take()
+                tasks.append(asyncio.create_task(deliver(user_id)))
+            await asyncio.gather(*tasks)
+            last_user_id = page[-1]
+            await self._run(self._checkpoint, broadcast_id, last_user_id, results["sent"], results["failed"], blocked)
+            blocked = []
+
+        await self._run(self._finish, broadcast_id)
+        logging.info(f"Obunachilarga xabar #{broadcast_id} ({tuman}) yakunlandi: "
+                     f"{results['sent']} ta yuborildi, {results['failed']} ta xato.")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            try:
+                await self._run(self._release)
+            except sqlite3.Error as e:
+                logging.error(f"Obunachilarga xabar ijarasini bo'shatishda xato: {e}")
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from archive import Archive
+from bulk_import import tuman_index
+
+TUMANS = tuman_index(["Zomin", "Forish"])
+
+
+def application(name, phone, tuman="Zomin", job="5-DMTT"):
+    return {"user_id": 1, "tuman": tuman, "job": job, "name": name, "phone": phone, "passport_info": "-",
+            "documents": [{"file_unique_id": f"U{phone}"}]}
+
+
+@pytest.fixture
+def find(tmp_path):
+    archive = Archive(str(tmp_path / "bot.db"))
+    loop = asyncio.new_event_loop()
+    for app in (application("Ali Valiyev", "+998 90 123 45 67"),
+                application("Vali 100%_foiz", "901239999", tuman="Forish", job="1-DMTT"),
+                application("Olim Karimov", "+998931112233")):
+        loop.run_until_complete(archive.add(app))
+
+    def run(query):
+        return [row["name"] for row in loop.run_until_complete(archive.find(query, TUMANS))]
+
+    yield run
+    loop.run_until_complete(archive.close())
+    loop.close()
+
+
+@pytest.mark.parametrize("query, names", [
+    ("+998 90 123 45 67", ["Ali Valiyev"]),
+    ("901234567", ["Ali Valiyev"]),
+    ("90 123", ["Vali 100%_foiz", "Ali Valiyev"]),
+    ("+998 90 12", ["Vali 100%_foiz", "Ali Valiyev"]),
+    ("+998 93", ["Olim Karimov"]),
+    ("+998 94", []),
+])
+def test_find_by_phone(find, query, names):
+    assert find(query) == names
+
+
+def test_find_by_tuman_job_and_id(find):
+    assert find("forish") == ["Vali 100%_foiz"]
+    assert find("Zomin / 5-DMTT") == ["Olim Karimov", "Ali Valiyev"]
+    assert find("#1") == ["Ali Valiyev"]
+
+
+def test_find_by_name_escapes_like_wildcards(find):
+    assert find("valiy") == ["Ali Valiyev"]
+    assert find("%_") == ["Vali 100%_foiz"]
+    assert find("_") == ["Vali 100%_foiz"]
@@ -0,0 +1,31 @@
+from bulk_import import parse_rows, parse_text, split_line, tuman_index
+
+TUMANS = ["Arnasoy tumani", "G'allaorol", "Zomin", "Forish"]
+INDEX = tuman_index(TUMANS)
+
+
+def test_parse_rows_resolves_tumans_and_skips_duplicates():
+    rows = [["Tuman", "Ish o'rni"], ["zomin", "5-DMTT"], ["Arnasoy", "1-DMTT"], ["G‘allaorol tumani", "2-DMTT"],
+            ["Zomin", "5-DMTT"], ["", ""], ["7-DMTT"]]
+    result = parse_rows(rows, "Forish", INDEX)
+    assert result.items == [("Zomin", "5-DMTT"), ("Arnasoy tumani", "1-DMTT"), ("G'allaorol", "2-DMTT"),
+                            ("Forish", "7-DMTT")]
+    assert result.duplicates == 1
+    assert result.errors == []
+
+
+def test_parse_rows_reports_unknown_and_missing_tuman():
+    result = parse_rows([["Toshkent", "1-DMTT"], ["2-DMTT"]], None, INDEX)
+    assert result.items == []
+    assert result.errors == ["1-qator: noma'lum tuman \"Toshkent\"", "2-qator: tuman ko'rsatilmagan"]
+
+
+def test_split_line_prefers_separator_after_known_tuman():
+    assert split_line("Zomin; 5-DMTT: 0,5 stavka", INDEX) == ["Zomin", " 5-DMTT: 0,5 stavka"]
+    assert split_line("12-DMTT", INDEX) == ["12-DMTT"]
+
+
+def test_mistyped_tuman_is_reported_not_added_to_default():
+    result = parse_text("Zomn: 5-DMTT\nForish: 3-DMTT\n8-DMTT", "Zomin", INDEX)
+    assert result.items == [("Forish", "3-DMTT"), ("Zomin", "8-DMTT")]
+    assert result.errors == ["1-qator: noma'lum tuman \"Zomn\""]
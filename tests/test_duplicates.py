@@ -0,0 +1,18 @@
+from duplicates import DuplicateIndex
+
+
+def application(phone="+998 90 123 45 67", unique_id="U1"):
+    return {"tuman": "Zomin", "job": "5-DMTT", "phone": phone, "documents": [{"file_unique_id": unique_id}, None]}
+
+
+def test_add_and_remove_application():
+    index = DuplicateIndex()
+    index.add(application())
+    assert index.has_application("901234567", "Zomin", "5-DMTT")
+    assert index.find_file(["U1"], "Zomin", "5-DMTT")
+    assert not index.find_file(["U1"], "Zomin", "6-DMTT")
+
+    index.remove(application())
+    assert not index.has_application("901234567", "Zomin", "5-DMTT")
+    assert not index.find_file(["U1"], "Zomin", "5-DMTT")
+    assert len(index) == 0
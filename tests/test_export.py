@@ -0,0 +1,31 @@
+import csv
+import zipfile
+
+from export import write_csv, write_xlsx
+
+HEADER = ["F.I.Sh.", "Telefon", "Pasport"]
+ROWS = [["=HYPERLINK(\"http://x\")", "+A1", "@SUM(A1)"], ["Ali Valiyev", 901234567, "-"],
+        ["-2+3+cmd|' /C calc'!A0", "+998 (90) 123-45-67", "+998901234567"]]
+
+
+def test_csv_neutralizes_formula_like_cells(tmp_path):
+    path = tmp_path / "a.csv"
+    write_csv(str(path), HEADER, iter(ROWS))
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[1] == ["'=HYPERLINK(\"http://x\")", "'+A1", "'@SUM(A1)"]
+    assert rows[2] == ["Ali Valiyev", "901234567", "-"]
+    # Telefon raqamlari o'zgarmaydi, raqamdan keyin formula bo'lsa - himoyalanadi
+    assert rows[3] == ["'-2+3+cmd|' /C calc'!A0", "+998 (90) 123-45-67", "+998901234567"]
+
+
+def test_xlsx_stores_formula_like_cells_as_text(tmp_path):
+    from openpyxl import load_workbook
+
+    path = tmp_path / "a.xlsx"
+    write_xlsx(str(path), [("Arizalar", HEADER, iter(ROWS))])
+    sheet = load_workbook(path)["Arizalar"]
+    assert [cell.value for cell in sheet[2]] == ROWS[0]
+    assert all(cell.data_type == "s" for cell in sheet[2])
+    assert sheet["B3"].value == 901234567
+    assert "<f>" not in zipfile.ZipFile(path).read("xl/worksheets/sheet1.xml").decode()
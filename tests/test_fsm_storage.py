@@ -0,0 +1,114 @@
+import asyncio
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import DOCUMENT_KEYS, Draft, SQLiteStorage, _key_str, sessions_closed
+from outbox import Outbox
+
+DOCUMENT = {"file_id": "F1", "file_unique_id": "U1", "file_name": None, "mime_type": "application/pdf",
+            "file_size": 100}
+
+
+def test_draft_round_trip_keeps_document_keys():
+    data = {"selected_tuman": "Zomin", "selected_job": "5-DMTT", "selected_job_id": 7, "name": "Ali",
+            "diploma_info": DOCUMENT, "tuman": "Forish"}
+    draft = Draft.from_dict(data)
+    assert draft.extra == {"tuman": "Forish"}
+    assert isinstance(draft.diploma_info, tuple)
+    restored = draft.to_dict()
+    assert restored == data
+    assert set(restored["diploma_info"]) == set(DOCUMENT_KEYS)
+
+
+def test_draft_keeps_unknown_document_shape_in_extra():
+    data = {"reference_info": {"file_id": "F", "thumbnail": "T"}}
+    assert Draft.from_dict(data).to_dict() == data
+
+
+def test_empty_draft_is_falsy():
+    assert not Draft.from_dict({})
+    assert Draft.from_dict({"name": "Ali"})
+
+
+def test_storage_persists_state_and_data(tmp_path):
+    path = str(tmp_path / "bot.db")
+    key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def write():
+        storage = SQLiteStorage(path)
+        await storage.set_state(key, "Form:waiting_for_reference_letter")
+        await storage.set_data(key, {"name": "Ali", "diploma_info": DOCUMENT})
+        await storage.close()
+
+    async def read():
+        storage = SQLiteStorage(path)
+        try:
+            return await storage.get_state(key), await storage.get_data(key)
+        finally:
+            await storage.close()
+
+    asyncio.run(write())
+    state, data = asyncio.run(read())
+    assert state == "Form:waiting_for_reference_letter"
+    assert data == {"name": "Ali", "diploma_info": DOCUMENT}
+
+
+def test_other_writers_invalidate_only_changed_keys(tmp_path):
+    path = str(tmp_path / "bot.db")
+    first_key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+    second_key = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+    async def scenario():
+        mine = SQLiteStorage(path, validate_interval=0)
+        other = SQLiteStorage(path, validate_interval=0)
+        outbox = Outbox(path)
+        try:
+            await mine.set_state(first_key, "Form:waiting_for_name")
+            await mine.set_state(second_key, "Form:waiting_for_phone")
+            await mine.flush()
+            cached = mine._cache[_key_str(first_key)]
+
+            # Boshqa jadvalga yozish FSM keshini tozalamaydi
+            await outbox.enqueue("application", {"name": "Ali"})
+            assert await mine.get_state(first_key) == "Form:waiting_for_name"
+            assert mine._cache[_key_str(first_key)] is cached
+
+            # Boshqa jarayon bitta sessiyani o'zgartiradi, ikkinchisini tozalaydi
+            await other.set_state(first_key, "Form:waiting_for_diploma")
+            await other.set_state(second_key, None)
+            await other.flush()
+            assert await mine.get_state(first_key) == "Form:waiting_for_diploma"
+            assert await mine.get_state(second_key) is None
+        finally:
+            await outbox.close()
+            await other.close()
+            await mine.close()
+
+    asyncio.run(scenario())
+
+
+def test_only_submitted_applications_count_as_completed(tmp_path):
+    cancelled = StorageKey(bot_id=1, chat_id=10, user_id=10)
+    submitted = StorageKey(bot_id=1, chat_id=20, user_id=20)
+    completed_before = sessions_closed.value("completed")
+    cleared_before = sessions_closed.value("cleared")
+
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "bot.db"))
+        try:
+            for key in (cancelled, submitted):
+                state = FSMContext(storage, key)
+                await state.set_state("Form:waiting_for_phone")
+                await state.update_data(name="Ali")
+            await FSMContext(storage, cancelled).clear() # Bekor qilish / menyu
+            await storage.complete(submitted)
+            assert await storage.get_state(submitted) is None
+            assert await storage.get_data(submitted) == {}
+            await FSMContext(storage, submitted).clear() # Bo'sh sessiya qayta hisoblanmaydi
+        finally:
+            await storage.close()
+
+    asyncio.run(scenario())
+    assert sessions_closed.value("completed") == completed_before + 1
+    assert sessions_closed.value("cleared") == cleared_before + 1
@@ -0,0 +1,45 @@
+import importlib
+import os
+import shutil
+
+import pytest
+
+REPO_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.json")
+
+
+@pytest.fixture(scope="module")
+def bot_module(tmp_path_factory):
+    # bot.py import paytida joriy papkadagi config.json, data.json va bot.db bilan ishlaydi
+    work = tmp_path_factory.mktemp("bot")
+    shutil.copy(REPO_CONFIG, work / "config.json")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(work)
+        module = importlib.import_module("bot")
+        yield module
+
+
+def test_keyboard_is_built_once_per_version(bot_module):
+    bot_module.store.add_job("Zomin", "1-DMTT")
+    keyboard = bot_module.user_tumans_keyboard()
+    assert bot_module.user_tumans_keyboard() is keyboard
+    assert bot_module.jobs_page_keyboard("Zomin", 0) is bot_module.jobs_page_keyboard("Zomin", 0)
+
+
+def test_version_bump_invalidates_cache(bot_module):
+    keyboard = bot_module.user_tumans_keyboard()
+    jobs_page = bot_module.jobs_page_keyboard("Zomin", 0)
+    version = bot_module.store.snapshot.version
+
+    bot_module.store.add_job("Zomin", "2-DMTT")
+    assert bot_module.store.snapshot.version > version
+    assert bot_module.user_tumans_keyboard() is not keyboard
+    new_page = bot_module.jobs_page_keyboard("Zomin", 0)
+    assert new_page is not jobs_page
+    assert [button.text for row in new_page.inline_keyboard for button in row][:2] == ["💼 1-DMTT", "💼 2-DMTT"]
+
+
+def test_unchanged_mutation_keeps_cache(bot_module):
+    keyboard = bot_module.user_tumans_keyboard()
+    # Mavjud ish o'rni qayta qo'shilmaydi - versiya va kesh o'zgarmaydi
+    assert bot_module.store.add_job("Zomin", "1-DMTT") is False
+    assert bot_module.user_tumans_keyboard() is keyboard
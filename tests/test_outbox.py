@@ -0,0 +1,204 @@
+import asyncio
+
+import pytest
+
+import outbox as outbox_module
+from outbox import Outbox
+
+
+def call(outbox, func, *args):
+    # Ulanish executor oqimiga bog'langan
+    return outbox._executor.submit(func, *args).result()
+
+
+def backdate(outbox, item_id, seconds):
+    def update():
+        with outbox._conn:
+            outbox._conn.execute("UPDATE outbox SET claimed_at = claimed_at - ? WHERE id = ?", (seconds, item_id))
+    call(outbox, update)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "bot.db")
+
+
+@pytest.fixture
+def make_outbox(db):
+    created = []
+
+    def make(**kwargs):
+        outbox = Outbox(db, **kwargs)
+        created.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in created:
+        call(outbox, outbox._conn.close)
+        outbox._executor.shutdown(wait=True)
+
+
+def test_claim_takes_each_item_once(make_outbox):
+    first, second = make_outbox(), make_outbox()
+    item_id = call(first, first._insert, "application", "{}")
+    assert call(first, first._claim)[0] == item_id
+    assert call(second, second._claim) is None
+
+
+def test_expired_lease_is_reclaimed(make_outbox):
+    first, second = make_outbox(), make_outbox()
+    item_id = call(first, first._insert, "application", "{}")
+    call(first, first._claim)
+    backdate(first, item_id, outbox_module.LEASE_TIMEOUT + 1)
+    assert call(second, second._claim)[0] == item_id
+
+
+def test_renewed_lease_is_not_reclaimed(make_outbox):
+    first, second = make_outbox(), make_outbox()
+    item_id = call(first, first._insert, "application", "{}")
+    call(first, first._claim)
+    backdate(first, item_id, outbox_module.LEASE_TIMEOUT + 1)
+    call(first, first._renew, [item_id])
+    assert call(second, second._claim) is None
+
+
+def test_prune_removes_only_old_done_items(make_outbox):
+    outbox = make_outbox(retention=60)
+    old, recent, pending = (call(outbox, outbox._insert, "application", "{}") for _ in range(3))
+    for item_id in (old, recent):
+        call(outbox, outbox._claim)
+        call(outbox, outbox._mark_done, item_id)
+    backdate(outbox, old, 120)
+    assert call(outbox, outbox._prune) == 1
+    ids = [row[0] for row in call(outbox, lambda: outbox._conn.execute("SELECT id FROM outbox").fetchall())]
+    assert ids == [recent, pending]
+
+
+def test_delivery_marks_done_and_retries_failures(make_outbox):
+    outbox = make_outbox()
+    delivered = []
+
+    async def deliver(kind, payload):
+        if payload["fail"] and not delivered:
+            delivered.append(None)
+            raise RuntimeError("tarmoq xatosi")
+        delivered.append(payload["n"])
+
+    async def run():
+        failing = await outbox.enqueue("application", {"n": 1, "fail": True})
+        await outbox.enqueue("application", {"n": 2, "fail": False})
+        item = await outbox._run(outbox._claim)
+        await outbox._process(deliver, *item)
+        row = await outbox._run(lambda: outbox._conn.execute(
+            "SELECT status, attempts FROM outbox WHERE id = ?", (failing,)).fetchone())
+        assert row == ("pending", 1)
+        item = await outbox._run(outbox._claim)
+        await outbox._process(deliver, *item)
+        assert await outbox.depth() == 1
+
+    asyncio.run(run())
+    assert delivered == [None, 2]
+
+
+def test_claim_batch_waits_for_window_or_max_count(make_outbox):
+    outbox = make_outbox(batching={"application": (60, 3)})
+    ids = [call(outbox, outbox._insert, "application", "{}") for _ in range(2)]
+    assert call(outbox, outbox._claim_batch, "application", 60, 3) == []
+    assert call(outbox, outbox._claim) is None # To'planadigan tur yakka ishchilarga berilmaydi
+    ids.append(call(outbox, outbox._insert, "application", "{}"))
+    assert [item[0] for item in call(outbox, outbox._claim_batch, "application", 60, 3)] == ids
+
+
+def test_claim_batch_skips_rows_claimed_by_another_process(make_outbox):
+    first, second = make_outbox(), make_outbox()
+    ids = [call(first, first._insert, "application", "{}") for _ in range(3)]
+    original = first._conn
+
+    class Racing:
+        # SELECT dan keyin boshqa jarayon bitta yozuvni olib qo'yadi
+        def __init__(self):
+            self.raced = False
+
+        def execute(self, sql, params=()):
+            cur = original.execute(sql, params)
+            if sql.startswith("SELECT") and not self.raced:
+                self.raced = True
+                second_claim = second._executor.submit(second._claim).result()
+                assert second_claim[0] == ids[0]
+            return cur
+
+        def __enter__(self):
+            return original.__enter__()
+
+        def __exit__(self, *exc):
+            return original.__exit__(*exc)
+
+    first._conn = Racing()
+    try:
+        claimed = call(first, first._claim_batch, "application", 0, 3)
+    finally:
+        first._conn = original
+    assert [item[0] for item in claimed] == ids[1:]
+
+
+def test_batch_groups_are_completed_one_by_one(make_outbox):
+    outbox = make_outbox(batching={"application": (0, 10)})
+    outbox._batch_key = lambda kind, payload: payload["job"]
+    sent = []
+
+    async def deliver_batch(kind, payloads):
+        jobs = {payload["job"] for payload in payloads}
+        if jobs == {"2-DMTT"}:
+            raise RuntimeError("tarmoq xatosi")
+        sent.append(sorted(payload["n"] for payload in payloads))
+
+    async def run():
+        for n, job in enumerate(["1-DMTT", "2-DMTT", "1-DMTT", "3-DMTT"]):
+            await outbox.enqueue("application", {"n": n, "job": job})
+        items = await outbox._run(outbox._claim_batch, "application", 0, 10)
+        await outbox._process_batch(deliver_batch, "application", items)
+        return await outbox._run(lambda: outbox._conn.execute(
+            "SELECT status, attempts, next_attempt_at > claimed_at FROM outbox ORDER BY id").fetchall())
+
+    rows = asyncio.run(run())
+    # 1-DMTT yetkazildi, 2-DMTT kechiktirildi, 3-DMTT urinilmagan - darhol qayta navbatda
+    assert sent == [[0, 2]]
+    assert rows == [("done", 0, 0), ("pending", 1, 1), ("done", 0, 0), ("pending", 0, 0)]
+
+
+def test_worker_survives_database_errors(make_outbox, monkeypatch):
+    monkeypatch.setattr(outbox_module, "POLL_INTERVAL", 0.01)
+    outbox = make_outbox(workers=1)
+    mark_done = outbox._mark_done
+    failures = []
+
+    def flaky_mark_done(item_id):
+        if not failures:
+            failures.append(item_id)
+            raise sqlite3.OperationalError("database is locked")
+        mark_done(item_id)
+
+    outbox._mark_done = flaky_mark_done
+    delivered = []
+
+    async def deliver(kind, payload):
+        delivered.append(payload["n"])
+
+    async def run():
+        outbox.start(deliver)
+        await outbox.enqueue("application", {"n": 1})
+        await outbox.enqueue("application", {"n": 2})
+        for _ in range(200):
+            if len(delivered) == 2:
+                break
+            await asyncio.sleep(0.01)
+        tasks = list(outbox._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert not any(task.exception() for task in tasks if not task.cancelled())
+
+    asyncio.run(run())
+    # Birinchi yozuv holati saqlanmadi (ijara tugagach qayta olinadi), ishchi ikkinchisini yetkazdi
+    assert delivered == [1, 2]
+    assert failures
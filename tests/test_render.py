@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageText, SendMessage
+from aiogram.types import (Chat, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, Message, MessageEntity,
+                           ReplyKeyboardMarkup)
+
+from render import MessageRenderer
+
+KB = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🏠 Bosh sahifa", callback_data="go_to_start")]])
+
+
+class FakeBot(Bot):
+    def __init__(self, error=None):
+        super().__init__("42:TEST")
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, method, request_timeout=None):
+        self.calls.append(type(method).__name__)
+        if isinstance(method, EditMessageText) and self.error:
+            raise TelegramBadRequest(method=method, message=self.error)
+        if isinstance(method, (EditMessageText, SendMessage)):
+            # Telegram Markdown belgilarini olib tashlab, entities qaytaradi
+            text, entities = method.text, None
+            if method.parse_mode and text.startswith("**"):
+                text = text.strip("*")
+                entities = [MessageEntity(type="bold", offset=0, length=len(text))]
+            markup = method.reply_markup if isinstance(method.reply_markup, InlineKeyboardMarkup) else None
+            message_id = method.message_id if isinstance(method, EditMessageText) else 2
+            return Message(message_id=message_id, date=datetime.datetime.now(), chat=Chat(id=1, type="private"),
+                           text=text, entities=entities, reply_markup=markup).as_(self)
+        return True
+
+
+def message(bot, text="Salom", reply_markup=KB):
+    return Message(message_id=1, date=datetime.datetime.now(), chat=Chat(id=1, type="private"), text=text,
+                   reply_markup=reply_markup).as_(bot)
+
+
+def render(bot, msg, *args, **kwargs):
+    return asyncio.run(MessageRenderer().edit(msg, *args, **kwargs))
+
+
+def test_same_content_is_not_sent():
+    bot = FakeBot()
+    render(bot, message(bot), "Salom", reply_markup=KB)
+    assert bot.calls == []
+
+
+def test_repeated_markdown_edit_is_skipped():
+    bot = FakeBot()
+    renderer = MessageRenderer()
+    edited = asyncio.run(renderer.edit(message(bot), "**Salom**", reply_markup=KB, parse_mode="Markdown"))
+    # Keyingi callback Telegram ko'rsatayotgan (tahrirlangan) xabar bilan keladi
+    assert asyncio.run(renderer.edit(edited, "**Salom**", reply_markup=KB, parse_mode="Markdown")) is edited
+    assert bot.calls == ["EditMessageText"]
+    assert len(renderer) == 1
+
+
+def test_message_changed_elsewhere_is_edited_again():
+    bot = FakeBot()
+    renderer = MessageRenderer()
+    asyncio.run(renderer.edit(message(bot), "**Salom**", reply_markup=KB, parse_mode="Markdown"))
+    # Xabarni boshqa jarayon o'zgartirgan: iz mos, lekin joriy matn boshqa
+    asyncio.run(renderer.edit(message(bot, text="Boshqa"), "**Salom**", reply_markup=KB, parse_mode="Markdown"))
+    assert bot.calls == ["EditMessageText", "EditMessageText"]
+
+
+def test_cache_is_bounded():
+    bot = FakeBot()
+    renderer = MessageRenderer(max_messages=2)
+    for message_id in range(1, 4):
+        msg = Message(message_id=message_id, date=datetime.datetime.now(), chat=Chat(id=1, type="private"),
+                      text="Eski").as_(bot)
+        asyncio.run(renderer.edit(msg, "Yangi", reply_markup=KB))
+    assert len(renderer) == 2
+    assert (1, 1) not in renderer._last
+
+
+def test_markdown_edit_is_sent_and_not_modified_is_swallowed():
+    bot = FakeBot(error="Bad Request: message is not modified")
+    msg = message(bot, text="Salom")
+    assert render(bot, msg, "**Salom**", reply_markup=KB, parse_mode="Markdown") is msg
+    assert bot.calls == ["EditMessageText"]
+
+
+def test_uneditable_message_falls_back_to_send():
+    bot = FakeBot(error="Bad Request: message can't be edited")
+    render(bot, message(bot), "Yangi", reply_markup=KB)
+    reply = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text="/start")]])
+    render(bot, message(bot), "Telefon", reply_markup=reply)
+    assert bot.calls == ["EditMessageText", "SendMessage", "SendMessage"]
@@ -0,0 +1,42 @@
+from search import SearchIndex, normalize
+from vacancy_store import Snapshot
+
+
+def snapshot(version, jobs):
+    data = {}
+    for tuman, job in jobs.values():
+        data[tuman] = data.get(tuman, ()) + (job,)
+    job_ids = {pair: job_id for job_id, pair in jobs.items()}
+    return Snapshot(version, data, job_ids, {})
+
+
+JOBS = {1: ("G‘allaorol", "12-DMTT"), 2: ("G‘allaorol", "120-DMTT"), 3: ("Zomin", "bosh o‘qituvchi"),
+        4: ("Zomin", "2-DMTT")}
+
+
+def test_normalize_unifies_scripts_and_apostrophes():
+    assert normalize("Ғаллаорол") == normalize("G‘allaorol") == normalize("G'allaorol") == "gallaorol"
+    assert normalize("ўқитувчи") == normalize("oʻqituvchi") == "oqituvchi"
+    assert normalize("  12-DMTT, ") == "12 dmtt"
+
+
+def test_search_ranks_exact_tokens_first():
+    index = SearchIndex()
+    index.sync(snapshot(1, JOBS))
+    assert [job_id for job_id, _, _ in index.search("12")] == [1, 2]
+    assert [job_id for job_id, _, _ in index.search("галлаорол 120")] == [2]
+    assert [job_id for job_id, _, _ in index.search("ўқитувчи")] == [3]
+    assert index.search("forish") == []
+    assert len(index.search("")) == len(JOBS)
+
+
+def test_sync_is_incremental():
+    index = SearchIndex()
+    index.sync(snapshot(1, JOBS))
+    changed = {job_id: pair for job_id, pair in JOBS.items() if job_id != 3}
+    changed[5] = ("Forish", "oshpaz")
+    index.sync(snapshot(2, changed))
+    assert index.search("qituvchi") == []
+    assert index.search("oshpaz") == [(5, "Forish", "oshpaz")]
+    assert len(index) == 4
+    assert index._prefixes.get("bo") is None # O'chirilgan ish o'rni kalitlari tozalangan
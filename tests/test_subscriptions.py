@@ -0,0 +1,74 @@
+import pytest
+
+import subscriptions as subscriptions_module
+from subscriptions import LeaseLost, Subscriptions
+
+
+def call(subscriptions, func, *args):
+    # Ulanish executor oqimiga bog'langan
+    return subscriptions._executor.submit(func, *args).result()
+
+
+def expire(subscriptions, broadcast_id):
+    def update():
+        with subscriptions._conn:
+            subscriptions._conn.execute("UPDATE broadcasts SET claimed_at = claimed_at - ? WHERE id = ?",
+                                        (subscriptions_module.LEASE_TIMEOUT + 1, broadcast_id))
+    call(subscriptions, update)
+
+
+@pytest.fixture
+def make_subscriptions(tmp_path):
+    created = []
+
+    def make(**kwargs):
+        subscriptions = Subscriptions(str(tmp_path / "bot.db"), coalesce_delay=0, **kwargs)
+        created.append(subscriptions)
+        return subscriptions
+
+    yield make
+    for subscriptions in created:
+        call(subscriptions, subscriptions._conn.close)
+        subscriptions._executor.shutdown(wait=True)
+
+
+def test_sending_broadcast_is_not_claimed_by_another_process(make_subscriptions):
+    first, second = make_subscriptions(), make_subscriptions()
+    call(first, first._schedule, ["Zomin"])
+    claimed = call(first, first._claim)
+    assert claimed[1] == "Zomin"
+    assert call(second, second._claim) is None
+    assert call(first, first._claim) is None
+
+
+def test_expired_lease_is_taken_over(make_subscriptions):
+    first, second = make_subscriptions(), make_subscriptions()
+    call(first, first._schedule, ["Zomin"])
+    broadcast_id = call(first, first._claim)[0]
+    call(first, first._checkpoint, broadcast_id, 10, 1, 0, [])
+    expire(first, broadcast_id)
+
+    assert call(second, second._claim) == (broadcast_id, "Zomin", 10, 1, 0)
+    # Eski egasi endi yozolmaydi va yuborishni to'xtatadi
+    assert call(first, first._renew, broadcast_id) is False
+    with pytest.raises(LeaseLost):
+        call(first, first._checkpoint, broadcast_id, 20, 2, 0, [])
+    call(first, first._finish, broadcast_id)
+    assert call(second, second._renew, broadcast_id) is True
+
+
+def test_renewed_lease_is_kept(make_subscriptions):
+    first, second = make_subscriptions(), make_subscriptions()
+    call(first, first._schedule, ["Zomin"])
+    broadcast_id = call(first, first._claim)[0]
+    expire(first, broadcast_id)
+    assert call(first, first._renew, broadcast_id) is True
+    assert call(second, second._claim) is None
+
+
+def test_released_lease_is_resumed_at_once(make_subscriptions):
+    first, second = make_subscriptions(), make_subscriptions()
+    call(first, first._schedule, ["Zomin"])
+    broadcast_id = call(first, first._claim)[0]
+    call(first, first._release)
+    assert call(second, second._claim)[0] == broadcast_id
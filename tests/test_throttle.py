@@ -0,0 +1,25 @@
+import time
+
+from throttle import TokenBucket
+
+
+def test_bucket_allows_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    for _ in range(2):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert 0.4 < bucket.wait_time() <= 0.5
+
+
+def test_pause_delays_even_with_tokens():
+    bucket = TokenBucket(rate=1.0, capacity=1.0)
+    bucket.pause(5)
+    assert 4.9 < bucket.wait_time() <= 5
+    assert not bucket.idle()
+
+
+def test_idle_after_refill():
+    bucket = TokenBucket(rate=1000.0, capacity=1.0)
+    bucket.take()
+    time.sleep(0.01)
+    assert bucket.idle()
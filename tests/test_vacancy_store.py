@@ -0,0 +1,133 @@
+import asyncio
+import json
+import threading
+
+from vacancy_store import VacancyStore
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_shipped_data_json_with_legacy_tumans(tmp_path):
+    # Yetkazilgan data.json shakli: bo'sh "vacancies" yonida eski bot yozgan tuman ro'yxatlari
+    path = tmp_path / "data.json"
+    write_json(path, {"selected": [], "vacancies": {}, "Zomin": ["5-DMTT", "12-DMTT"], "Forish": ["1-DMTT"]})
+    store = VacancyStore(str(path))
+    try:
+        assert dict(store.data) == {"Zomin": ("5-DMTT", "12-DMTT"), "Forish": ("1-DMTT",)}
+        assert store.get_job(store.job_id("Zomin", "12-DMTT")) == ("Zomin", "12-DMTT")
+        assert "selected" not in store.data
+    finally:
+        asyncio.run(store.close())
+
+
+def test_legacy_layout_survives_compaction(tmp_path):
+    path = tmp_path / "data.json"
+    write_json(path, {"selected": [], "vacancies": {}, "Zomin": ["5-DMTT"]})
+
+    async def migrate():
+        store = VacancyStore(str(path))
+        store.add_job("Zomin", "7-DMTT")
+        await store.compact()
+        await store.close()
+        return store.job_id("Zomin", "5-DMTT")
+
+    job_id = asyncio.run(migrate())
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["vacancies"] == {"Zomin": ["5-DMTT", "7-DMTT"]}
+    assert saved["selected"] == []
+    assert "Zomin" not in saved
+
+    store = VacancyStore(str(path))
+    try:
+        assert store.data["Zomin"] == ("5-DMTT", "7-DMTT")
+        assert store.job_id("Zomin", "5-DMTT") == job_id
+    finally:
+        asyncio.run(store.close())
+
+
+def test_journal_replayed_over_snapshot(tmp_path):
+    path = tmp_path / "data.json"
+
+    async def edit():
+        store = VacancyStore(str(path), flush_delay=0)
+        store.add_jobs([("Zomin", "1-DMTT"), ("Zomin", "2-DMTT"), ("Forish", "3-DMTT")])
+        store.clear_tuman("Forish")
+        await store.close()
+
+    asyncio.run(edit())
+    store = VacancyStore(str(path))
+    try:
+        assert store.data["Zomin"] == ("1-DMTT", "2-DMTT")
+        assert not store.snapshot.jobs("Forish")
+    finally:
+        asyncio.run(store.close())
+
+
+def test_failed_flush_keeps_journal_order(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    write = VacancyStore._write
+    calls = []
+
+    def flaky_write(store, snapshot, lines):
+        calls.append(len(lines))
+        if len(calls) == 1:
+            raise OSError("disk to'la")
+        write(store, snapshot, lines)
+
+    monkeypatch.setattr(VacancyStore, "_write", flaky_write)
+
+    async def edit():
+        store = VacancyStore(str(path), flush_delay=3600)
+        store.add_job("Zomin", "1-DMTT")
+        failing = asyncio.create_task(store.flush())
+        await asyncio.sleep(0)
+        store.add_job("Zomin", "2-DMTT")
+        await asyncio.gather(failing, store.flush())
+        await store.close()
+
+    asyncio.run(edit())
+    seqs = [json.loads(line)["seq"] for line in (tmp_path / "data.json.journal").read_text().splitlines()]
+    assert seqs == sorted(seqs) == [1, 2]
+
+
+def test_journal_replay_is_ordered_and_deduplicated(tmp_path):
+    path = tmp_path / "data.json"
+    lines = [{"seq": 2, "op": "add", "tuman": "Zomin", "job": "2-DMTT", "id": 2},
+             {"seq": 1, "op": "add", "tuman": "Zomin", "job": "1-DMTT", "id": 1},
+             {"seq": 2, "op": "add", "tuman": "Zomin", "job": "2-DMTT", "id": 2}]
+    (tmp_path / "data.json.journal").write_text("".join(json.dumps(line) + "\n" for line in lines))
+    store = VacancyStore(str(path))
+    try:
+        assert store.data["Zomin"] == ("1-DMTT", "2-DMTT")
+        assert store.snapshot.version == 1
+    finally:
+        asyncio.run(store.close())
+
+
+def test_torn_journal_is_repaired_in_executor(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    write = VacancyStore._write
+    threads = []
+
+    def recording_write(store, snapshot, lines):
+        threads.append(threading.current_thread().name)
+        write(store, snapshot, lines)
+
+    monkeypatch.setattr(VacancyStore, "_write", recording_write)
+
+    async def reload():
+        store = VacancyStore(str(path), flush_delay=0)
+        store.add_job("Zomin", "1-DMTT")
+        await store.flush()
+        with open(store.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"seq": 2, "op": "ad')
+        await store.refresh()
+        await store.close()
+        return store
+
+    store = asyncio.run(reload())
+    assert threads and all(name.startswith("vacancy-store") for name in threads)
+    assert (tmp_path / "data.json.journal").read_text() == ""
+    assert store.data["Zomin"] == ("1-DMTT",)
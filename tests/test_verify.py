@@ -0,0 +1,95 @@
+import asyncio
+import io
+import struct
+import zipfile
+import zlib
+
+from verify import CheckResult, DocumentVerifier, inspect
+
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+def zip_bytes():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("diplom.pdf", b"%PDF-1.4 ...")
+    return buffer.getvalue()
+
+
+def vint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def rar5_header(kind, fields=b"", data=b""):
+    body = vint(kind) + vint(0x0002 if data else 0) + (vint(len(data)) if data else b"") + fields
+    head = vint(len(body)) + body
+    return struct.pack("<I", zlib.crc32(head)) + head + data
+
+
+def rar5_bytes(files=((b"diplom.pdf", PDF),)):
+    entries = b"".join(
+        rar5_header(2, vint(0x0004) + vint(len(content)) + vint(0) + struct.pack("<I", zlib.crc32(content))
+                    + vint(0) + vint(1) + vint(len(name)) + name, content)
+        for name, content in files)
+    return b"Rar!\x1a\x07\x01\x00" + rar5_header(1, vint(0)) + entries + rar5_header(5, vint(0))
+
+
+def rar4_block(kind, body, data=b""):
+    head = struct.pack("<BHH", kind, 0x8000 if data else 0, 7 + len(body)) + body
+    return struct.pack("<H", zlib.crc32(head) & 0xFFFF) + head + data
+
+
+def rar4_bytes(name=b"diplom.pdf", content=PDF):
+    body = struct.pack("<IIBIIBBHI", len(content), len(content), 0, zlib.crc32(content), 0, 29, 0x30,
+                       len(name), 0x20) + name
+    return (b"Rar!\x1a\x07\x00" + rar4_block(0x73, b"\x00" * 6) + rar4_block(0x74, body, content)
+            + rar4_block(0x7B, b""))
+
+
+def test_valid_pdf_and_zip():
+    assert inspect(b"%PDF-1.7\n...\n%%EOF\n", "application/pdf").ok
+    assert inspect(zip_bytes(), "application/zip").summary().startswith("✅ ZIP")
+
+
+def test_problems_are_reported():
+    assert inspect(b"", "application/pdf").problems == ["fayl bo'sh"]
+    assert inspect(b"%PDF-1.7 uzilgan", "application/pdf").problems == ["PDF oxiri yo'q (fayl uzilgan bo'lishi mumkin)"]
+    assert inspect(b"%PDF-1.7\n%%EOF", "application/zip").problems == ["ZIP deb yuborilgan"]
+    assert inspect(b"PK\x03\x04buzilgan", "application/zip").problems == ["arxivni ochib bo'lmadi"]
+    assert inspect(b"MZ\x90\x00", "application/pdf").problems == ["PDF/ZIP/RAR emas"]
+
+
+def test_rar_headers_are_checked():
+    for data in (rar4_bytes(), rar5_bytes()):
+        assert inspect(data, "application/vnd.rar").summary().startswith("✅ RAR")
+        assert inspect(data[:-3], "application/vnd.rar").problems == ["arxiv uzilgan"]
+        broken = bytearray(data)
+        broken[15] ^= 0xFF # Asosiy sarlavha ichidagi bayt
+        assert inspect(bytes(broken), "application/vnd.rar").problems == ["arxiv buzilgan"]
+    assert inspect(rar5_bytes(files=()), "application/vnd.rar").problems == ["arxiv bo'sh"]
+    encrypted = b"Rar!\x1a\x07\x01\x00" + rar5_header(4, vint(0) + vint(0) + vint(15) + b"\x00" * 16)
+    assert inspect(encrypted, "application/vnd.rar").problems == ["arxivni ochib bo'lmadi"]
+
+
+def test_result_cache_is_bounded(tmp_path):
+    async def run():
+        verifier = DocumentVerifier(None, str(tmp_path / "bot.db"), max_cached=2)
+        try:
+            for n in range(3):
+                result = CheckResult("pdf", n, [])
+                verifier._remember(f"U{n}", result)
+                await verifier._run(verifier._save, f"U{n}", result)
+            assert list(verifier._cache) == ["U1", "U2"]
+            # Keshdan chiqqan natija bazadan o'qiladi (qayta yuklab olinmaydi)
+            assert (await verifier.result({"file_unique_id": "U0"}, timeout=0)).size == 0
+            assert list(verifier._cache) == ["U2", "U0"]
+        finally:
+            await verifier.close()
+
+    asyncio.run(run())
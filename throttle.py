@@ -0,0 +1,230 @@
+import asyncio
+import heapq
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    DeleteMessage,
+    EditMessageCaption,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    Response,
+    SendMediaGroup,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+
+# --- Bot API So'rovlarini Cheklash (token bucket) ---
+#
+# Telegram cheklovlari: umumiy ~30 xabar/soniya, bitta chatga ~1 xabar/soniya,
+# guruhga ~20 xabar/daqiqa. Har bir chiquvchi so'rov avval chat "chelak"idan,
+# keyin umumiy chelakdan token oladi. Umumiy chelak navbati ustuvorlik bo'yicha:
+# admin'ga arizalar (HIGH) foydalanuvchi javoblaridan (NORMAL), ular esa xabar
+# tahrirlari va ommaviy xabarlardan (LOW) oldin o'tadi. 429 (retry_after)
+# kelsa, chat (yoki butun bot) aytilgan vaqtga to'xtatiladi va so'rov qayta yuboriladi.
+
+PRIORITY_HIGH = 0 # Admin'ga arizalar
+PRIORITY_NORMAL = 1 # Foydalanuvchiga javoblar
+PRIORITY_LOW = 2 # Tahrirlar, ommaviy xabarlar
+
+# Joriy vazifa (task) yuborayotgan so'rovlar ustuvorligi
+api_priority: ContextVar[Optional[int]] = ContextVar("api_priority", default=None)
+
+# Standart ustuvorligi past bo'lgan (kosmetik) metodlar
+LOW_PRIORITY_METHODS = (EditMessageText, EditMessageReplyMarkup, EditMessageCaption, DeleteMessage)
+
+BUCKET_CLEANUP_EVERY = 1000 # Shuncha so'rovdan keyin bo'sh turgan chat chelaklari tozalanadi
+
+
+@contextmanager
+def priority(level: int):
+    """Blok ichidagi barcha Bot API so'rovlari uchun ustuvorlikni belgilash."""
+    token = api_priority.set(level)
+    try:
+        yield
+    finally:
+        api_priority.reset(token)
+
+
+class TokenBucket:
+    """Oddiy token bucket: soniyasiga `rate` token, ko'pi bilan `capacity` ta."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        """Token olish uchun kutish kerak bo'lgan vaqt (0 - darhol olish mumkin)."""
+        now = time.monotonic()
+        self._refill(now)
+        pause = max(0.0, self.paused_until - now)
+        if self.tokens >= cost:
+            return pause
+        return max(pause, (cost - self.tokens) / self.rate)
+
+    def take(self, cost: float = 1.0):
+        self.tokens -= cost
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and self.paused_until <= self.updated
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+    def wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Bot sessiyasiga ulanadigan cheklovchi: umumiy va chat chelaklari, ustuvorlik navbati."""
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 group_rate: float = 20.0 / 60.0, max_retries: int = 3):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._requests = 0
+
+    # --- Chelaklar ---
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _cleanup(self):
+        self._requests += 1
+        if self._requests % BUCKET_CLEANUP_EVERY == 0:
+            self._chats = {chat_id: b for chat_id, b in self._chats.items() if not b.idle()}
+            self._chat_locks = {chat_id: lock for chat_id, lock in self._chat_locks.items() if lock.locked()}
+
+    @staticmethod
+    async def _wait_bucket(bucket: TokenBucket, cost: float):
+        while True:
+            delay = bucket.wait_time(cost)
+            if delay <= 0:
+                bucket.take(cost)
+                return
+            await asyncio.sleep(delay)
+
+    async def _acquire_global(self, level: int, cost: float):
+        """Umumiy chelakdan ustuvorlik tartibida token olish."""
+        loop = asyncio.get_running_loop()
+        self._seq += 1
+        waiter = _Waiter(level, self._seq, loop.create_future())
+        heapq.heappush(self._waiters, waiter)
+        if self._waiters[0] is waiter:
+            waiter.wake()
+        try:
+            while True:
+                await waiter.future
+                if self._waiters[0] is not waiter:
+                    # Yuqoriroq ustuvorlikdagi so'rov navbat boshiga o'tdi
+                    waiter.future = loop.create_future()
+                    continue
+                delay = self._global.wait_time(cost)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                self._global.take(cost)
+                return
+        finally:
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0].wake()
+
+    async def acquire(self, chat_id: Optional[int], level: int, cost: float = 1.0):
+        """So'rov yuborishdan oldin chat va umumiy chelakdan token olish."""
+        if chat_id is not None:
+            bucket = self._chat_bucket(chat_id)
+            # Bitta chatga xabarlar kelish tartibida yuborilsin (Lock - FIFO)
+            async with self._chat_locks.setdefault(chat_id, asyncio.Lock()):
+                await self._wait_bucket(bucket, min(cost, bucket.capacity))
+        await self._acquire_global(level, min(cost, self._global.capacity))
+
+    # --- Middleware ---
+
+    @staticmethod
+    def _chat_id(method: TelegramMethod) -> Optional[int]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return None
+        try:
+            return int(chat_id)
+        except (TypeError, ValueError):
+            return None # @username ko'rinishidagi chat
+
+    @staticmethod
+    def _priority(method: TelegramMethod) -> int:
+        level = api_priority.get()
+        if level is not None:
+            return level
+        if isinstance(method, LOW_PRIORITY_METHODS):
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = self._chat_id(method)
+        # Chatga bog'lanmagan so'rovlar (getUpdates, answerCallbackQuery, getFile...) cheklanmaydi
+        throttled = chat_id is not None or getattr(method, "inline_message_id", None) is not None
+        cost = float(len(method.media)) if isinstance(method, SendMediaGroup) else 1.0
+        level = self._priority(method)
+        self._cleanup()
+
+        attempt = 0
+        while True:
+            if throttled:
+                await self.acquire(chat_id, level, cost)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).pause(e.retry_after)
+                else:
+                    self._global.pause(e.retry_after)
+                if attempt > self.max_retries:
+                    raise
+                logging.warning(f"{type(method).__name__}: Telegram {e.retry_after} soniya kutishni so'radi "
+                                f"({attempt}/{self.max_retries}-qayta urinish).")
+                if not throttled:
+                    await asyncio.sleep(e.retry_after)
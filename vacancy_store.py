@@ -0,0 +1,397 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# --- Ish O'rinlari Ombori (snapshot + jurnal) ---
+#
+# data.json - oxirgi to'liq holat (snapshot), data.json.journal - undan keyingi
+# o'zgarishlar jurnali (har qatorda bitta JSON amal). Har bir o'zgarish jurnal
+# oxiriga bitta qator bo'lib yoziladi, ma'lum miqdordan keyin jurnal snapshot'ga
+# siqiladi (vaqtinchalik fayl + atomik os.replace).
+#
+# O'zgarishlar avval xotirada qo'llanadi, jurnal qatorlari esa buferda
+# yig'ilib, FLUSH_DELAY dan keyin bitta yozish bilan alohida oqimda (executor)
+# diskka tushiriladi - event loop disk kutib to'xtab qolmaydi.
+#
+# Har bir ish o'rniga o'zgarmas butun son ID beriladi (callback_data'da nom
+# o'rniga ishlatiladi). ID'lar qayta ishlatilmaydi: o'chirilgan ish o'rniga
+# ishora qiluvchi eski tugma aniq "topilmadi" natijasini beradi.
+#
+# Xotiradagi holat - o'zgarmas Snapshot (tuple'lar va faqat o'qiladigan
+# lug'atlar). O'quvchilar `store.snapshot` ni qulfsiz olib, handler oxirigacha
+# shu nusxa bilan ishlaydi; yozuvchi yangi nusxa yasab, bitta o'zlashtirish
+# bilan e'lon qiladi (copy-on-write). Versiya keshlarni bekor qilish va eski
+# tugmalarni aniqlash uchun ishlatiladi.
+
+COMPACT_EVERY = 200 # Shuncha amaldan keyin jurnal snapshot'ga siqiladi
+FLUSH_DELAY = 0.5 # Ketma-ket o'zgarishlarni bitta yozishga jamlash oynasi (soniya)
+SNAPSHOT_KEYS = ("vacancies", "seq", "job_ids", "next_id")
+# Eski data.json'dagi tuman bo'lmagan ro'yxat kalitlari (o'zgarishsiz saqlanadi)
+LEGACY_NON_TUMAN_KEYS = ("selected",)
+
+
+class Snapshot:
+    """Ish o'rinlarining o'zgarmas, versiyalangan holati."""
+
+    __slots__ = ("version", "data", "job_ids", "jobs_by_id", "_changed")
+
+    def __init__(self, version: int, data: Dict[str, Tuple[str, ...]], job_ids: Dict[Tuple[str, str], int],
+                 changed: Dict[str, int]):
+        self.version = version
+        self.data: Mapping[str, Tuple[str, ...]] = MappingProxyType(data) # tuman -> ish o'rinlari
+        self.job_ids: Mapping[Tuple[str, str], int] = MappingProxyType(job_ids) # (tuman, ish o'rni) -> ID
+        self.jobs_by_id: Mapping[int, Tuple[str, str]] = MappingProxyType(
+            {job_id: key for key, job_id in job_ids.items()}) # ID -> (tuman, ish o'rni)
+        self._changed = MappingProxyType(changed) # tuman -> oxirgi o'zgargan versiya
+
+    def jobs(self, tuman: str) -> Tuple[str, ...]:
+        return self.data.get(tuman, ())
+
+    def changed_at(self, tuman: str) -> int:
+        """Tuman ish o'rinlari oxirgi marta o'zgargan versiya."""
+        return self._changed.get(tuman, 0)
+
+    def get_job(self, job_id: int) -> Optional[Tuple[str, str]]:
+        return self.jobs_by_id.get(job_id)
+
+    def job_id(self, tuman: str, job: str) -> Optional[int]:
+        return self.job_ids.get((tuman, job))
+
+
+EMPTY = Snapshot(0, {}, {}, {})
+
+
+class VacancyStore:
+    """Ish o'rinlarini saqlovchi ombor: tuman -> ish o'rinlari ro'yxati."""
+
+    def __init__(self, path: str, compact_every: int = COMPACT_EVERY, flush_delay: float = FLUSH_DELAY):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self.flush_delay = flush_delay
+        self.snapshot = EMPTY # Joriy holat: faqat butunlay almashtiriladi, hech qachon o'zgartirilmaydi
+        self._next_id = 1
+        self._extra: Dict[str, Any] = {} # Snapshot'dagi boshqa kalitlar (o'zgarishsiz saqlanadi)
+        self._seq = 0 # Oxirgi amal tartib raqami
+        self._journal_ops = 0 # Oxirgi siqishdan keyingi amallar soni
+        self._pending: List[str] = [] # Diskka hali yozilmagan jurnal qatorlari
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock() # Bir vaqtda bitta to'plam yoziladi: jurnal tartibi saqlanadi
+        self._mtimes: Tuple[int, int] = (0, 0) # Oxirgi ko'rilgan (snapshot, jurnal) mtime
+        # Bitta oqim: barcha fayl amallari navbat bilan bajariladi
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vacancy-store")
+        self._install(self._read_state())
+
+    # --- O'qish (joriy snapshot orqali) ---
+
+    @property
+    def version(self) -> int:
+        """Har bir o'zgarishda oshiriladi (keshlar uchun)."""
+        return self.snapshot.version
+
+    @property
+    def data(self) -> Mapping[str, Tuple[str, ...]]:
+        return self.snapshot.data
+
+    def _publish(self, data: Dict[str, Tuple[str, ...]], job_ids: Dict[Tuple[str, str], int], tumans: Iterable[str]):
+        """Yangi snapshot'ni e'lon qilish (o'zgargan tumanlar versiyasi yangilanadi)."""
+        version = self.snapshot.version + 1
+        changed = dict(self.snapshot._changed)
+        changed.update((tuman, version) for tuman in tumans)
+        self.snapshot = Snapshot(version, data, job_ids, changed)
+
+    # --- Yuklash ---
+
+    def _stat_mtimes(self) -> Tuple[int, int]:
+        def mtime(path: str) -> int:
+            try:
+                return os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                return 0
+        return mtime(self.path), mtime(self.journal_path)
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logging.error(f"'{self.path}' buzilgan. Faqat jurnal qayta o'ynaladi.")
+            return {}
+
+    def _read_journal(self) -> Tuple[List[Dict[str, Any]], bool]:
+        if not os.path.exists(self.journal_path):
+            return [], False
+        ops = []
+        torn = False
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    ops.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Yozish paytida uzilib qolgan oxirgi qator
+                    logging.warning(f"Jurnaldagi buzilgan qator tashlab ketildi: {line[:80]}")
+                    torn = True
+        return ops, torn
+
+    def _read_state(self) -> Dict[str, Any]:
+        """Snapshot'ni o'qib, jurnalni qayta o'ynash (diskdan o'qiydi, executor'da chaqiriladi)."""
+        mtimes = self._stat_mtimes()
+        snapshot = self._read_snapshot()
+        vacancies = snapshot.get("vacancies")
+        data = {tuman: list(jobs) for tuman, jobs in vacancies.items()} if isinstance(vacancies, dict) else {}
+        extra = {}
+        for key, value in snapshot.items():
+            if key in SNAPSHOT_KEYS:
+                continue
+            if isinstance(value, list) and key not in LEGACY_NON_TUMAN_KEYS:
+                # Eski format: tuman -> ish o'rinlari yuqori darajada (eski bot bo'sh "vacancies" yonida yozgan)
+                jobs = data.setdefault(key, [])
+                for job in value:
+                    if job not in jobs:
+                        jobs.append(job)
+            else:
+                extra[key] = value
+        seq = snapshot.get("seq", 0) if isinstance(snapshot.get("seq"), int) else 0
+
+        state = {"data": data, "ids": {}, "next_id": snapshot.get("next_id", 1)}
+        for job_id, (tuman, job) in snapshot.get("job_ids", {}).items():
+            if job in data.get(tuman, []):
+                state["ids"][(tuman, job)] = int(job_id)
+        state["next_id"] = max([state["next_id"]] + [job_id + 1 for job_id in state["ids"].values()])
+        # ID'si yo'q ish o'rinlari (eski format) uchun yangi ID beriladi
+        for tuman, jobs in data.items():
+            for job in jobs:
+                if (tuman, job) not in state["ids"]:
+                    state["ids"][(tuman, job)] = state["next_id"]
+                    state["next_id"] += 1
+
+        journal, torn = self._read_journal()
+        ops = 0
+        # seq tartibida, takrorlanganlarini (qayta yozilgan to'plam) bir marta
+        for op in sorted(journal, key=lambda op: op.get("seq", 0)):
+            if op.get("seq", 0) <= seq:
+                continue
+            self._apply(state, op)
+            seq = op["seq"]
+            ops += 1
+        state.update({"extra": extra, "seq": seq, "ops": ops, "torn": torn, "mtimes": mtimes})
+        return state
+
+    def _install(self, state: Dict[str, Any]) -> bool:
+        data = {tuman: tuple(jobs) for tuman, jobs in state["data"].items()}
+        current = self.snapshot
+        changed = data != dict(current.data) or state["ids"] != dict(current.job_ids)
+        if changed:
+            tumans = [tuman for tuman in data.keys() | current.data.keys() if data.get(tuman) != current.data.get(tuman)]
+            self._publish(data, dict(state["ids"]), tumans)
+        self._next_id = state["next_id"]
+        self._extra = state["extra"]
+        self._seq = state["seq"]
+        self._journal_ops = state["ops"]
+        self._mtimes = state["mtimes"]
+        if state["torn"]:
+            # Buzilgan qatordan keyin yangi amallar yopishib qolmasligi uchun jurnal siqiladi
+            self._journal_ops = self.compact_every
+            self._schedule_flush()
+        return changed
+
+    def load(self) -> bool:
+        """Fayldan sinxron qayta yuklash. Ma'lumot o'zgargan bo'lsa True."""
+        return self._install(self._read_state())
+
+    async def refresh(self) -> bool:
+        """Fayl tashqaridan o'zgartirilgan bo'lsa (mtime bo'yicha), qayta yuklash."""
+        if self._pending:
+            return False # Xotiradagi holat diskdagidan yangiroq
+        loop = asyncio.get_running_loop()
+        mtimes = await loop.run_in_executor(self._executor, self._stat_mtimes)
+        if mtimes == self._mtimes:
+            return False
+        state = await loop.run_in_executor(self._executor, self._read_state)
+        if self._pending:
+            return False # O'qish paytida yangi o'zgarish kiritildi
+        return self._install(state)
+
+    # --- O'zgartirish ---
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], op: Dict[str, Any]):
+        data, ids = state["data"], state["ids"]
+
+        def add(tuman: str, job: str, job_id: Optional[int]):
+            if (tuman, job) not in ids:
+                data.setdefault(tuman, []).append(job)
+                job_id = job_id or state["next_id"]
+                ids[(tuman, job)] = job_id
+                state["next_id"] = max(state["next_id"], job_id + 1)
+
+        tuman = op.get("tuman")
+        if op.get("op") == "add":
+            add(tuman, op["job"], op.get("id"))
+        elif op.get("op") == "add_many":
+            for tuman, job, job_id in op["jobs"]:
+                add(tuman, job, job_id)
+        elif op.get("op") == "clear":
+            for job in data.get(tuman, []):
+                ids.pop((tuman, job), None)
+            if tuman in data:
+                data[tuman] = []
+
+    def _append(self, op: Dict[str, Any]):
+        self._seq += 1
+        op["seq"] = self._seq
+        self._pending.append(json.dumps(op, ensure_ascii=False) + "\n")
+        self._journal_ops += 1
+        self._schedule_flush()
+
+    def add_job(self, tuman: str, job: str) -> bool:
+        """Ish o'rnini qo'shish. Allaqachon mavjud bo'lsa False."""
+        return bool(self.add_jobs([(tuman, job)]))
+
+    def add_jobs(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Ko'p ish o'rnini bitta jurnal amali (va bitta yangi snapshot) bilan qo'shish.
+
+        Haqiqatan qo'shilganlarini qaytaradi.
+        """
+        current = self.snapshot
+        data = dict(current.data)
+        job_ids = dict(current.job_ids)
+        added = []
+        for tuman, job in items:
+            if (tuman, job) in job_ids:
+                continue
+            job_id = self._next_id
+            self._next_id += 1
+            data[tuman] = data.get(tuman, ()) + (job,)
+            job_ids[(tuman, job)] = job_id
+            added.append([tuman, job, job_id])
+        if not added:
+            return []
+        self._publish(data, job_ids, {tuman for tuman, _, _ in added})
+        if len(added) == 1:
+            tuman, job, job_id = added[0]
+            self._append({"op": "add", "tuman": tuman, "job": job, "id": job_id})
+        else:
+            # Bitta qator: uzilish bo'lsa yoki hammasi, yoki hech biri tiklanadi
+            self._append({"op": "add_many", "jobs": added})
+        return [(tuman, job) for tuman, job, _ in added]
+
+    def clear_tuman(self, tuman: str) -> int:
+        """Tumandagi barcha ish o'rinlarini o'chirish. O'chirilganlar sonini qaytaradi."""
+        current = self.snapshot
+        if tuman not in current.data:
+            return 0
+        jobs = current.data[tuman]
+        data = dict(current.data)
+        data[tuman] = ()
+        job_ids = {key: job_id for key, job_id in current.job_ids.items() if key[0] != tuman}
+        self._publish(data, job_ids, [tuman])
+        self._append({"op": "clear", "tuman": tuman})
+        return len(jobs)
+
+    # --- ID bo'yicha qidirish ---
+
+    def get_job(self, job_id: int) -> Optional[Tuple[str, str]]:
+        """ID bo'yicha (tuman, ish o'rni). O'chirilgan bo'lsa None."""
+        return self.snapshot.get_job(job_id)
+
+    def job_id(self, tuman: str, job: str) -> Optional[int]:
+        """(tuman, ish o'rni) bo'yicha ID."""
+        return self.snapshot.job_id(tuman, job)
+
+    # --- Diskka yozish ---
+
+    def _snapshot_copy(self) -> Dict[str, Any]:
+        current = self.snapshot
+        snapshot = dict(self._extra)
+        snapshot["vacancies"] = {tuman: list(jobs) for tuman, jobs in current.data.items()}
+        snapshot["job_ids"] = {str(job_id): [tuman, job] for job_id, (tuman, job) in current.jobs_by_id.items()}
+        snapshot["next_id"] = self._next_id
+        snapshot["seq"] = self._seq
+        return snapshot
+
+    def _write(self, snapshot: Optional[Dict[str, Any]], lines: List[str]):
+        """Jurnal qatorlarini qo'shish va (kerak bo'lsa) snapshot'ni atomik almashtirish."""
+        if lines:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+        if snapshot is not None:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # Snapshot "seq" bo'yicha eski amallarni o'tkazib yuboradi, shuning uchun
+            # jurnalni shu yerda uzilish bo'lsa ham qayta o'ynash xavfsiz.
+            with open(self.journal_path, "w", encoding="utf-8"):
+                pass
+            logging.info(f"Ish o'rinlari jurnali siqildi (seq={snapshot['seq']}).")
+        self._mtimes = self._stat_mtimes()
+
+    def _needs_flush(self) -> bool:
+        return bool(self._pending) or self._journal_ops >= self.compact_every
+
+    def _take_batch(self) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        lines, self._pending = self._pending, []
+        snapshot = None
+        if self._journal_ops >= self.compact_every:
+            snapshot = self._snapshot_copy()
+            self._journal_ops = 0
+        return snapshot, lines
+
+    def _schedule_flush(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Event loop yo'q (masalan, skriptdan chaqirilgan) - darhol yozamiz
+            self._executor.submit(self._write, *self._take_batch()).result()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        # Yozish davomida kelgan o'zgarishlar ham keyingi aylanishda yoziladi
+        while self._needs_flush():
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def flush(self):
+        """Buferdagi barcha o'zgarishlarni diskka yozish."""
+        async with self._flush_lock:
+            if not self._needs_flush():
+                return
+            snapshot, lines = self._take_batch()
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, self._write, snapshot, lines)
+            except OSError as e:
+                # Yozilmagan qatorlar keyin kelganlaridan oldinga qaytadi (boshqa to'plam
+                # lock tufayli shu orada yozilmagan), keyingi aylanishda qayta yoziladi
+                logging.error(f"Ish o'rinlarini diskka yozishda xato: {e}")
+                self._pending = lines + self._pending
+                if snapshot is not None:
+                    self._journal_ops = self.compact_every
+
+    async def compact(self):
+        """Joriy holatni snapshot'ga yozish va jurnalni tozalash."""
+        self._journal_ops = self.compact_every
+        await self.flush()
+
+    async def close(self):
+        """Bot to'xtashida buferni diskka yozib, executor'ni yopish."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+        self._executor.shutdown(wait=True)
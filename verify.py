@@ -0,0 +1,341 @@
+import asyncio
+import io
+import json
+import logging
+import sqlite3
+import struct
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+
+# --- Hujjatlarni Fonda Tekshirish ---
+#
+# Arizachi yuborgan hujjatlar navbatga qo'yiladi va cheklangan sondagi fon
+# ishchilari ularni bot.download orqali xotiraga yuklab tekshiradi: hajm,
+# haqiqiy turi (PDF/ZIP/RAR sarlavha baytlari), e'lon qilingan MIME turiga
+# mosligi, ZIP va RAR arxiv butunligi va PDF oxiri. Arizachi tekshiruvni
+# kutmaydi: natija admin'ga ariza yetkazilayotganda qo'shiladi. Natijalar
+# file_unique_id bo'yicha SQLite'da saqlanadi - bir fayl ikki marta yuklab
+# olinmaydi; xotirada esa oxirgi MAX_CACHED tasi (LRU) turadi.
+#
+# RAR uchun tashqi kutubxona (unrar) ishlatilmaydi: sarlavhalar zanjiri
+# CRC'lari bilan oxirigacha o'qiladi (uzilgan yoki buzilgan arxiv, parolli
+# sarlavhalar, bo'sh arxiv aniqlanadi), siqilgan ma'lumot esa ochilmaydi.
+
+MAX_SIZE = 20 * 1024 * 1024 # Bot API orqali yuklab olish chegarasi
+QUEUE_SIZE = 1000
+PDF_TAIL = 2048 # "%%EOF" qidiriladigan oxirgi baytlar
+MAX_CACHED = 10_000 # Xotiradagi natijalar soni (qolganlari bazadan o'qiladi)
+
+# Sarlavha baytlari -> tur
+MAGIC = (
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"), # Bo'sh ZIP arxiv
+    (b"Rar!\x1a\x07\x00", "rar"),
+    (b"Rar!\x1a\x07\x01\x00", "rar"), # RAR 5
+)
+MIME_KINDS = {
+    "application/pdf": "pdf",
+    "application/zip": "zip",
+    "application/x-zip-compressed": "zip",
+    "application/x-rar-compressed": "rar",
+    "application/vnd.rar": "rar",
+}
+
+
+class CheckResult:
+    """Bitta hujjatni tekshirish natijasi (matnida foydalanuvchi kiritgan so'zlar yo'q - Markdown buzilmaydi)."""
+
+    __slots__ = ("kind", "size", "problems")
+
+    def __init__(self, kind: Optional[str], size: Optional[int], problems: List[str]):
+        self.kind = kind
+        self.size = size
+        self.problems = problems
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def summary(self) -> str:
+        kind = (self.kind or "noma'lum").upper()
+        size = f", {self.size / 1024:.1f} KB" if self.size is not None else ""
+        if self.ok:
+            return f"✅ {kind}{size}"
+        return f"⚠️ {kind}{size}: " + "; ".join(self.problems)
+
+
+def detect_kind(data: bytes) -> Optional[str]:
+    for magic, kind in MAGIC:
+        if data.startswith(magic):
+            return kind
+    return None
+
+
+RAR4_OLD_BLOCKS = range(0x75, 0x7A) # Izoh, AV, eski qo'shimcha, recovery, imzo bloklari
+
+
+class BadRar(Exception):
+    pass
+
+
+def _vint(data: bytes, pos: int) -> Tuple[int, int]:
+    """RAR5 o'zgaruvchan uzunlikdagi son: (qiymat, keyingi pozitsiya)."""
+    value = shift = 0
+    while pos < len(data) and shift < 64:
+        byte = data[pos]
+        value |= (byte & 0x7F) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    raise BadRar("uzilgan")
+
+
+def _rar4_headers(data: bytes) -> Iterator[int]:
+    """RAR 1.5-4.x blok turlari (har bir sarlavha CRC'si tekshiriladi)."""
+    pos = 7 # Imzo (marker blok)
+    needs_end = False # RAR 2.9+ arxiv oxiri blokini doim yozadi
+    while pos < len(data):
+        if pos + 7 > len(data):
+            raise BadRar("uzilgan")
+        crc, kind, flags, size = struct.unpack_from("<HBHH", data, pos)
+        if size < 7 or pos + size > len(data):
+            raise BadRar("uzilgan")
+        if kind == 0x73:
+            # Asosiy sarlavha: CRC faqat qat'iy qismni qamraydi (RAR 2.x izohi undan keyin)
+            crc_end = pos + 13 + (1 if flags & 0x0200 else 0)
+        elif kind in RAR4_OLD_BLOCKS or kind == 0x74 and flags & 0x0008:
+            crc_end = None # RAR 1.5-2.x bloklari va fayl izohlari: CRC boshqacha hisoblanadi
+        else:
+            crc_end = pos + size
+        if crc_end is not None and zlib.crc32(data[pos + 2:crc_end]) & 0xFFFF != crc:
+            raise BadRar("buzilgan")
+        if kind == 0x73 and flags & 0x0080:
+            raise BadRar("parolli") # Keyingi sarlavhalar shifrlangan
+        extra = struct.unpack_from("<I", data, pos + 7)[0] if flags & 0x8000 and size >= 11 else 0
+        if kind == 0x74 and size > 24 and data[pos + 24] >= 29: # Ochish uchun kerakli versiya
+            needs_end = True
+        yield kind
+        if kind == 0x7B: # Arxiv oxiri
+            return
+        pos += size + extra
+    if pos > len(data) or needs_end:
+        raise BadRar("uzilgan")
+
+
+def _rar5_headers(data: bytes) -> Iterator[int]:
+    """RAR 5 sarlavha turlari (har bir sarlavha CRC32 si tekshiriladi)."""
+    pos = 8 # Imzo
+    while pos < len(data):
+        if pos + 4 > len(data):
+            raise BadRar("uzilgan")
+        crc = struct.unpack_from("<I", data, pos)[0]
+        size, start = _vint(data, pos + 4)
+        end = start + size
+        if size == 0 or end > len(data):
+            raise BadRar("uzilgan")
+        if zlib.crc32(data[pos + 4:end]) != crc:
+            raise BadRar("buzilgan")
+        kind, field = _vint(data, start)
+        flags, field = _vint(data, field)
+        if flags & 0x0001:
+            _, field = _vint(data, field) # Qo'shimcha maydon hajmi
+        data_size = _vint(data, field)[0] if flags & 0x0002 else 0
+        if kind == 4:
+            raise BadRar("parolli") # Arxiv shifrlash sarlavhasi
+        yield kind
+        if kind == 5: # Arxiv oxiri
+            return
+        pos = end + data_size
+    raise BadRar("uzilgan") # RAR 5 arxiv oxiri sarlavhasini doim yozadi
+
+
+def _rar_problems(data: bytes) -> List[str]:
+    rar5 = data.startswith(b"Rar!\x1a\x07\x01\x00")
+    file_header = 2 if rar5 else 0x74
+    try:
+        files = sum(1 for kind in (_rar5_headers if rar5 else _rar4_headers)(data) if kind == file_header)
+    except BadRar as e:
+        if str(e) == "parolli":
+            return ["arxivni ochib bo'lmadi"]
+        return [f"arxiv {e}"]
+    return [] if files else ["arxiv bo'sh"]
+
+
+def inspect(data: bytes, mime_type: Optional[str]) -> CheckResult:
+    """Yuklab olingan fayl tarkibini tekshirish (executor'da chaqiriladi)."""
+    size = len(data)
+    if size == 0:
+        return CheckResult(None, 0, ["fayl bo'sh"])
+    problems = []
+    kind = detect_kind(data)
+    declared = MIME_KINDS.get(mime_type or "")
+    if kind is None:
+        problems.append("PDF/ZIP/RAR emas")
+    elif declared and declared != kind:
+        problems.append(f"{declared.upper()} deb yuborilgan")
+
+    if kind == "pdf" and b"%%EOF" not in data[-PDF_TAIL:]:
+        problems.append("PDF oxiri yo'q (fayl uzilgan bo'lishi mumkin)")
+    elif kind == "zip":
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if not archive.namelist():
+                    problems.append("arxiv bo'sh")
+                else:
+                    broken = archive.testzip()
+                    if broken is not None:
+                        problems.append("arxiv buzilgan")
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError, EOFError):
+            # RuntimeError - parol bilan himoyalangan, NotImplementedError - noma'lum siqish usuli
+            problems.append("arxivni ochib bo'lmadi")
+    elif kind == "rar":
+        problems.extend(_rar_problems(data))
+    return CheckResult(kind, size, problems)
+
+
+class DocumentVerifier:
+    """Hujjatlarni tekshirish navbati, fon ishchilari va natijalar keshi."""
+
+    def __init__(self, bot: Bot, path: str, workers: int = 2, max_size: int = MAX_SIZE,
+                 max_cached: int = MAX_CACHED):
+        self.bot = bot
+        self.path = path
+        self.workers = workers
+        self.max_size = max_size
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, CheckResult]" = OrderedDict() # LRU: oxirgi ishlatilgan - oxirida
+        self._waiting: Dict[str, asyncio.Future] = {} # Navbatda yoki tekshirilmoqda
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="verify")
+        self._conn = self._executor.submit(self._connect).result()
+
+    # --- Baza bilan ishlash (executor oqimida) ---
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS document_checks ("
+            " file_unique_id TEXT PRIMARY KEY,"
+            " kind TEXT,"
+            " size INTEGER,"
+            " problems TEXT NOT NULL,"
+            " checked_at REAL NOT NULL)"
+        )
+        conn.commit()
+        return conn
+
+    def _load(self, unique_id: str) -> Optional[CheckResult]:
+        row = self._conn.execute("SELECT kind, size, problems FROM document_checks WHERE file_unique_id = ?",
+                                 (unique_id,)).fetchone()
+        if row is None:
+            return None
+        return CheckResult(row[0], row[1], json.loads(row[2]))
+
+    def _save(self, unique_id: str, result: CheckResult):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO document_checks (file_unique_id, kind, size, problems, checked_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (unique_id, result.kind, result.size, json.dumps(result.problems, ensure_ascii=False), time.time()),
+            )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Kesh ---
+
+    def _cached(self, unique_id: str) -> Optional[CheckResult]:
+        result = self._cache.get(unique_id)
+        if result is not None:
+            self._cache.move_to_end(unique_id)
+        return result
+
+    def _remember(self, unique_id: str, result: CheckResult):
+        self._cache[unique_id] = result
+        self._cache.move_to_end(unique_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False) # Bazada qoladi
+
+    # --- Ommaviy interfeys ---
+
+    def submit(self, document: Dict[str, Any]):
+        """Hujjatni tekshirish navbatiga qo'yish (kutmaydi). Keshdagi yoki navbatdagi fayl qayta qo'yilmaydi."""
+        unique_id = document.get("file_unique_id")
+        if not unique_id or self._cached(unique_id) is not None or unique_id in self._waiting or self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(document)
+        except asyncio.QueueFull:
+            logging.warning(f"Hujjat tekshirish navbati to'lgan, {unique_id} keyinroq tekshiriladi.")
+            return
+        self._waiting[unique_id] = asyncio.get_running_loop().create_future()
+
+    async def result(self, document: Dict[str, Any], timeout: float) -> Optional[CheckResult]:
+        """Tekshiruv natijasi (kerak bo'lsa navbatga qo'yib, `timeout` gacha kutadi)."""
+        unique_id = document.get("file_unique_id")
+        if not unique_id:
+            return None
+        cached = self._cached(unique_id)
+        if cached is not None:
+            return cached
+        stored = await self._run(self._load, unique_id)
+        if stored is not None:
+            self._remember(unique_id, stored)
+            return stored
+        self.submit(document)
+        waiter = self._waiting.get(unique_id)
+        if waiter is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+        while True:
+            document = await self._queue.get()
+            unique_id = document["file_unique_id"]
+            try:
+                result = await self._run(self._load, unique_id) or await self._check(document)
+                self._remember(unique_id, result)
+                await self._run(self._save, unique_id, result)
+            except Exception as e:
+                # Yuklab bo'lmadi: natija saqlanmaydi, keyingi so'rovda qayta uriniladi
+                logging.error(f"Hujjatni tekshirib bo'lmadi ({unique_id}): {e}")
+                result = None
+            finally:
+                waiter = self._waiting.pop(unique_id, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(result)
+                self._queue.task_done()
+
+    async def _check(self, document: Dict[str, Any]) -> CheckResult:
+        file_size = document.get("file_size")
+        if file_size is not None and file_size > self.max_size:
+            return CheckResult(MIME_KINDS.get(document.get("mime_type") or ""), file_size,
+                               [f"juda katta ({file_size / 2 ** 20:.1f} MB)"])
+        buffer = io.BytesIO()
+        await self.bot.download(document["file_id"], destination=buffer)
+        return await asyncio.get_running_loop().run_in_executor(None, inspect, buffer.getvalue(), document.get("mime_type"))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+import secrets
+from typing import Any, Dict
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+# --- Webhook Rejimi (aiohttp) ---
+#
+# Long polling o'rniga Telegram yangilanishlarni o'zi HTTP orqali yuboradi.
+# Har bir so'rov "X-Telegram-Bot-Api-Secret-Token" sarlavhasi bo'yicha
+# tekshiriladi, bir vaqtda ishlanadigan yangilanishlar soni esa
+# max_concurrency bilan cheklanadi (band bo'lsa Telegram'ga javob kechikadi va
+# u yuborishni sekinlashtiradi). Bir nechta jarayonni load balancer ortiga
+# qo'yish mumkin: FSM holati va navbatlar umumiy SQLite faylida.
+
+DEFAULT_PATH = "/webhook"
+DEFAULT_MAX_CONCURRENCY = 40
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """Bir vaqtda ishlanadigan yangilanishlar sonini cheklaydigan webhook handler."""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, **kwargs: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        # Bo'sh joy bo'lmasa, javobni kechiktirib Telegram'ni kutishga majburlaymiz
+        await self._slots.acquire()
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._background_feed_update_tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Webhook yangilanishini ishlashda xato: {task.exception()}")
+
+
+def build_app(dp: Dispatcher, bot: Bot, settings: Dict[str, Any]) -> web.Application:
+    """Webhook uchun aiohttp ilovasini yaratish."""
+    path = settings.get("path", DEFAULT_PATH)
+    url = settings["url"].rstrip("/") + path
+    # Sir berilmagan bo'lsa har ishga tushishda yangisi yaratiladi
+    secret = settings.get("secret") or secrets.token_urlsafe(32)
+    max_concurrency = int(settings.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+
+    app = web.Application()
+    handler = BoundedRequestHandler(dp, bot, max_concurrency=max_concurrency, secret_token=secret)
+    handler.register(app, path=path)
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    app.router.add_get("/healthz", healthz)
+
+    async def on_startup(bot: Bot):
+        await bot.set_webhook(
+            url,
+            secret_token=secret,
+            max_connections=min(max_concurrency, 100),
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=False,
+        )
+        logging.info(f"Webhook o'rnatildi: {url}")
+
+    dp.startup.register(on_startup)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def run_webhook(dp: Dispatcher, bot: Bot, settings: Dict[str, Any]):
+    """Botni webhook rejimida ishga tushirish."""
+    app = build_app(dp, bot, settings)
+    web.run_app(app, host=settings.get("host", "0.0.0.0"), port=int(settings.get("port", os.environ.get("PORT", 8080))))